@@ -1,3 +1,5 @@
+import numpy
+
 from util import *
 
 def ai_flee_target( dt, actor, target):
@@ -61,3 +63,94 @@ def ai_seek_target( dt, actor, target, fire):
         if may_fire:
             if aim_angle < 5.0:
                 fire()
+
+class AIController (object):
+    # Steers every AI ship in a world from one pre_physics hook. The
+    # decisions are those of ai_seek_target and ai_flee_target, worked
+    # out for all agents at once on arrays and written back to each
+    # ship's controls. Decisions are made rate times per second.
+    shot_speed = 1400.0
+    def __init__(self, world, rate = 50.0):
+        self.world = world
+        self.interval = 1.0 / rate
+        self.time = 0.0
+        self.actors = []
+        self.targets = []
+        self.fire_functions = []
+        self.fleeing = numpy.zeros( 0, dtype = bool )
+        world.pre_physics.add_hook( self, self.update )
+
+    def add(self, actor, target, fire = None, flee = False):
+        self.actors.append( actor )
+        self.targets.append( target )
+        self.fire_functions.append( fire )
+        self.fleeing = numpy.append( self.fleeing, flee )
+
+    def remove(self, actor):
+        keep = [ i for i, x in enumerate( self.actors ) if x is not actor ]
+        self.keep_only( keep )
+
+    def keep_only(self, keep):
+        self.actors = [ self.actors[i] for i in keep ]
+        self.targets = [ self.targets[i] for i in keep ]
+        self.fire_functions = [ self.fire_functions[i] for i in keep ]
+        self.fleeing = self.fleeing[ keep ]
+
+    def __len__(self):
+        return len( self.actors )
+
+    def update(self, dt):
+        self.time += dt
+        if self.time < self.interval:
+            return
+        self.time = 0.0
+        if not all( actor.alive for actor in self.actors ):
+            self.keep_only( [ i for i, actor in enumerate( self.actors ) if actor.alive ] )
+        if self.actors:
+            self.decide()
+
+    def decide(self):
+        actors, targets = self.actors, self.targets
+        n = len( actors )
+        state = numpy.empty( (n, 9) )
+        for i in range(n):
+            body, other = actors[i].body, targets[i].body
+            state[i] = body.position.x, body.position.y, body.angle, body.velocity.x, body.velocity.y, other.position.x, other.position.y, other.velocity.x, other.velocity.y
+        x, y, angle, vx, vy, tx, ty, tvx, tvy = state.T
+        fleeing = self.fleeing
+        dx, dy = tx - x, ty - y
+        distance = numpy.hypot( dx, dy )
+        ux, uy = numpy.cos( angle ), numpy.sin( angle )
+        safe = numpy.where( distance > 0, distance, 1.0 )
+        correctness = (dx * ux + dy * uy) / safe
+        correctness = numpy.where( fleeing, -correctness, correctness )
+        off_angle = numpy.degrees( numpy.arccos( numpy.clip( correctness, -1.0, 1.0 ) ) )
+        bearing = numpy.degrees( numpy.arctan2( dy, dx ) )
+        actor_angle = numpy.degrees( angle )
+        sangle = numpy.where( fleeing, (bearing - actor_angle) % 360.0, (bearing - actor_angle + 180.0) % 360.0 ) - 180.0
+        far = distance > 500.0
+        wide = numpy.where( fleeing, ~far, far )
+        forwards = numpy.where( wide, off_angle < 90.0, off_angle < 20.0 )
+        new_spin = -numpy.sign( sangle )
+        settled_spin = numpy.where( numpy.abs( sangle ) < 15.0, 0.0, new_spin )
+        # leading the target: aim along the relative velocity a shot
+        # would have
+        sx = ux * self.shot_speed + vx - tvx
+        sy = uy * self.shot_speed + vy - tvy
+        aim_angle = (bearing - numpy.degrees( numpy.arctan2( sy, sx ) ) + 180.0) % 360.0 - 180.0
+        in_range = ~fleeing & (distance < 1000.0)
+        for i in range(n):
+            actor = actors[i]
+            actor._turbo = False
+            if fleeing[i]:
+                actor._spin = int( settled_spin[i] )
+            else:
+                may_fire = in_range[i] and targets[i].alive and actor.may_fire()
+                if may_fire:
+                    actor._spin = int( -numpy.sign( aim_angle[i] ) )
+                elif new_spin[i] != actor._spin:
+                    actor._spin = int( settled_spin[i] )
+                if may_fire and aim_angle[i] < 5.0 and self.fire_functions[i]:
+                    self.fire_functions[i]()
+            actor._thrusting = bool( forwards[i] )
+            actor._braking = not forwards[i]
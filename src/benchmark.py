@@ -0,0 +1,163 @@
+import headless
+
+import gc
+import sys
+import time
+import math
+import random
+
+import numpy
+import pyglet
+import projectile
+
+from util import *
+
+from world import HookpointNames
+
+from ship import create_ship_thing
+
+class ProjectileFeeder (object):
+    def __init__(self, world, shooters, count):
+        self.world = world
+        self.shooters = shooters
+        self.count = count
+        self.projectiles = []
+    def __call__(self):
+        self.projectiles = [ p for p in self.projectiles if p.alive ]
+        shooters = [ s for s in self.shooters if s.alive and s.weapons ]
+        if not shooters:
+            return
+        while len( self.projectiles ) < self.count:
+            shooter = random.choice( shooters )
+            gun = random.choice( shooter.weapons )
+            self.projectiles.append( projectile.create_pellet( self.world, shooter, gun ) )
+
+def populate( world, ships = 10, debris = 200, radius = 600.0, vulnerable = False ):
+    world.create_debris_squares( debris )
+    fleet = []
+    for i in range(ships):
+        position = polar_radians( 2 * math.pi * i / float(ships), radius )
+        ship = create_ship_thing( world, position, shape = "small", hp = 10 )
+        ship.angle_degrees = random.random() * 360.0
+        ship.invulnerable = not vulnerable
+        world.targeting.add( ship, "player" if i == 0 else "enemy" )
+        fleet.append( ship )
+    if fleet:
+        target = fleet[0]
+        world.pre_physics.add_hook( target, target.update )
+        for ship in fleet[1:]:
+            world.add_ai_ship( ship, target )
+        for ship in fleet:
+            world.post_physics.add_hook( ship, ship.tick )
+    return fleet
+
+def run_benchmark( ships = 10, projectiles = 100, debris = 200, frames = 600, frame_dt = 1/60.0, seed = 0, vulnerable = False ):
+    random.seed( seed )
+    world = headless.HeadlessWorld()
+    fleet = populate( world, ships = ships, debris = debris, vulnerable = vulnerable )
+    feeder = ProjectileFeeder( world, fleet, projectiles )
+    profiler = world.enable_profiling()
+    gc.collect()
+    gc.disable()
+    try:
+        tracked_before = len( gc.get_objects() )
+        allocations_before = gc.get_count()[0]
+        t0 = time.time()
+        for i in range(frames):
+            feeder()
+            world.tick( frame_dt )
+            world.display_update()
+        elapsed = time.time() - t0
+        net_allocations = gc.get_count()[0] - allocations_before
+        tracked_after = len( gc.get_objects() )
+    finally:
+        gc.enable()
+    garbage = gc.collect()
+    world.disable_profiling()
+    hooks = profiler.hookpoint_totals()
+    ticks = hooks.get( "pre_physics", (0.0, 0) )[1]
+    rv = {}
+    rv[ "seed" ] = seed
+    rv[ "ships" ] = ships
+    rv[ "projectiles" ] = projectiles
+    rv[ "debris" ] = debris
+    rv[ "frames" ] = frames
+    rv[ "ticks" ] = ticks
+    rv[ "elapsed" ] = elapsed
+    rv[ "ticks_per_second" ] = ticks / elapsed if elapsed > 0 else 0.0
+    rv[ "hooks" ] = dict( (name, hooks.get( name, (0.0, 0) )) for name in HookpointNames )
+    rv[ "hook_owners" ] = profiler.hook_totals()
+    rv[ "net_allocations_per_tick" ] = net_allocations / float( max( 1, ticks ) )
+    rv[ "tracked_object_growth" ] = tracked_after - tracked_before
+    rv[ "garbage_collected" ] = garbage
+    return rv
+
+def run_element_benchmark( psys, elements = 2000, frames = 600, churn = 20, moving = 0.1, seed = 0 ):
+    # The element store traffic of a busy frame: churn elements removed
+    # and added (bullets), and a fraction of the rest moved in one bulk
+    # update, then a draw.
+    rng = numpy.random.RandomState( seed )
+    indices = [ psys.add( position = (float(i), 0.0), size = (4.0, 4.0) ) for i in range(elements) ]
+    psys.draw()
+    t0 = time.time()
+    for frame in range(frames):
+        for j in rng.randint( len( indices ), size = churn ):
+            psys.remove( indices[j] )
+            indices[j] = psys.add( position = (float(j), 1.0), size = (4.0, 4.0) )
+        count = int( moving * len( indices ) )
+        chosen = numpy.array( indices, dtype = numpy.int32 )[ rng.permutation( len( indices ) )[:count] ]
+        psys.update_positions_and_angles( chosen, rng.random_sample( (count, 2) ), rng.random_sample( count ) )
+        psys.draw()
+    elapsed = time.time() - t0
+    return { "elements": elements, "frames": frames, "elapsed": elapsed, "frames_per_second": frames / elapsed if elapsed > 0 else 0.0 }
+
+def element_stores():
+    # (name, factory) for each element store that can run here; the C
+    # module needs a GL context, so it is only tried with a display.
+    import elementstore
+    rv = [ ("elementstore.ElementStore", elementstore.ElementStore) ]
+    try:
+        import bsgl
+    except ImportError:
+        return rv
+    window = pyglet.window.Window( visible = False )
+    rv.append( ("bsgl.System", bsgl.System) )
+    return rv
+
+def format_report( rv ):
+    lines = []
+    lines.append( "seed {seed}: {ships} ships, {projectiles} projectiles, {debris} debris squares".format( **rv ) )
+    lines.append( "{frames} frames, {ticks} ticks in {elapsed:.3f}s ({ticks_per_second:.1f} ticks/s)".format( **rv ) )
+    for name in HookpointNames:
+        elapsed, calls = rv[ "hooks" ][ name ]
+        per_call = 1000.0 * elapsed / calls if calls else 0.0
+        share = 100.0 * elapsed / rv[ "elapsed" ] if rv[ "elapsed" ] > 0 else 0.0
+        lines.append( "  {0:<14} {1:8.3f}s {2:8.3f}ms/call {3:5.1f}%".format( name, elapsed, per_call, share ) )
+    for hookpoint, owner, hook, elapsed, calls in rv[ "hook_owners" ][:8]:
+        share = 100.0 * elapsed / rv[ "elapsed" ] if rv[ "elapsed" ] > 0 else 0.0
+        lines.append( "    {0:<12} {1:8.3f}s {2:8d} calls {3:5.1f}%  {4}: {5}".format( hookpoint, elapsed, calls, share, owner, hook ) )
+    lines.append( "net gc-tracked allocations per tick: {net_allocations_per_tick:.1f}".format( **rv ) )
+    lines.append( "tracked object growth: {tracked_object_growth}, cyclic garbage: {garbage_collected}".format( **rv ) )
+    return "\n".join( lines )
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser( description = "Run the simulation without a display and report tick costs." )
+    parser.add_argument( "--ships", type = int, default = 10 )
+    parser.add_argument( "--projectiles", type = int, default = 100 )
+    parser.add_argument( "--debris", type = int, default = 200 )
+    parser.add_argument( "--frames", type = int, default = 600 )
+    parser.add_argument( "--seed", type = int, default = 0 )
+    parser.add_argument( "--vulnerable", action = "store_true", help = "let ships take damage and break apart" )
+    parser.add_argument( "--elements", type = int, default = 0, help = "instead time the element stores with this many elements" )
+    args = parser.parse_args()
+    if args.elements:
+        for name, factory in element_stores():
+            rv = run_element_benchmark( factory( texture_id = 0 ), elements = args.elements, frames = args.frames, seed = args.seed )
+            print "{0:<28} {1} elements, {2} frames in {3:.3f}s ({4:.1f} frames/s)".format( name, rv[ "elements" ], rv[ "frames" ], rv[ "elapsed" ], rv[ "frames_per_second" ] )
+        return
+    rv = run_benchmark( ships = args.ships, projectiles = args.projectiles, debris = args.debris, frames = args.frames, seed = args.seed, vulnerable = args.vulnerable )
+    print format_report( rv )
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,7 @@ import copy
 
 from collections import OrderedDict
 
-from geometry import convex_polygons_overlap
+from geometry import bounding_box, bounding_boxes_overlap, convex_polygons_separated
 
 import sys
 
@@ -129,6 +129,7 @@ class PolygonBlock (Block):
         self.vertices = map( Vec2d, vertices )
         self.original_vertices = map( Vec2d, vertices )
         self.inner_vertices = map( lambda x : Vec2d(x) * 0.99, vertices )
+        self.invalidate_geometry()
         self.free_edge_indices = range(len(self.edges))
         self.connections = {}
         self.rotation_degrees = 0.0
@@ -136,46 +137,87 @@ class PolygonBlock (Block):
         self.sprite_scale = 1.0
         self.sprite_flipy = False
 
+    def invalidate_geometry(self):
+        # derived geometry is cached until the block is next moved;
+        # the cached lists are shared, so callers must not modify them
+        self._edges = None
+        self._transformed_vertices = None
+        self._transformed_inner_vertices = None
+        self._inner_polygon = None
+        self._bounding_box = None
+        self._centroid_and_area = None
+
     def transformed_vertices(self):
-        xs = map( Vec2d, self.original_vertices )
-        for v in xs:
-            v.rotate_degrees( self.rotation_degrees )
-        xs = map( lambda x : x + self.translation, xs )
-        return xs
+        if self._transformed_vertices == None:
+            xs = map( Vec2d, self.original_vertices )
+            for v in xs:
+                v.rotate_degrees( self.rotation_degrees )
+            self._transformed_vertices = map( lambda x : x + self.translation, xs )
+        return self._transformed_vertices
 
     def transformed_inner_vertices(self):
-        xs = map( Vec2d, self.inner_vertices )
-        for v in xs:
-            v.rotate_degrees( self.rotation_degrees )
-        xs = map( lambda x : x + self.translation, xs )
-        return xs
+        if self._transformed_inner_vertices == None:
+            xs = map( Vec2d, self.inner_vertices )
+            for v in xs:
+                v.rotate_degrees( self.rotation_degrees )
+            self._transformed_inner_vertices = map( lambda x : x + self.translation, xs )
+        return self._transformed_inner_vertices
+
+    def inner_polygon(self):
+        if self._inner_polygon == None:
+            self._inner_polygon = tuple( (float(x), float(y)) for x, y in self.transformed_inner_vertices() )
+        return self._inner_polygon
+
+    def bounding_box(self):
+        if self._bounding_box == None:
+            self._bounding_box = bounding_box( self.inner_polygon() )
+        return self._bounding_box
 
     @property
     def edges(self):
-        return list(starmap( Edge, closed_circle_pairs( self.vertices ) ))
+        if self._edges == None:
+            self._edges = list(starmap( Edge, closed_circle_pairs( self.vertices ) ))
+        return self._edges
 
     def edge(self, index):
         return self.edges[index]
 
+    def centroid_and_area(self):
+        if self._centroid_and_area == None:
+            self._centroid_and_area = physics.ConvexPolygonShape( *self.transformed_vertices() ).centroid_and_area()
+        centroid, area = self._centroid_and_area
+        return Vec2d( centroid ), area
+
+    def centroid(self):
+        return self.centroid_and_area()[0]
+
+    def area(self):
+        return self.centroid_and_area()[1]
+
     def rotate_radians(self, delta_radians):
         self.rotation_degrees += radians_to_degrees( delta_radians )
         for v in self.vertices:
             v.rotate( delta_radians )
+        self.invalidate_geometry()
         return self
 
     def interiors_overlap(self, other):
-        return convex_polygons_overlap( self.transformed_inner_vertices(), other.transformed_inner_vertices() )
+        if not bounding_boxes_overlap( self.bounding_box(), other.bounding_box() ):
+            return False
+        return not convex_polygons_separated( self.inner_polygon(), other.inner_polygon() )
 
     def rotate_degrees(self, delta_degrees):
         self.rotation_degrees += delta_degrees
         for v in self.vertices:
             v.rotate_degrees( delta_degrees )
+        self.invalidate_geometry()
         return self
 
     def translate(self, xy):
         xy = Vec2d(xy)
         self.translation += xy
         self.vertices = map( lambda x : x + xy, self.vertices )
+        self.invalidate_geometry()
         return self
 
     def create_collision_shape(self, extra_info = None, origin = None):
@@ -204,6 +246,7 @@ class PolygonBlock (Block):
         rv.max_hp = data["max-hp"]
         rv.cockpit = data["cockpit"]
         rv.inner_vertices = data["inner-vertices"]
+        rv.invalidate_geometry()
         rv.sprite_info = data["sprite"]
         rv.colour = data["colour"]
         for f in (lambda : data["sprite-scale"], lambda : data["side-length"] / data["pixel-side-length"], lambda : 1):
@@ -300,10 +343,88 @@ class IntegerMap (object):
     def __len__(self):
         return len(self.d)
 
+class EdgeIndex (object):
+    # Buckets edges by the grid cell of their midpoint, so that finding
+    # the edges that might overlap a given edge only looks at a few cells.
+    def __init__(self, cell_size = 4.0):
+        self.cell_size = cell_size
+        self.buckets = {}
+        self.cells = {}
+    def cell(self, xy):
+        x, y = xy
+        return int(math.floor( x / self.cell_size )), int(math.floor( y / self.cell_size ))
+    def add(self, key, edge):
+        cell = self.cell( edge.midpoint() )
+        self.cells[ key ] = cell
+        try:
+            self.buckets[ cell ][ key ] = edge
+        except KeyError:
+            self.buckets[ cell ] = { key: edge }
+    def remove(self, key):
+        cell = self.cells.pop( key )
+        bucket = self.buckets[ cell ]
+        del bucket[ key ]
+        if not bucket:
+            del self.buckets[ cell ]
+    def near(self, edge, max_distance = 0.0):
+        cx, cy = self.cell( edge.midpoint() )
+        r = 1 + int( max_distance / self.cell_size )
+        rv = []
+        for dx in range(-r, r+1):
+            for dy in range(-r, r+1):
+                try:
+                    rv.extend( self.buckets[ (cx+dx, cy+dy) ].items() )
+                except KeyError:
+                    pass
+        return rv
+    def __len__(self):
+        return len(self.cells)
+
+class BlockGrid (object):
+    # Buckets blocks by every grid cell their bounding box touches.
+    def __init__(self, cell_size = 64.0):
+        self.cell_size = cell_size
+        self.buckets = {}
+        self.cells = {}
+    def cells_covering(self, bb):
+        x0, y0, x1, y1 = bb
+        s = self.cell_size
+        rv = []
+        for i in range(int(math.floor( x0 / s )), int(math.floor( x1 / s )) + 1):
+            for j in range(int(math.floor( y0 / s )), int(math.floor( y1 / s )) + 1):
+                rv.append( (i,j) )
+        return rv
+    def add(self, key, bb):
+        cells = self.cells_covering( bb )
+        self.cells[ key ] = cells
+        for cell in cells:
+            try:
+                self.buckets[ cell ].add( key )
+            except KeyError:
+                self.buckets[ cell ] = set( [key] )
+    def remove(self, key):
+        for cell in self.cells.pop( key ):
+            bucket = self.buckets[ cell ]
+            bucket.remove( key )
+            if not bucket:
+                del self.buckets[ cell ]
+    def query(self, bb):
+        rv = set()
+        for cell in self.cells_covering( bb ):
+            try:
+                rv.update( self.buckets[ cell ] )
+            except KeyError:
+                pass
+        return rv
+    def __len__(self):
+        return len(self.cells)
+
 class BlockStructure (object):
     def __init__(self, block = None):
         self.blocks = IntegerMap()
-        self.free_edge_indices = []
+        self.free_edge_indices = set()
+        self._free_edge_index = None
+        self._block_grid = None
         if block:
             self.add_block( block )
 
@@ -364,6 +485,8 @@ class BlockStructure (object):
     def translate(self, xy):
         for block in self.blocks:
             block.translate( xy )
+        self._free_edge_index = None
+        self._block_grid = None
 
     def zero_centroid(self):
         self.translate( -self.centroid() )
@@ -372,8 +495,40 @@ class BlockStructure (object):
     def add_block(self, block, index = None):
         if not index:
             index = self.blocks.next_index
-        self.free_edge_indices.extend(list(map( lambda edge_index : (index,edge_index), range(len(block.edges)))))
         self.blocks[index] = block
+        if self._block_grid != None:
+            self._block_grid.add( index, block.bounding_box() )
+        for edge_index in range(len(block.edges)):
+            self.add_free_edge( (index,edge_index) )
+
+    @property
+    def block_grid(self):
+        if self._block_grid == None:
+            self._block_grid = BlockGrid()
+            for index, block in self.blocks.indexed():
+                self._block_grid.add( index, block.bounding_box() )
+        return self._block_grid
+
+    @property
+    def free_edge_index(self):
+        if self._free_edge_index == None:
+            self._free_edge_index = EdgeIndex()
+            for index in self.free_edge_indices:
+                self._free_edge_index.add( index, self.edge( index ) )
+        return self._free_edge_index
+
+    def add_free_edge(self, index):
+        self.free_edge_indices.add( index )
+        if self._free_edge_index != None:
+            self._free_edge_index.add( index, self.edge( index ) )
+
+    def remove_free_edge(self, index):
+        self.free_edge_indices.remove( index )
+        if self._free_edge_index != None:
+            self._free_edge_index.remove( index )
+
+    def free_edges_near(self, edge, max_distance = 0.0):
+        return self.free_edge_index.near( edge, max_distance = max_distance )
 
     def any_block(self):
         try:
@@ -407,8 +562,8 @@ class BlockStructure (object):
         return self.blocks[ block_index ].edge( edge_index )
 
     def overlaps(self, block):
-        for local_block in self.blocks:
-            if local_block.interiors_overlap( block ):
+        for index in self.block_grid.query( block.bounding_box() ):
+            if self.blocks[ index ].interiors_overlap( block ):
                 return True
         return False
     
@@ -458,21 +613,19 @@ class BlockStructure (object):
         else:
             foreign_block_index = existing_index
         self.add_block( block, index = foreign_block_index )
-        tbr = []
-        for local_block_index, local_edge_index in self.free_edge_indices:
-            local_edge = self.edge( (local_block_index,local_edge_index) )
-            if local_block_index == foreign_block_index:
-                continue
-            for foreign_edge_index, foreign_edge in indexed_zip(block.edges):
+        for foreign_edge_index, foreign_edge in indexed_zip(block.edges):
+            for local_index, local_edge in self.free_edges_near( foreign_edge ):
+                local_block_index, local_edge_index = local_index
+                if local_block_index == foreign_block_index:
+                    continue
                 if local_edge.overlaps( foreign_edge ):
                     self.blocks[ local_block_index ].free_edge_indices.remove( local_edge_index )
                     self.blocks[ foreign_block_index ].free_edge_indices.remove( foreign_edge_index )
                     block.connections[ foreign_edge_index ] = (local_block_index, local_edge_index)
                     self.blocks[ local_block_index ].connections[ local_edge_index ] = (foreign_block_index, foreign_edge_index)
-                    tbr.append( (local_block_index,local_edge_index) )
-                    tbr.append( (foreign_block_index,foreign_edge_index) )
-        for x in tbr:
-            self.free_edge_indices.remove( x )
+                    self.remove_free_edge( local_index )
+                    self.remove_free_edge( (foreign_block_index,foreign_edge_index) )
+                    break
         return foreign_block_index
     
     def remove_block(self, index):
@@ -482,9 +635,13 @@ class BlockStructure (object):
             other_block_index, other_edge_index = connection
             other_block = self.blocks[ other_block_index ]
             other_block.free_edge_indices.append( other_edge_index )
-            self.free_edge_indices.append( connection )
+            self.add_free_edge( connection )
             assert other_block.connections[ other_edge_index ][0] == index
             del other_block.connections[ other_edge_index ]
+        for edge_index in block.free_edge_indices:
+            self.remove_free_edge( (index,edge_index) )
+        if self._block_grid != None:
+            self._block_grid.remove( index )
         del self.blocks[ index ]
         # TODO ensure connected, and return both the block and any detached parts
         try:
@@ -513,7 +670,13 @@ class BlockStructure (object):
             block.collision_shapes = []
 
     def centroid(self):
-        return self.create_collision_shape().centroid()
+        rv = Vec2d(0,0)
+        total_area = 0.0
+        for centroid, area in [ block.centroid_and_area() for block in self.blocks ]:
+            rv += centroid * area
+            total_area += area
+        rv /= total_area
+        return rv
 
     def create_sys_structure(self, psys, atlas, thing, absolute_transformation = None, relative_transformation = None, sync_to_thing = True):
         rv = graphics.BlockSystemStructure( psys, thing, transformation = absolute_transformation, sync_to_thing = sync_to_thing )
@@ -47,6 +47,10 @@ void bsgl_array_destroy( struct bsgl_array *arr ) {
     bsgl_free_memory_pages( &arr->node_pages );
     free( arr->data );
     arr->data = NULL;
+    free( arr->virtual_to_real );
+    arr->virtual_to_real = NULL;
+    free( arr->real_to_virtual );
+    arr->real_to_virtual = NULL;
 }
 
 int bsgl_array_reserve( struct bsgl_array *arr, int n ) {
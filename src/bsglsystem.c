@@ -60,8 +60,27 @@ int bsgl_system_bind_vertex_attributes( System *sys ) {
 };
 
 int bsgl_system_remove( System *sys, int index ) {
+    bsgl_system_detach_transform( sys, index );
+
+    if( sys->hidden[ index ] ) {
+        sys->hidden[ index ] = 0;
+        sys->hidden_count--;
+    }
+
+    const int real_index = sys->vertex_buffer.virtual_to_real[ index ];
+    const bool moved = real_index != sys->vertex_buffer.number_of_elements - 1;
+
     bsgl_array_remove( &sys->vertex_buffer, index );
 
+    if( moved ) {
+        sys->dirty[ real_index ] = 1;
+    }
+
+    /* the last quad has been moved into the removed one's place */
+    if( sys->elements_compacted || sys->hidden_count > 0 ) {
+        sys->elements_need_rebuild = true;
+    }
+
     sys->vertex_buffer_dirty = true;
 
     return 0;
@@ -113,8 +132,11 @@ int bsgl_system_add( System *sys, int *out_index, double com_position[2], double
         }
     }
 
-    int vertex_index = 4 * bsgl_index;
-    int element_index = 6 * bsgl_index;
+    /* the new quad is the last one, so this is where it is drawn from
+       while the element buffer is not compacted */
+    const int real_index = sys->vertex_buffer.virtual_to_real[ bsgl_index ];
+    int vertex_index = 4 * real_index;
+    int element_index = 6 * real_index;
     const int element_quad_base[] = { 0, 1, 2, 3, 2, 1 };
 
     assert( vertex_index >= 0 );
@@ -125,8 +147,12 @@ int bsgl_system_add( System *sys, int *out_index, double com_position[2], double
         sys->element_buffer_data[ element_index++ ] = element;
     }
 
+    if( sys->elements_compacted ) {
+        sys->elements_need_rebuild = true;
+    }
+
     sys->element_buffer_dirty = true;
-    sys->vertex_buffer_dirty = true;
+    bsgl_system_mark_dirty( sys, bsgl_index );
 
     if( out_index ) {
         *out_index = bsgl_index;
@@ -149,6 +175,42 @@ int bsgl_system_reallocate_elements( System *sys ) {
         return 1;
     }
 
+    const int old_number_of_elements = old_size / (elements_per_quad * sizeof (GLushort));
+    unsigned char *new_hidden = realloc( sys->hidden, number_of_elements );
+    if( !new_hidden ) {
+        return 1;
+    }
+    memset( &new_hidden[old_number_of_elements], 0, number_of_elements - old_number_of_elements );
+    sys->hidden = new_hidden;
+
+    unsigned char *new_dirty = realloc( sys->dirty, number_of_elements );
+    if( !new_dirty ) {
+        return 1;
+    }
+    memset( &new_dirty[old_number_of_elements], 0, number_of_elements - old_number_of_elements );
+    sys->dirty = new_dirty;
+
+    int *new_transform_of = realloc( sys->transform_of, number_of_elements * sizeof (int) );
+    if( !new_transform_of ) {
+        return 1;
+    }
+    sys->transform_of = new_transform_of;
+    int *new_transform_next = realloc( sys->transform_next, number_of_elements * sizeof (int) );
+    if( !new_transform_next ) {
+        return 1;
+    }
+    sys->transform_next = new_transform_next;
+    int *new_transform_previous = realloc( sys->transform_previous, number_of_elements * sizeof (int) );
+    if( !new_transform_previous ) {
+        return 1;
+    }
+    sys->transform_previous = new_transform_previous;
+    for(int i = old_number_of_elements; i < number_of_elements; i++) {
+        new_transform_of[i] = -1;
+        new_transform_next[i] = -1;
+        new_transform_previous[i] = -1;
+    }
+
     char * raw_data = (char*) new_data;
 
     memset( &raw_data[old_size], 0, required_size - old_size );
@@ -160,10 +222,336 @@ int bsgl_system_reallocate_elements( System *sys ) {
     return 0;
 }
 
+void bsgl_system_mark_dirty( System *sys, int index ) {
+    sys->dirty[ sys->vertex_buffer.virtual_to_real[ index ] ] = 1;
+    sys->vertex_buffer_dirty = true;
+}
+
+bool bsgl_system_is_live( System *sys, int index ) {
+    struct bsgl_array *arr = &sys->vertex_buffer;
+
+    if( index < 0 || index >= arr->capacity ) {
+        return false;
+    }
+
+    const int real_index = arr->virtual_to_real[ index ];
+    return real_index >= 0 && real_index < arr->number_of_elements && arr->real_to_virtual[ real_index ] == index;
+}
+
+int bsgl_system_set_hidden( System *sys, int index, bool hidden ) {
+    if( !bsgl_system_is_live( sys, index ) ) {
+        return 1;
+    }
+
+    if( (bool) sys->hidden[ index ] == hidden ) {
+        return 0;
+    }
+
+    sys->hidden[ index ] = hidden;
+    sys->hidden_count += hidden ? 1 : -1;
+    sys->elements_need_rebuild = true;
+
+    return 0;
+}
+
+int bsgl_system_update_transforms( System *sys, int n, const int *indices, const double *positions, const double *angles ) {
+    const int floats_per_vertex = 12;
+
+    /* check everything first so that a bad index changes nothing */
+    for(int i=0;i<n;i++) {
+        if( !bsgl_system_is_live( sys, indices[i] ) ) {
+            return 1;
+        }
+    }
+
+    for(int i=0;i<n;i++) {
+        GLfloat* floats = (void*) bsgl_array_get( &sys->vertex_buffer, indices[i] );
+        for(int j=0;j<4;j++) {
+            floats[ j * floats_per_vertex + 0 ] = positions[ 2 * i ];
+            floats[ j * floats_per_vertex + 1 ] = positions[ 2 * i + 1 ];
+            floats[ j * floats_per_vertex + 2 ] = angles[ i ];
+        }
+        bsgl_system_mark_dirty( sys, indices[i] );
+    }
+
+    return 0;
+}
+
+bool bsgl_system_is_live_transform( System *sys, int slot ) {
+    return slot >= 0 && slot < sys->transform_capacity && sys->transform_live[ slot ];
+}
+
+static int bsgl_system_reserve_transforms( System *sys, int n ) {
+    const int old_capacity = sys->transform_capacity;
+    if( n <= old_capacity ) {
+        return 0;
+    }
+
+    double *new_transforms = realloc( sys->transforms, 3 * n * sizeof (double) );
+    if( !new_transforms ) {
+        return 1;
+    }
+    sys->transforms = new_transforms;
+
+    unsigned char *new_live = realloc( sys->transform_live, n );
+    if( !new_live ) {
+        return 1;
+    }
+    memset( &new_live[old_capacity], 0, n - old_capacity );
+    sys->transform_live = new_live;
+
+    unsigned char *new_dirty = realloc( sys->transform_dirty, n );
+    if( !new_dirty ) {
+        return 1;
+    }
+    memset( &new_dirty[old_capacity], 0, n - old_capacity );
+    sys->transform_dirty = new_dirty;
+
+    int *new_first = realloc( sys->transform_first, n * sizeof (int) );
+    if( !new_first ) {
+        return 1;
+    }
+    for(int slot = old_capacity; slot < n; slot++) {
+        new_first[ slot ] = -1;
+    }
+    sys->transform_first = new_first;
+
+    int *new_free = realloc( sys->free_transforms, n * sizeof (int) );
+    if( !new_free ) {
+        return 1;
+    }
+    sys->free_transforms = new_free;
+
+    /* handed out lowest first */
+    for(int slot = n - 1; slot >= old_capacity; slot--) {
+        sys->free_transforms[ sys->free_transform_count++ ] = slot;
+    }
+
+    sys->transform_capacity = n;
+
+    return 0;
+}
+
+int bsgl_system_add_transform( System *sys, int *out_slot, double position[2], double angle ) {
+    if( !sys->free_transform_count ) {
+        int n = 2 * sys->transform_capacity;
+        if( n < 16 ) {
+            n = 16;
+        }
+        if( bsgl_system_reserve_transforms( sys, n ) ) {
+            return 1;
+        }
+    }
+
+    const int slot = sys->free_transforms[ --sys->free_transform_count ];
+
+    sys->transform_live[ slot ] = 1;
+    sys->transform_dirty[ slot ] = 0;
+    sys->transform_first[ slot ] = -1;
+    sys->transforms[ 3 * slot + 0 ] = position[0];
+    sys->transforms[ 3 * slot + 1 ] = position[1];
+    sys->transforms[ 3 * slot + 2 ] = angle;
+
+    *out_slot = slot;
+
+    return 0;
+}
+
+int bsgl_system_remove_transform( System *sys, int slot ) {
+    if( !bsgl_system_is_live_transform( sys, slot ) ) {
+        return 1;
+    }
+
+    /* elements still attached keep the last transform */
+    int index = sys->transform_first[ slot ];
+    while( index >= 0 ) {
+        const int next = sys->transform_next[ index ];
+        sys->transform_of[ index ] = -1;
+        sys->transform_next[ index ] = -1;
+        sys->transform_previous[ index ] = -1;
+        index = next;
+    }
+    sys->transform_first[ slot ] = -1;
+
+    sys->transform_dirty[ slot ] = 0;
+    sys->transform_live[ slot ] = 0;
+    sys->free_transforms[ sys->free_transform_count++ ] = slot;
+
+    return 0;
+}
+
+int bsgl_system_set_transforms( System *sys, int n, const int *slots, const double *positions, const double *angles ) {
+    for(int i=0;i<n;i++) {
+        if( !bsgl_system_is_live_transform( sys, slots[i] ) ) {
+            return 1;
+        }
+    }
+
+    for(int i=0;i<n;i++) {
+        const int slot = slots[i];
+        sys->transforms[ 3 * slot + 0 ] = positions[ 2 * i ];
+        sys->transforms[ 3 * slot + 1 ] = positions[ 2 * i + 1 ];
+        sys->transforms[ 3 * slot + 2 ] = angles[ i ];
+        sys->transform_dirty[ slot ] = 1;
+    }
+
+    if( n > 0 ) {
+        sys->transforms_dirty = true;
+    }
+
+    return 0;
+}
+
+static void bsgl_system_write_transform( System *sys, int index, int slot ) {
+    const int floats_per_vertex = 12;
+    GLfloat* floats = (void*) bsgl_array_get( &sys->vertex_buffer, index );
+    const double *transform = &sys->transforms[ 3 * slot ];
+
+    for(int j=0;j<4;j++) {
+        floats[ j * floats_per_vertex + 0 ] = transform[0];
+        floats[ j * floats_per_vertex + 1 ] = transform[1];
+        floats[ j * floats_per_vertex + 2 ] = transform[2];
+    }
+
+    bsgl_system_mark_dirty( sys, index );
+}
+
+int bsgl_system_attach_transform( System *sys, int index, int slot ) {
+    if( !bsgl_system_is_live( sys, index ) || !bsgl_system_is_live_transform( sys, slot ) ) {
+        return 1;
+    }
+
+    bsgl_system_detach_transform( sys, index );
+
+    const int first = sys->transform_first[ slot ];
+    sys->transform_of[ index ] = slot;
+    sys->transform_previous[ index ] = -1;
+    sys->transform_next[ index ] = first;
+    if( first >= 0 ) {
+        sys->transform_previous[ first ] = index;
+    }
+    sys->transform_first[ slot ] = index;
+
+    bsgl_system_write_transform( sys, index, slot );
+
+    return 0;
+}
+
+void bsgl_system_detach_transform( System *sys, int index ) {
+    const int slot = sys->transform_of[ index ];
+    if( slot < 0 ) {
+        return;
+    }
+
+    const int next = sys->transform_next[ index ];
+    const int previous = sys->transform_previous[ index ];
+    if( previous >= 0 ) {
+        sys->transform_next[ previous ] = next;
+    } else {
+        sys->transform_first[ slot ] = next;
+    }
+    if( next >= 0 ) {
+        sys->transform_previous[ next ] = previous;
+    }
+
+    sys->transform_of[ index ] = -1;
+    sys->transform_next[ index ] = -1;
+    sys->transform_previous[ index ] = -1;
+}
+
+int bsgl_system_apply_transforms( System *sys ) {
+    if( !sys->transforms_dirty ) {
+        return 0;
+    }
+
+    for(int slot = 0; slot < sys->transform_capacity; slot++) {
+        if( !sys->transform_dirty[ slot ] ) {
+            continue;
+        }
+        for(int index = sys->transform_first[ slot ]; index >= 0; index = sys->transform_next[ index ]) {
+            bsgl_system_write_transform( sys, index, slot );
+        }
+        sys->transform_dirty[ slot ] = 0;
+    }
+
+    sys->transforms_dirty = false;
+
+    return 0;
+}
+
+int bsgl_system_rebuild_elements( System *sys ) {
+    const int elements_per_quad = 6;
+    const int element_quad_base[] = { 0, 1, 2, 3, 2, 1 };
+    struct bsgl_array *arr = &sys->vertex_buffer;
+
+    int k = 0;
+
+    for(int real_index = 0; real_index < arr->number_of_elements; real_index++) {
+        if( sys->hidden[ arr->real_to_virtual[ real_index ] ] ) {
+            continue;
+        }
+        for(int i = 0; i < elements_per_quad; i++) {
+            sys->element_buffer_data[ elements_per_quad * k + i ] = 4 * real_index + element_quad_base[ i ];
+        }
+        k++;
+    }
+
+    /* with nothing hidden the buffer goes back to drawing quad k from
+       position k, which add and remove rely on */
+    if( sys->hidden_count == 0 ) {
+        for(int real_index = k; real_index < arr->capacity; real_index++) {
+            for(int i = 0; i < elements_per_quad; i++) {
+                sys->element_buffer_data[ elements_per_quad * real_index + i ] = 4 * real_index + element_quad_base[ i ];
+            }
+        }
+    }
+
+    sys->visible_elements = k;
+    sys->elements_compacted = sys->hidden_count > 0;
+    sys->elements_need_rebuild = false;
+    sys->element_buffer_dirty = true;
+
+    return 0;
+}
+
 int bsgl_system_upload_vertex_buffer( System *sys ) {
+    /* clean runs shorter than this between dirty ones are sent along
+       rather than split into another call */
+    const int max_gap = 8;
+    struct bsgl_array *arr = &sys->vertex_buffer;
+    const int element_size = arr->element_size;
+
     glBindBuffer( GL_ARRAY_BUFFER, sys->vertex_buffer_id );
-    glBufferData( GL_ARRAY_BUFFER, sys->vertex_buffer.element_size * sys->vertex_buffer.number_of_elements, sys->vertex_buffer.data, GL_DYNAMIC_DRAW );
 
+    if( sys->uploaded_capacity != arr->capacity ) {
+        glBufferData( GL_ARRAY_BUFFER, element_size * arr->capacity, arr->data, GL_DYNAMIC_DRAW );
+        sys->uploaded_capacity = arr->capacity;
+    } else {
+        int real_index = 0;
+        while( real_index < arr->number_of_elements ) {
+            if( !sys->dirty[ real_index ] ) {
+                real_index++;
+                continue;
+            }
+            const int start = real_index;
+            int end = real_index + 1;
+            int gap = 0;
+            for(real_index = end; real_index < arr->number_of_elements && gap < max_gap; real_index++) {
+                if( sys->dirty[ real_index ] ) {
+                    end = real_index + 1;
+                    gap = 0;
+                } else {
+                    gap++;
+                }
+            }
+            glBufferSubData( GL_ARRAY_BUFFER, element_size * start, element_size * (end - start), &arr->data[ element_size * start ] );
+            real_index = end;
+        }
+    }
+
+    if( sys->dirty ) {
+        memset( sys->dirty, 0, arr->capacity );
+    }
     sys->vertex_buffer_dirty = false;
 
     return 0;
@@ -181,6 +569,16 @@ int bsgl_system_upload_element_buffer( System *sys ) {
 }
 
 int bsgl_system_refresh( System *sys ) {
+    if( bsgl_system_apply_transforms( sys ) ) {
+        return 1;
+    }
+
+    if( sys->elements_need_rebuild ) {
+        if( bsgl_system_rebuild_elements( sys ) ) {
+            return 1;
+        }
+    }
+
     if( sys->element_buffer_dirty ) {
         if( bsgl_system_upload_element_buffer( sys ) ) {
             return 1;
@@ -229,7 +627,9 @@ int bsgl_system_draw( System *sys ) {
         return 1;
     }
 
-    glDrawElements( GL_TRIANGLES, 6 * sys->vertex_buffer.number_of_elements, GL_UNSIGNED_SHORT, (void*) 0 );
+    const int quads = sys->elements_compacted ? sys->visible_elements : sys->vertex_buffer.number_of_elements;
+
+    glDrawElements( GL_TRIANGLES, 6 * quads, GL_UNSIGNED_SHORT, (void*) 0 );
 
     if( bsgl_system_unbind_vertex_attributes( sys ) ) {
         return 1;
@@ -295,6 +695,25 @@ static int System_init(System *self, PyObject *args, PyObject *kwargs) {
         self->element_buffer_dirty = true;
         self->vertex_buffer_dirty = true;
 
+        self->hidden = NULL;
+        self->dirty = NULL;
+        self->transforms = NULL;
+        self->transform_live = NULL;
+        self->transform_dirty = NULL;
+        self->transform_first = NULL;
+        self->free_transforms = NULL;
+        self->free_transform_count = 0;
+        self->transform_capacity = 0;
+        self->transforms_dirty = false;
+        self->transform_of = NULL;
+        self->transform_next = NULL;
+        self->transform_previous = NULL;
+        self->uploaded_capacity = -1;
+        self->hidden_count = 0;
+        self->visible_elements = 0;
+        self->elements_compacted = false;
+        self->elements_need_rebuild = false;
+
         if( bsgl_array_initialize( &self->vertex_buffer, floats_per_vertex * 4 * sizeof (GLfloat)) ) {
             break;
         }
@@ -402,7 +821,7 @@ PyObject *System_reserve(System *self, PyObject *args) {
 }
 
 PyObject *System_add(System *self, PyObject *args, PyObject *kwargs) {
-    static char *kwlist[] = { "position", "offset", "angle", "size", "internal_angle", "texture_coordinates", "texture_size", "colour" };
+    static char *kwlist[] = { "position", "offset", "angle", "size", "internal_angle", "texture_coordinates", "texture_size", "colour", "transform", NULL };
 
     double position[] = { 0.0, 0.0 };
     double offset[] = { 0.0, 0.0 };
@@ -412,10 +831,11 @@ PyObject *System_add(System *self, PyObject *args, PyObject *kwargs) {
     double texsize[] = { 1.0, 1.0 };
     double rgba[] = { 1.0, 1.0, 1.0, 1.0 };
     double internal_angle = 0.0;
+    int transform = -1;
 
     if( !PyArg_ParseTupleAndKeywords( args,
                                       kwargs,
-                                      "|(dd)(dd)d(dd)d(dd)(dd)(dddd)",
+                                      "|(dd)(dd)d(dd)d(dd)(dd)(dddd)i",
                                       kwlist, 
                                       &position[0], &position[1],
                                       &offset[0], &offset[1],
@@ -424,7 +844,13 @@ PyObject *System_add(System *self, PyObject *args, PyObject *kwargs) {
                                       &internal_angle,
                                       &texcoords[0], &texcoords[1],
                                       &texsize[0], &texsize[1],
-                                      &rgba[0], &rgba[1], &rgba[2], &rgba[3] ) ) {
+                                      &rgba[0], &rgba[1], &rgba[2], &rgba[3],
+                                      &transform ) ) {
+        return NULL;
+    }
+
+    if( transform != -1 && !bsgl_system_is_live_transform( self, transform ) ) {
+        PyErr_SetString( PyExc_IndexError, "no such transform" );
         return NULL;
     }
 
@@ -434,6 +860,10 @@ PyObject *System_add(System *self, PyObject *args, PyObject *kwargs) {
         return NULL;
     }
 
+    if( transform != -1 ) {
+        bsgl_system_attach_transform( self, index, transform );
+    }
+
     return Py_BuildValue( "i", index );
 }
 
@@ -457,7 +887,150 @@ PyObject *System_update_position_and_angle(System *self, PyObject *args) {
         floats[ i * floats_per_vertex + 2 ] = angle;
     }
 
-    self->vertex_buffer_dirty = true;
+    bsgl_system_mark_dirty( self, index );
+
+    Py_INCREF( Py_None );
+    return Py_None;
+}
+
+static bool buffer_has_format( Py_buffer *buffer, char code, int itemsize ) {
+    const char *format = buffer->format ? buffer->format : "B";
+    if( *format == '@' || *format == '=' || *format == '<' ) {
+        format++;
+    }
+    return buffer->itemsize == itemsize && format[0] == code && format[1] == '\0';
+}
+
+static void release_transform_buffers( Py_buffer buffers[3] ) {
+    for(int i=0;i<3;i++) {
+        PyBuffer_Release( &buffers[i] );
+    }
+}
+
+/* Gets int32 indices and float64 positions and angles from args into
+   buffers, and their count into n; on success the buffers must be
+   released with release_transform_buffers. */
+static int get_transform_buffers( PyObject *args, Py_buffer buffers[3], int *n ) {
+    PyObject *objects[3];
+
+    if( !PyArg_ParseTuple( args, "OOO", &objects[0], &objects[1], &objects[2] ) ) {
+        return 1;
+    }
+
+    for(int i=0;i<3;i++) {
+        if( PyObject_GetBuffer( objects[i], &buffers[i], PyBUF_C_CONTIGUOUS | PyBUF_FORMAT ) ) {
+            while( i-- > 0 ) {
+                PyBuffer_Release( &buffers[i] );
+            }
+            return 1;
+        }
+    }
+
+    if( !buffer_has_format( &buffers[0], 'i', sizeof (int) ) ||
+        !buffer_has_format( &buffers[1], 'd', sizeof (double) ) ||
+        !buffer_has_format( &buffers[2], 'd', sizeof (double) ) ) {
+        PyErr_SetString( PyExc_TypeError, "expected int32 indices and float64 positions and angles" );
+        release_transform_buffers( buffers );
+        return 1;
+    }
+
+    *n = buffers[0].len / sizeof (int);
+
+    if( buffers[1].len != 2 * *n * sizeof (double) || buffers[2].len != *n * sizeof (double) ) {
+        PyErr_SetString( PyExc_ValueError, "expected one position and one angle per index" );
+        release_transform_buffers( buffers );
+        return 1;
+    }
+
+    return 0;
+}
+
+PyObject *System_update_positions_and_angles(System *self, PyObject *args) {
+    Py_buffer buffers[3];
+    int n;
+
+    if( get_transform_buffers( args, buffers, &n ) ) {
+        return NULL;
+    }
+
+    int error = bsgl_system_update_transforms( self, n, buffers[0].buf, buffers[1].buf, buffers[2].buf );
+    release_transform_buffers( buffers );
+
+    if( error ) {
+        PyErr_SetString( PyExc_IndexError, "no such element" );
+        return NULL;
+    }
+
+    Py_INCREF( Py_None );
+    return Py_None;
+}
+
+PyObject *System_add_transform(System *self, PyObject *args, PyObject *kwargs) {
+    static char *kwlist[] = { "position", "angle", NULL };
+    double position[] = { 0.0, 0.0 };
+    double angle = 0.0;
+
+    if( !PyArg_ParseTupleAndKeywords( args, kwargs, "|(dd)d", kwlist, &position[0], &position[1], &angle ) ) {
+        return NULL;
+    }
+
+    int slot = -1;
+
+    if( bsgl_system_add_transform( self, &slot, position, angle ) ) {
+        return PyErr_NoMemory();
+    }
+
+    return Py_BuildValue( "i", slot );
+}
+
+PyObject *System_remove_transform(System *self, PyObject *args) {
+    int slot = -1;
+    if( !PyArg_ParseTuple( args, "i", &slot ) ) {
+        return NULL;
+    }
+
+    if( bsgl_system_remove_transform( self, slot ) ) {
+        PyErr_SetString( PyExc_IndexError, "no such transform" );
+        return NULL;
+    }
+
+    Py_INCREF( Py_None );
+    return Py_None;
+}
+
+PyObject *System_update_transform(System *self, PyObject *args) {
+    int slot = -1;
+    double position[2];
+    double angle;
+
+    if( !PyArg_ParseTuple( args, "i(dd)d", &slot, &position[0], &position[1], &angle ) ) {
+        return NULL;
+    }
+
+    if( bsgl_system_set_transforms( self, 1, &slot, position, &angle ) ) {
+        PyErr_SetString( PyExc_IndexError, "no such transform" );
+        return NULL;
+    }
+
+    Py_INCREF( Py_None );
+    return Py_None;
+}
+
+PyObject *System_update_transforms(System *self, PyObject *args) {
+    Py_buffer buffers[3];
+    int n;
+
+    if( get_transform_buffers( args, buffers, &n ) ) {
+        return NULL;
+    }
+
+    int error = bsgl_system_set_transforms( self, n, buffers[0].buf, buffers[1].buf, buffers[2].buf );
+    release_transform_buffers( buffers );
+
+    if( error ) {
+        PyErr_SetString( PyExc_IndexError, "no such transform" );
+        return NULL;
+    }
 
     Py_INCREF( Py_None );
     return Py_None;
@@ -509,6 +1082,26 @@ PyObject *System_remove(System *self, PyObject *args) {
     return Py_None;
 }
 
+PyObject *System_set_hidden(System *self, PyObject *args) {
+    int index = -1;
+    int hidden = 1;
+    if( !PyArg_ParseTuple( args, "i|i", &index, &hidden ) ) {
+        return NULL;
+    }
+
+    if( bsgl_system_set_hidden( self, index, hidden != 0 ) ) {
+        PyErr_SetString( PyExc_IndexError, "no such element" );
+        return NULL;
+    }
+
+    Py_INCREF( Py_None );
+    return Py_None;
+}
+
+PyObject *System_get_number_of_visible_elements(System *self, PyObject *args) {
+    return Py_BuildValue( "i", self->vertex_buffer.number_of_elements - self->hidden_count );
+}
+
 PyObject *System_get_capacity(System *self, PyObject *args) {
     return Py_BuildValue( "i", self->vertex_buffer.capacity );
 }
@@ -531,11 +1124,30 @@ PyMethodDef System_methods[] = {
     { "get_capacity", (PyCFunction) System_get_capacity, METH_NOARGS, "Get the number of elements for which space has been allocated." },
     { "get_number_of_elements", (PyCFunction) System_get_number_of_elements, METH_NOARGS, "Get the number of elements." },
     { "update_position_and_angle", (PyCFunction) System_update_position_and_angle, METH_VARARGS, "Update one element by setting its angle and center of mass position." },
+    { "update_positions_and_angles", (PyCFunction) System_update_positions_and_angles, METH_VARARGS, "Update many elements at once from contiguous buffers: int32 indices, float64 positions (two per index) and float64 angles." },
+    { "add_transform", (PyCFunction) System_add_transform, METH_VARARGS | METH_KEYWORDS, "Add a transform slot and return it; elements added with transform = slot follow it." },
+    { "remove_transform", (PyCFunction) System_remove_transform, METH_VARARGS, "Remove a transform slot; elements still attached keep its last transform." },
+    { "update_transform", (PyCFunction) System_update_transform, METH_VARARGS, "Set the position and angle of a transform slot." },
+    { "update_transforms", (PyCFunction) System_update_transforms, METH_VARARGS, "Set many transform slots at once from contiguous buffers, as update_positions_and_angles." },
+    { "set_hidden", (PyCFunction) System_set_hidden, METH_VARARGS, "Hide an element by its index (or show it again with a false second argument); hidden elements are not drawn." },
+    { "get_number_of_visible_elements", (PyCFunction) System_get_number_of_visible_elements, METH_NOARGS, "Get the number of elements that are not hidden." },
     { NULL }
 };
 
 static void System_dealloc(System *self) {
     fprintf( stderr, "Deallocating a System object\n" );
+    bsgl_array_destroy( &self->vertex_buffer );
+    free( self->element_buffer_data );
+    free( self->hidden );
+    free( self->dirty );
+    free( self->transform_of );
+    free( self->transform_next );
+    free( self->transform_previous );
+    free( self->transforms );
+    free( self->transform_live );
+    free( self->transform_dirty );
+    free( self->transform_first );
+    free( self->free_transforms );
     // Py_XDECREF members
     self->ob_type->tp_free( (PyObject*) self );
 }
@@ -20,6 +20,41 @@ typedef struct {
     bool element_buffer_dirty;
     bool vertex_buffer_dirty;
 
+    /* Hidden elements are left out of the element buffer, which then
+       lists only the visible quads. hidden is indexed by the index
+       handed out by add. */
+    unsigned char *hidden;
+    int hidden_count;
+    int visible_elements;
+    bool elements_compacted;
+    bool elements_need_rebuild;
+
+    /* Quads changed since the last upload, indexed by real index;
+       only runs of these are sent once the GL buffer has room for
+       the whole array. */
+    unsigned char *dirty;
+    int uploaded_capacity;
+
+    /* Transform slots, one per ship: an element attached to a slot
+       takes its position and angle from it, copied into its quad when
+       the system is refreshed, so moving a ship is one update.
+       transforms holds x, y and angle per slot; transform_of is
+       indexed like hidden, and -1 for elements without a slot. The
+       elements of each slot form a list through transform_next and
+       transform_previous starting at transform_first[ slot ], so a
+       slot is applied or freed without visiting other elements. */
+    double *transforms;
+    unsigned char *transform_live;
+    unsigned char *transform_dirty;
+    int *transform_first;
+    int *free_transforms;
+    int free_transform_count;
+    int transform_capacity;
+    bool transforms_dirty;
+    int *transform_of;
+    int *transform_next;
+    int *transform_previous;
+
     int texture_id;
 
     int stride;
@@ -51,6 +86,21 @@ int bsgl_system_reallocate_elements( System *sys );
 int bsgl_system_add( System *sys, int *out_index, double com_position[2], double offset[2], double angle, double sz[2], double internal_angle, double tint[4], double texcoords[2], double texsize[2] );
 int bsgl_system_remove( System *sys, int index );
 
+bool bsgl_system_is_live( System *sys, int index );
+int bsgl_system_set_hidden( System *sys, int index, bool hidden );
+int bsgl_system_update_transforms( System *sys, int n, const int *indices, const double *positions, const double *angles );
+int bsgl_system_rebuild_elements( System *sys );
+
+void bsgl_system_mark_dirty( System *sys, int index );
+
+bool bsgl_system_is_live_transform( System *sys, int slot );
+int bsgl_system_add_transform( System *sys, int *out_slot, double position[2], double angle );
+int bsgl_system_remove_transform( System *sys, int slot );
+int bsgl_system_set_transforms( System *sys, int n, const int *slots, const double *positions, const double *angles );
+int bsgl_system_attach_transform( System *sys, int index, int slot );
+void bsgl_system_detach_transform( System *sys, int index );
+int bsgl_system_apply_transforms( System *sys );
+
 int bsgl_system_upload_vertex_buffer( System *sys );
 int bsgl_system_upload_element_buffer( System *sys );
 int bsgl_system_refresh( System *sys );
@@ -0,0 +1,126 @@
+import physics
+import projectile
+import component
+import targeting
+import ai
+import graphics
+import random
+import pymunk
+
+from physics import ConvexPolygonShape, Vec2d
+
+from util import *
+
+from functools import partial
+
+from world import World
+
+from ship import Debris
+
+def create_square_thing(world, layer, position, image):
+    points = [(0,0),(32,0),(32,32),(0,32)]
+    shape = ConvexPolygonShape(*points)
+    shape.translate( shape.centroid() * -1)
+    moment = pymunk.moment_for_poly( 1.0, shape.vertices )
+    rv = Debris( world, layer, position, shape, image, moment = moment, collision_type = physics.CollisionTypes["main"] )
+    return rv
+
+class CombatWorld (World):
+    # The simulation half of a game world: physics, ships, projectiles
+    # and AI. Subclasses provide self.atlas and self.object_psys, which
+    # may be a real bsgl.System or a stand-in with the same interface.
+    def setup_simulation(self):
+        self.sim = physics.PhysicsSimulator( timestep = None )
+        self.things = []
+        self.psys_managed_things = []
+        self.psys_hidden = set()
+        self.onscreen = None
+        # nothing in the space is thinner than half the side of a block
+        self.projectiles = projectile.ProjectileSystem( self, min_target_size = 16.0 )
+        self.power_bank = component.PowerBank()
+        self.ai = ai.AIController( self )
+        self.targeting = targeting.TargetingService( self )
+        self.post_physics.add_hook( self.power_bank, self.power_bank.tick )
+        self.sim.space.add_collision_handler( physics.CollisionTypes["main"], physics.CollisionTypes["bullet"], self.collide_general_with_bullet )
+        self.physics.add_anonymous_hook( self.sim.tick )
+        self.pre_display.add_anonymous_hook( self.update_visibility, priority = -1 )
+        # everything drawn through object_psys queues its transforms here
+        self.object_transforms = graphics.TransformBatch( self.object_psys )
+        self.pre_display.add_hook( self.object_transforms, self.object_transforms.flush, priority = 1 )
+    def add_ai_ship(self, actor, target, flee = False):
+        self.ai.add( actor, target, fire = partial( self.shoot_volley, actor ), flee = flee )
+        self.pre_physics.add_hook( actor, actor.update )
+    def create_debris_squares(self, n, spread = 4000.0, velocity = (300,10)):
+        for i in range(n):
+            sq = create_square_thing( self, None, (100,0), None )
+            sq.position = (random.random()-0.5) * spread, (random.random()-0.5) * spread
+            sq.angle_radians = random.random() * math.pi * 2
+            sq.mylabel = sq.position
+            sq.velocity = velocity
+            kw = {}
+            name = "polygon_normals.4.generated"
+            kw[ "size" ] = Vec2d(106.6666666,106.6666666)
+            kw[ "texture_coordinates" ] = self.atlas.texcoords( name )
+            kw[ "texture_size" ] = self.atlas.texsize( name )
+            kw[ "position" ] = sq.position
+            kw[ "angle" ] = sq.angle_radians
+            kw[ "colour" ] = 1.0, 0.5, 0.5, 1.0
+            index = self.object_psys.add( **kw )
+            self.psys_managed_things.append( (sq, index) )
+            self.things.append( sq )
+    def shoot_volley(self, shooter):
+        guns = shooter.ready_guns()
+        index = 0
+        for gun in guns:
+            if not gun.may_activate():
+                continue
+            gun.shoot( shooter )
+            gun.activated( index )
+    def view_box(self):
+        # (center, size) of the area being drawn, or None to draw
+        # everything.
+        return None
+    def update_visibility(self):
+        box = self.view_box()
+        if box == None:
+            self.onscreen = None
+        else:
+            center, size = box
+            self.onscreen = graphics.onscreen_things( self.sim.space, center, size )
+    def update_psys_managed_objects(self):
+        alpha = self.interpolation_alpha
+        if self.onscreen != None:
+            graphics.update_visible_objects( self.onscreen, self.psys_managed_things, self.object_psys, self.psys_hidden, alpha, self.object_transforms )
+            return
+        if self.psys_hidden:
+            for index in self.psys_hidden:
+                self.object_psys.set_hidden( index, False )
+            self.psys_hidden.clear()
+        for thing, index in self.psys_managed_things:
+            position, angle = thing.interpolated_transform( alpha )
+            self.object_transforms.add( index, position, angle )
+    def collide_general_with_bullet(self, space, arbiter ):
+        anything, bullet = arbiter.shapes
+        return self.bullet_hit( anything, bullet )
+    def bullet_hit(self, anything, bullet):
+        try:
+            thing = anything.thing
+            index = anything.extra_info
+        except AttributeError:
+            bullet.thing.ttl = min( bullet.thing.ttl, 0.05 )
+            return False
+        if bullet.thing.inert:
+            return False
+        if (bullet.thing.shooter == thing) and bullet.thing.grace > 0.0:
+            return False
+        try:
+            block = thing.block_structure.blocks[ index ]
+            hp = block.hp
+        except KeyError:
+            return False
+        except AttributeError:
+            return False
+        bullet.thing.impact( thing = thing, block_index = index, block = block )
+        bullet.thing.inert = True
+        bullet.thing.ttl = min( bullet.thing.ttl, 0.05 )
+        return False
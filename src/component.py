@@ -1,10 +1,12 @@
 from pymunk import Vec2d
 import math
+import numpy
 import graphics
 
 from util import *
 
 import serialization
+import propulsion
 
 class Component (object):
     def __init__(self, block, required_edges = (), name = None):
@@ -12,6 +14,7 @@ class Component (object):
         self.block = block
         self.required_edges = required_edges
         self.block.components.append( self )
+        self.attached = False
 
     def attach(self, thing):
         pass
@@ -57,13 +60,116 @@ class Component (object):
 class OutOfPower (Exception):
     pass
 
+class PowerBank (object):
+    # Power state for many supplies in parallel arrays, one slot per
+    # supply, so that a whole fleet is ticked in one pass. Consumption is
+    # kept per channel (a column per consumption key, assigned in the
+    # order keys are first seen). tick leaves a bitmask of the channels
+    # each slot could not pay for in self.failed and reports them to the
+    # supply's consumption_fails_hook.
+    max_channels = 63
+    def __init__(self, capacity = 16):
+        self.channels = []
+        self.channel_bits = {}
+        self.supplies = []
+        self.power = numpy.zeros( 0 )
+        self.max_storage = numpy.zeros( 0 )
+        self.production = numpy.zeros( 0 )
+        self.consumption = numpy.zeros( (0,0) )
+        self.failed = numpy.zeros( 0, dtype = numpy.int64 )
+        self.active = numpy.zeros( 0, dtype = bool )
+        self.free_slots = []
+        self.grow( capacity )
+    def grow(self, capacity):
+        old = len( self.supplies )
+        if capacity <= old:
+            return
+        extra = capacity - old
+        for name in ("power", "max_storage", "production", "consumption", "failed", "active"):
+            array = getattr( self, name )
+            setattr( self, name, numpy.concatenate( (array, numpy.zeros( (extra,) + array.shape[1:], dtype = array.dtype )) ) )
+        self.supplies.extend( [ None ] * extra )
+        self.free_slots.extend( reversed( range(old, capacity) ) )
+    def channel(self, key):
+        try:
+            return self.channel_bits[ key ]
+        except KeyError:
+            assert len( self.channels ) < self.max_channels
+            rv = self.channel_bits[ key ] = len( self.channels )
+            self.channels.append( key )
+            self.consumption = numpy.concatenate( (self.consumption, numpy.zeros( (len(self.supplies),1) )), axis = 1 )
+            return rv
+    def allocate(self, supply):
+        if not self.free_slots:
+            self.grow( max( 1, 2 * len( self.supplies ) ) )
+        slot = self.free_slots.pop()
+        self.supplies[ slot ] = supply
+        self.power[ slot ] = 0.0
+        self.max_storage[ slot ] = 0.0
+        self.production[ slot ] = 0.0
+        self.consumption[ slot ] = 0.0
+        self.failed[ slot ] = 0
+        self.active[ slot ] = True
+        return slot
+    def release(self, slot):
+        self.active[ slot ] = False
+        self.supplies[ slot ] = None
+        self.free_slots.append( slot )
+    def tick(self, dt, slots = None):
+        if slots == None:
+            slots = numpy.flatnonzero( self.active )
+        if not len( slots ):
+            return
+        power = self.power[ slots ] + self.production[ slots ] * dt
+        costs = self.consumption[ slots ] * dt
+        failed = numpy.zeros( len( slots ), dtype = numpy.int64 )
+        # channels are paid for one after another, as far as power lasts
+        for bit in range( len( self.channels ) ):
+            cost = costs[:,bit]
+            short = power < cost
+            power -= numpy.where( short, 0.0, cost )
+            failed |= short.astype( numpy.int64 ) << bit
+        self.power[ slots ] = numpy.minimum( power, self.max_storage[ slots ] )
+        self.failed[ slots ] = failed
+        for i in numpy.flatnonzero( failed ):
+            supply = self.supplies[ slots[i] ]
+            mask = int( failed[i] )
+            for bit, key in enumerate( self.channels ):
+                if mask & (1 << bit):
+                    supply.consumption_fails_hook( key )
+    def __len__(self):
+        return int( self.active.sum() )
+
 class PowerSupply (object):
-    def __init__(self, max_storage):
-        self.max_storage = max_storage
+    # A view on one slot of a PowerBank. Without a bank the supply gets
+    # one of its own and is ticked by calling tick; a supply in a shared
+    # bank is managed, and ticked along with the rest of the bank.
+    def __init__(self, max_storage, bank = None):
+        self.managed = bank != None
+        if not self.managed:
+            bank = PowerBank( capacity = 1 )
+        self.bank = bank
+        self.slot = bank.allocate( self )
         self.production = {}
         self.consumption = {}
-        self.power = 0.0
-        self.consumption_fails_hook = lambda x : x.lose_power()
+        self.max_storage = max_storage
+        self.consumption_fails_hook = lambda key : None
+    @property
+    def power(self):
+        return float( self.bank.power[ self.slot ] )
+    @power.setter
+    def power(self, value):
+        self.bank.power[ self.slot ] = value
+    @property
+    def max_storage(self):
+        return float( self.bank.max_storage[ self.slot ] )
+    @max_storage.setter
+    def max_storage(self, value):
+        self.bank.max_storage[ self.slot ] = value
+    @property
+    def failed_channels(self):
+        mask = int( self.bank.failed[ self.slot ] )
+        return [ key for bit, key in enumerate( self.bank.channels ) if mask & (1 << bit) ]
     def increase_capacity(self, amount):
         self.max_storage += amount
     def decrease_capacity(self, amount):
@@ -71,20 +177,43 @@ class PowerSupply (object):
         self.power = max(0, min( self.max_storage, self.power ) )
     def set_production(self, key, amount):
         self.production[key] = amount
+        self.bank.production[ self.slot ] = sum( self.production.values() )
     def set_consumption(self, key, amount):
         self.consumption[key] = amount
+        bit = self.bank.channel( key )
+        self.bank.consumption[ self.slot, bit ] = amount
     def remove_production(self, key):
         del self.production[key]
+        self.bank.production[ self.slot ] = sum( self.production.values() )
     def remove_consumption(self, key):
         del self.consumption[key]
+        self.bank.consumption[ self.slot, self.bank.channel_bits[ key ] ] = 0.0
+    def clear(self):
+        # Drops all production, consumption and capacity; the stored
+        # power is kept, for the caller to clamp once capacity is back.
+        self.production = {}
+        self.consumption = {}
+        self.bank.production[ self.slot ] = 0.0
+        self.bank.consumption[ self.slot ] = 0.0
+        self.max_storage = 0.0
+    def release(self):
+        # Leaves a shared bank, keeping the current state in a bank of
+        # this supply's own.
+        if not self.managed:
+            return
+        old, slot = self.bank, self.slot
+        self.bank = PowerBank( capacity = 1 )
+        self.slot = self.bank.allocate( self )
+        self.managed = False
+        self.power = old.power[ slot ]
+        self.max_storage = old.max_storage[ slot ]
+        self.bank.production[ self.slot ] = old.production[ slot ]
+        for key, amount in self.consumption.items():
+            bit = self.bank.channel( key )
+            self.bank.consumption[ self.slot, bit ] = amount
+        old.release( slot )
     def tick(self, dt):
-        self.power += sum( self.production.values() ) * dt
-        for key, value in self.consumption.items():
-            try:
-                self.consume( value * dt )
-            except OutOfPower:
-                self.consumption_fails_hook( key )
-        self.power = min( self.power, self.max_storage )
+        self.bank.tick( dt, [ self.slot ] )
     def charge_rate(self):
         if self.max_storage == 0:
             return 0.0
@@ -146,10 +275,14 @@ class GeneratorComponent (Component):
         self.production = production
 
     def attach(self, thing):
-        thing.psu.set_production( self, self.production )
+        if not self.attached:
+            thing.psu.set_production( self, self.production )
+            self.attached = True
 
     def detach(self, thing):
-        thing.psu.remove_production( self )
+        if self.attached:
+            thing.psu.remove_production( self )
+            self.attached = False
 
 class BatteryComponent (Component):
     name = "battery"
@@ -159,10 +292,14 @@ class BatteryComponent (Component):
         self.storage = storage
 
     def attach(self, thing):
-        thing.psu.increase_capacity( self.storage )
+        if not self.attached:
+            thing.psu.increase_capacity( self.storage )
+            self.attached = True
 
     def detach(self, thing):
-        thing.psu.decrease_capacity( self.storage )
+        if self.attached:
+            thing.psu.decrease_capacity( self.storage )
+            self.attached = False
     
 class GunComponent (PointComponent):
     name = "gun"
@@ -190,13 +327,14 @@ class GunComponent (PointComponent):
         self.last_usage = (self.world.t, activation_sequence_no )
 
     def attach(self, thing):
-        if self.required_edges_free():
+        if not self.attached and self.required_edges_free():
             thing.weapons.append( self )
             self.attached = True
 
     def detach(self, thing):
         if self.attached:
-            self.thing.weapons.remove( self )
+            thing.weapons.remove( self )
+            self.attached = False
 
     def create_sheet_info(self, atlas):
         import blocks
@@ -236,13 +374,14 @@ class DumbMissileLauncherComponent (PointComponent):
         self.last_usage = (self.world.t, activation_sequence_no )
 
     def attach(self, thing):
-        if self.required_edges_free():
+        if not self.attached and self.required_edges_free():
             thing.weapons.append( self )
             self.attached = True
 
     def detach(self, thing):
         if self.attached:
-            self.thing.weapons.remove( self )
+            thing.weapons.remove( self )
+            self.attached = False
 
     def create_sheet_info(self, atlas):
         import blocks
@@ -255,6 +394,39 @@ class DumbMissileLauncherComponent (PointComponent):
         import projectile
         projectile.create_dumb_missile( self.world, shooter, self )
 
+class HitscanComponent (GunComponent):
+    # A gun whose shots arrive instantly: each shot is a single ray cast
+    # and a brief trace, with no projectile body.
+    name = "hitscan"
+
+    def __init__(self, block, position, angle_degrees, cooldown, cost, required_edge, reach = 1000.0, damage = 1):
+        super( HitscanComponent, self ).__init__( block = block, position = position, angle_degrees = angle_degrees, cooldown = cooldown, cost = cost, required_edge = required_edge )
+        self.reach = reach
+        self.damage = damage
+
+    def create_sheet_info(self, atlas):
+        rv = super( HitscanComponent, self ).create_sheet_info( atlas )
+        rv[ "colour" ] = 1.0, 1.0, 0.0, 1.0
+        return rv
+
+    def shoot(self, shooter):
+        import projectile
+        projectile.fire_hitscan( self.world, shooter, self, self.reach, self.damage )
+
+class SmartMissileLauncherComponent (GunComponent):
+    # Fires missiles that lock onto the nearest hostile after a delay;
+    # all of them are steered together by the world's ProjectileSystem.
+    name = "smart-missile-launcher"
+
+    def create_sheet_info(self, atlas):
+        rv = super( SmartMissileLauncherComponent, self ).create_sheet_info( atlas )
+        rv[ "colour" ] = 1.0, 0.4, 0.0, 1.0
+        return rv
+
+    def shoot(self, shooter):
+        import projectile
+        projectile.create_smart_missile( self.world, shooter, self )
+
 class EngineComponent (PointComponent):
     name = "engine"
 
@@ -265,26 +437,19 @@ class EngineComponent (PointComponent):
         self.attached = False
 
     def attach(self, thing):
-        if self.required_edges_free():
+        if not self.attached and self.required_edges_free():
             self.attached = True
-            self.thing.engines.append( self )
-            thing.thrust_power += self.power_thrusting()
-            thing.turn_power += self.power_turning()
-            thing.brake_power += self.power_braking()
-            thing.engine_power_drain += self.engine_power_cost
+            thing.engines.append( self )
+            thing.propulsion.add( self )
 
     def detach(self, thing):
         if self.attached:
-            self.thing.engines.remove( self )
-            thing.thrust_power -= self.power_thrusting()
-            thing.turn_power -= self.power_turning()
-            thing.brake_power -= self.power_braking()
-            thing.engine_power_drain -= self.engine_power_cost
+            thing.engines.remove( self )
+            thing.propulsion.remove( self )
+            self.attached = False
 
     def efficiency_at_angle( self, deg ):
-        deg_from_ideal = degrees_sub( self.angle_from_thing_degrees, deg + 180 )
-        x = math.cos( degrees_to_radians( deg_from_ideal ) )
-        return 0.1 + 0.9 * 0.5 * (1+x)
+        return propulsion.engine_efficiency( self.angle_from_thing_degrees, deg )
 
     def efficiency_forwards( self ):
         return self.efficiency_at_angle(0)
@@ -314,6 +479,8 @@ class EngineComponent (PointComponent):
 serialization.register( EngineComponent )
 serialization.register( GunComponent )
 serialization.register( DumbMissileLauncherComponent )
+serialization.register( HitscanComponent )
+serialization.register( SmartMissileLauncherComponent )
 serialization.register( GeneratorComponent )
 serialization.register( BatteryComponent )
 
@@ -0,0 +1,280 @@
+import numpy
+
+# A reference implementation, in Python, of the element store behind
+# bsgl.System (see notes/cmodule-optimization). The quads are kept
+# dense: element handles map to real positions in the vertex array
+# through virtual_to_real/real_to_virtual, and removing an element moves
+# the last one into its place, so the live elements are always the
+# first n. Changed real positions are recorded and handed out as
+# ranges on upload, so an upload covers only live, changed data.
+#
+# It has the same interface as bsgl.System and needs no OpenGL; the
+# vertex layout is the one bsgl_system_add writes. Elements may be
+# attached to a transform slot, whose position and angle are copied
+# into them on upload.
+
+FloatsPerVertex = 12
+VerticesPerElement = 4
+
+QuadXs = numpy.array( [0, 1, 0, 1], dtype = numpy.float64 )
+QuadYs = numpy.array( [0, 0, 1, 1], dtype = numpy.float64 )
+
+class DirtyRanges (object):
+    # The real positions changed since the last upload.
+    def __init__(self, capacity = 0):
+        self.marked = numpy.zeros( capacity, dtype = bool )
+        self.any = False
+
+    def grow(self, capacity):
+        extra = capacity - len( self.marked )
+        if extra > 0:
+            self.marked = numpy.concatenate( (self.marked, numpy.zeros( extra, dtype = bool )) )
+
+    def mark(self, reals):
+        self.marked[ reals ] = True
+        self.any = True
+
+    def ranges(self, n):
+        # [start, stop) runs of marked positions below n, in order.
+        if not self.any:
+            return []
+        marked = self.marked[:n]
+        edges = numpy.diff( numpy.concatenate( ([False], marked, [False]) ).astype( numpy.int8 ) )
+        starts = numpy.flatnonzero( edges == 1 )
+        stops = numpy.flatnonzero( edges == -1 )
+        return zip( starts.tolist(), stops.tolist() )
+
+    def clear(self):
+        if self.any:
+            self.marked[:] = False
+            self.any = False
+
+class ElementStore (object):
+    def __init__(self, texture_id = None, capacity = 16, upload = None):
+        # upload, if given, is called as upload( start, data ) for every
+        # dirty range when drawing, data being the (stop-start, 4, 12)
+        # float32 slice of the vertex array.
+        self.texture_id = texture_id
+        self.upload_function = upload
+        self.transformation_matrix = None
+        self.number_of_elements = 0
+        self.hidden_count = 0
+        self.data = numpy.zeros( (0, VerticesPerElement, FloatsPerVertex), dtype = numpy.float32 )
+        self.virtual_to_real = numpy.zeros( 0, dtype = int )
+        self.real_to_virtual = numpy.zeros( 0, dtype = int )
+        self.live = numpy.zeros( 0, dtype = bool )
+        self.hidden = numpy.zeros( 0, dtype = bool )
+        self.free_indices = []
+        self.transform_of = numpy.zeros( 0, dtype = int )
+        self.transforms = numpy.zeros( (0,3) )
+        self.transform_live = numpy.zeros( 0, dtype = bool )
+        self.transform_dirty = numpy.zeros( 0, dtype = bool )
+        self.free_transforms = []
+        # the elements attached to each slot, so freeing a slot touches
+        # only those
+        self.transform_members = {}
+        self.dirty = DirtyRanges()
+        self.uploaded_elements = 0
+        self.grow( capacity )
+
+    def grow(self, capacity):
+        old = len( self.data )
+        if capacity <= old:
+            return
+        capacity = max( capacity, 2 * old )
+        extra = capacity - old
+        self.data = numpy.concatenate( (self.data, numpy.zeros( (extra, VerticesPerElement, FloatsPerVertex), dtype = numpy.float32 )) )
+        for name in ("virtual_to_real", "real_to_virtual", "live", "hidden"):
+            array = getattr( self, name )
+            setattr( self, name, numpy.concatenate( (array, numpy.zeros( extra, dtype = array.dtype )) ) )
+        self.transform_of = numpy.concatenate( (self.transform_of, numpy.repeat( -1, extra )) )
+        self.dirty.grow( capacity )
+        # handed out lowest first, as bsgl_array_reserve does
+        self.free_indices = list( reversed( range( old, capacity ) ) ) + self.free_indices
+
+    def reserve(self, n):
+        self.grow( n )
+
+    def is_live(self, index):
+        return 0 <= index < len( self.live ) and self.live[ index ]
+
+    def check_indices(self, indices):
+        indices = numpy.asarray( indices, dtype = int )
+        if len( indices ) and ((indices < 0).any() or (indices >= len( self.live )).any() or not self.live[ indices ].all()):
+            raise IndexError( "no such element" )
+        return indices
+
+    def add(self, position = (0.0,0.0), offset = (0.0,0.0), angle = 0.0, size = (1.0,1.0), internal_angle = 0.0, texture_coordinates = (0.0,0.0), texture_size = (1.0,1.0), colour = (1.0,1.0,1.0,1.0), transform = -1):
+        if transform != -1:
+            if not self.is_live_transform( transform ):
+                raise IndexError( "no such transform" )
+            x, y, angle = self.transforms[ transform ]
+            position = x, y
+        if not self.free_indices:
+            self.grow( self.number_of_elements + 1 )
+        index = self.free_indices.pop()
+        real = self.number_of_elements
+        self.number_of_elements += 1
+        self.virtual_to_real[ index ] = real
+        self.real_to_virtual[ real ] = index
+        self.live[ index ] = True
+        cosa, sina = numpy.cos( internal_angle ), numpy.sin( internal_angle )
+        dx = (QuadXs - 0.5) * size[0]
+        dy = (QuadYs - 0.5) * size[1]
+        quad = self.data[ real ]
+        quad[:,0] = position[0]
+        quad[:,1] = position[1]
+        quad[:,2] = angle
+        quad[:,3:7] = colour
+        quad[:,7] = offset[0] + dx * cosa - dy * sina
+        quad[:,8] = offset[1] + dx * sina + dy * cosa
+        quad[:,9] = texture_coordinates[0] + QuadXs * texture_size[0]
+        quad[:,10] = texture_coordinates[1] + QuadYs * texture_size[1]
+        quad[:,11] = internal_angle
+        self.transform_of[ index ] = transform
+        if transform != -1:
+            self.transform_members[ transform ].add( index )
+        self.dirty.mark( real )
+        return index
+
+    def remove(self, index):
+        if not self.is_live( index ):
+            raise IndexError( "no such element" )
+        real = self.virtual_to_real[ index ]
+        last = self.number_of_elements - 1
+        if real != last:
+            moved = self.real_to_virtual[ last ]
+            self.data[ real ] = self.data[ last ]
+            self.real_to_virtual[ real ] = moved
+            self.virtual_to_real[ moved ] = real
+            self.dirty.mark( real )
+        if self.hidden[ index ]:
+            self.hidden[ index ] = False
+            self.hidden_count -= 1
+        self.live[ index ] = False
+        if self.transform_of[ index ] != -1:
+            self.transform_members[ self.transform_of[ index ] ].discard( index )
+            self.transform_of[ index ] = -1
+        self.number_of_elements = last
+        self.free_indices.append( index )
+
+    def update_position_and_angle(self, index, position, angle):
+        if not self.is_live( index ):
+            raise IndexError( "no such element" )
+        real = self.virtual_to_real[ index ]
+        quad = self.data[ real ]
+        quad[:,0] = position[0]
+        quad[:,1] = position[1]
+        quad[:,2] = angle
+        self.dirty.mark( real )
+
+    def update_positions_and_angles(self, indices, positions, angles):
+        if len( positions ) != len( indices ) or len( angles ) != len( indices ):
+            raise ValueError( "expected one position and one angle per index" )
+        reals = self.virtual_to_real[ self.check_indices( indices ) ]
+        positions = numpy.asarray( positions, dtype = numpy.float64 ).reshape( -1, 2 )
+        self.data[ reals, :, 0 ] = positions[:,0,None]
+        self.data[ reals, :, 1 ] = positions[:,1,None]
+        self.data[ reals, :, 2 ] = numpy.asarray( angles, dtype = numpy.float64 )[:,None]
+        self.dirty.mark( reals )
+
+    def is_live_transform(self, slot):
+        return 0 <= slot < len( self.transform_live ) and self.transform_live[ slot ]
+
+    def add_transform(self, position = (0.0,0.0), angle = 0.0):
+        if not self.free_transforms:
+            old = len( self.transforms )
+            capacity = max( 16, 2 * old )
+            extra = capacity - old
+            self.transforms = numpy.concatenate( (self.transforms, numpy.zeros( (extra,3) )) )
+            self.transform_live = numpy.concatenate( (self.transform_live, numpy.zeros( extra, dtype = bool )) )
+            self.transform_dirty = numpy.concatenate( (self.transform_dirty, numpy.zeros( extra, dtype = bool )) )
+            self.free_transforms = list( reversed( range( old, capacity ) ) ) + self.free_transforms
+        slot = self.free_transforms.pop()
+        self.transforms[ slot ] = position[0], position[1], angle
+        self.transform_live[ slot ] = True
+        self.transform_dirty[ slot ] = False
+        self.transform_members[ slot ] = set()
+        return slot
+
+    def remove_transform(self, slot):
+        # Elements still attached keep the last transform.
+        if not self.is_live_transform( slot ):
+            raise IndexError( "no such transform" )
+        for index in self.transform_members.pop( slot ):
+            self.transform_of[ index ] = -1
+        self.transform_live[ slot ] = False
+        self.transform_dirty[ slot ] = False
+        self.free_transforms.append( slot )
+
+    def update_transform(self, slot, position, angle):
+        if not self.is_live_transform( slot ):
+            raise IndexError( "no such transform" )
+        self.transforms[ slot ] = position[0], position[1], angle
+        self.transform_dirty[ slot ] = True
+
+    def update_transforms(self, slots, positions, angles):
+        if len( positions ) != len( slots ) or len( angles ) != len( slots ):
+            raise ValueError( "expected one position and one angle per index" )
+        slots = numpy.asarray( slots, dtype = int )
+        if len( slots ) and ((slots < 0).any() or (slots >= len( self.transform_live )).any() or not self.transform_live[ slots ].all()):
+            raise IndexError( "no such transform" )
+        self.transforms[ slots, 0:2 ] = numpy.asarray( positions, dtype = numpy.float64 ).reshape( -1, 2 )
+        self.transforms[ slots, 2 ] = angles
+        self.transform_dirty[ slots ] = True
+
+    def apply_transforms(self):
+        # Copies changed slot transforms into the quads attached to them,
+        # visiting only the members of those slots.
+        for slot in numpy.flatnonzero( self.transform_dirty ):
+            members = self.transform_members[ slot ]
+            if not members:
+                continue
+            reals = self.virtual_to_real[ list( members ) ]
+            self.data[ reals, :, 0:3 ] = self.transforms[ slot ]
+            self.dirty.mark( reals )
+        self.transform_dirty[:] = False
+
+    def set_hidden(self, index, hidden = True):
+        if not self.is_live( index ):
+            raise IndexError( "no such element" )
+        hidden = bool( hidden )
+        if self.hidden[ index ] != hidden:
+            self.hidden[ index ] = hidden
+            self.hidden_count += 1 if hidden else -1
+
+    def get_position_and_angle(self, index):
+        quad = self.data[ self.virtual_to_real[ index ] ]
+        return (float( quad[0,0] ), float( quad[0,1] )), float( quad[0,2] )
+
+    def visible_reals(self):
+        # Real positions of the quads to draw, in buffer order.
+        n = self.number_of_elements
+        return numpy.flatnonzero( ~self.hidden[ self.real_to_virtual[:n] ] )
+
+    def get_capacity(self):
+        return len( self.data )
+
+    def get_number_of_elements(self):
+        return self.number_of_elements
+
+    def get_number_of_visible_elements(self):
+        return self.number_of_elements - self.hidden_count
+
+    def set_transformation_matrix(self, matrix):
+        self.transformation_matrix = tuple( matrix )
+
+    def upload(self):
+        # Hands the dirty live ranges to the upload function and returns
+        # them.
+        self.apply_transforms()
+        rv = self.dirty.ranges( self.number_of_elements )
+        for start, stop in rv:
+            if self.upload_function:
+                self.upload_function( start, self.data[start:stop] )
+            self.uploaded_elements += stop - start
+        self.dirty.clear()
+        return rv
+
+    def draw(self):
+        self.upload()
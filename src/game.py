@@ -2,6 +2,7 @@ import graphics
 import physics
 import gameinput
 import ai
+import starfield
 
 from atlas import Atlas
 
@@ -33,22 +34,15 @@ from component import create_component
 
 from operator import attrgetter
 
-from world import World
+from combat import CombatWorld
 
-from ship import Ship, Debris, create_ship_thing
+from ship import Ship, create_ship_thing
 
-def create_square_thing(world, layer, position, image):
-    points = [(0,0),(32,0),(32,32),(0,32)]
-    shape = ConvexPolygonShape(*points)
-    shape.translate( shape.centroid() * -1)
-    moment = pymunk.moment_for_poly( 1.0, shape.vertices )
-    rv = Debris( world, layer, position, shape, image, moment = moment, collision_type = physics.CollisionTypes["main"] )
-    return rv
-
-class MainWorld (World):
-    def __init__(self, window, player_ship_data = None, use_pygame = False, **kwargs):
+class MainWorld (CombatWorld):
+    def __init__(self, window, player_ship_data = None, use_pygame = False, starfield_seed = None, **kwargs):
         super( MainWorld, self ).__init__( **kwargs)
         self.window = window
+        self.starfield_seed = starfield_seed
         resolution = (self.window.width, self.window.height )
         self.setup_graphics( resolution )
         self.setup_game( player_ship_data = player_ship_data )
@@ -64,18 +58,15 @@ class MainWorld (World):
         self.display.add_anonymous_hook( self.scene.update )
         self.player.body.velocity_limit = 800.0 # experiment with this for actually chasing fleeing ships
         self.pre_physics.add_hook( self.player, self.player.update )
-        self.pre_physics.add_hook( self.enemy, lambda dt : ai.ai_seek_target( dt, self.enemy, self.player, partial( self.shoot_volley, self.enemy ) ) )
+        self.add_ai_ship( self.enemy, self.player )
 #        self.pre_physics.add_hook( self.enemy, lambda dt : ai.ai_flee_target( dt, self.enemy, self.player ) )
-        self.pre_physics.add_hook( self.enemy, self.enemy.update )
-        self.pre_physics.add_hook( self.enemy2, lambda dt : ai.ai_seek_target( dt, self.enemy2, self.player, partial( self.shoot_volley, self.enemy2 ) ) )
+        self.add_ai_ship( self.enemy2, self.player )
 #        self.pre_physics.add_hook( self.enemy2, lambda dt : ai.ai_flee_target( dt, self.enemy2, self.player ) )
-        self.pre_physics.add_hook( self.enemy2, self.enemy2.update )
         for x in (self.player, self.enemy, self.enemy2):
             self.post_physics.add_hook( x, x.tick )
             x.add_to_minimap( self.minimap, "solid_white_5x5.png", (0,255,0) if x == self.player else (255,0,0) )
 #        for x in self.things:
 #            x.add_to_minimap( self.minimap, "solid_white_5x5.png", (128,128,128) )
-        self.physics.add_anonymous_hook( self.sim.tick )
         self.scene.schedule( self.update_everything )
     def on_save_ship(self, *args):
         import sys
@@ -87,6 +78,8 @@ class MainWorld (World):
         self.display_update()
     def update_camera(self, dt):
         self.camera.update( dt )
+    def view_box(self):
+        return self.camera.focus, self.main_layer.size
     def setup_pygame(self, resolution):
         pygame.init()
         self.screen = pygame.display.set_mode( resolution )
@@ -94,8 +87,10 @@ class MainWorld (World):
         self.camera = graphics.Camera( self.window )
         self.scene = graphics.Scene( self.window )
         graphics.Layer( self.scene, cocos.layer.ColorLayer( 0, 0, 0, 1 ) )
-        for i in range(8):
-            graphics.Layer( self.scene, graphics.BackgroundCocosLayer( self.camera, 10.0 + 0.5 * i, "starfield{0}.png".format(i) ) )
+        # a fresh sky every run unless starfield_seed fixes it
+        starfields = map( graphics.image_from_array, starfield.generate_starfield_layers( 8, seed = self.starfield_seed ) )
+        for i, image in enumerate( starfields ):
+            graphics.Layer( self.scene, graphics.BackgroundCocosLayer( self.camera, 10.0 + 0.5 * i, image ) )
         self.hud_width = 170
         self.main_layer = graphics.Layer( self.scene )
         self.main_layer.cocos_layer.position = self.camera.offset()
@@ -175,7 +170,7 @@ class MainWorld (World):
         self.post_physics.add_anonymous_hook( ignore_arguments( update_hud ) )
         self.player.reshape_hooks.add_anonymous_hook( recreate_hp_display )
     def setup_game(self, player_ship_data = None):
-        self.sim = physics.PhysicsSimulator( timestep = None )
+        self.setup_simulation()
 #        self.player = create_ship_thing( self, self.main_layer, (500,500), shape = "small", hp = 5 )
         if not player_ship_data:
             self.player = Ship.load_file( "current_garage_ship.yaml", self )
@@ -191,41 +186,13 @@ class MainWorld (World):
         self.enemy2.body.angular_velocity_limit = degrees_to_radians(144*2)
         self.enemy.angle_degrees = random.random() * 360.0
         self.enemy2.angle_degrees = random.random() * 360.0
+        self.targeting.add( self.player, "player" )
+        self.targeting.add( self.enemy, "enemy" )
+        self.targeting.add( self.enemy2, "enemy" )
         self.batch = cocos.batch.BatchNode()
         self.main_layer.cocos_layer.add( self.batch )
         self.physics_objects = []
-        self.things = []
-        self.psys_managed_things = []
-        for i in range(200):
-            cols = "red", "purple", "grey", "blue", "green", "yellow"
-            sq = create_square_thing( self, None, (100,0), None )
-            sq.position = (random.random()-0.5) * 4000, (random.random()-0.5) * 4000
-            sq.angle_radians = random.random() * math.pi * 2
-            sq.mylabel = sq.position
-            sq.velocity = (300,10)
-            kw = {}
-            name = "polygon_normals.4.generated"
-            kw[ "size" ] = Vec2d(106.6666666,106.6666666)
-            kw[ "texture_coordinates" ] = self.atlas.texcoords( name )
-            kw[ "texture_size" ] = self.atlas.texsize( name )
-            z = random.random() * 6.28
-            r = 0.1 + random.random() * 10.0
-            pos = r*math.cos(z), r*math.sin(z)
-            # need to translate from pixel space
-            # [0,self.
-            # to
-            # [-1.3333,1.3333] x [-1,1]
-            p = sq.position
-            p = p + self.main_layer.cocos_layer.position
-            p = Vec2d(p) / Vec2d( self.window.width, self.window.height )
-            p = (p * 2) - Vec2d(1,1)
-            p = p * Vec2d( self.window.width / float(self.window.height), 1 ) 
-            kw[ "position" ] = p
-            kw[ "angle" ] = sq.angle_radians
-            kw[ "colour" ] = 1.0, 0.5, 0.5, 1.0
-            index = self.object_psys.add( **kw )
-            self.psys_managed_things.append( (sq, index) )
-            self.things.append( sq )
+        self.create_debris_squares( 200 )
         def draw_psys():
             # CMSDTv
             # T = translate by self.main_layer.cocos_layer.position
@@ -254,7 +221,6 @@ class MainWorld (World):
             self.hud_psys.set_transformation_matrix( mat )
             self.hud_psys.draw()
         graphics.Layer( self.scene, cocos_layer = graphics.FunctionCocosLayer( draw_psys ) )
-        self.sim.space.add_collision_handler( physics.CollisionTypes["main"], physics.CollisionTypes["bullet"], self.collide_general_with_bullet )
     def setup_input(self):
         input_layer = graphics.Layer( self.scene, gameinput.CocosInputLayer() )
         for k in (key.LEFT, key.RIGHT, key.UP, key.DOWN):
@@ -264,43 +230,9 @@ class MainWorld (World):
         input_layer.cocos_layer.set_key_press_hook( key.SPACE, lambda *args, **kwargs: (self.player.on_controls_state(*args,**kwargs), self.shoot_volley(self.player)) )
         input_layer.cocos_layer.set_key_release_hook( key.SPACE, lambda *args, **kwargs: self.player.on_controls_state(*args,**kwargs) )
         input_layer.cocos_layer.set_key_press_hook( key.P, self.on_save_ship )
-    def shoot_volley(self, shooter):
-        guns = shooter.ready_guns()
-        index = 0
-        for gun in guns:
-            if not gun.may_activate():
-                continue
-            gun.shoot( shooter )
-            gun.activated( index )
     def update_pygame(self):
         self.screen.fill( pygame.color.THECOLORS[ "black" ] )
         draw_space( self.screen, self.sim.space )
         pygame.display.flip()
-    def update_psys_managed_objects(self):
-        for thing, index in self.psys_managed_things:
-            self.object_psys.update_position_and_angle( index, thing.position, thing.angle_radians )
-    def collide_general_with_bullet(self, space, arbiter ):
-        anything, bullet = arbiter.shapes
-        try:
-            thing = anything.thing
-            index = anything.extra_info
-        except AttributeError:
-            bullet.thing.ttl = min( bullet.thing.ttl, 0.05 )
-            return False
-        if bullet.thing.inert:
-            return False
-        if (bullet.thing.shooter == thing) and bullet.thing.grace > 0.0:
-            return False
-        try:
-            block = thing.block_structure.blocks[ index ]
-            hp = block.hp
-        except KeyError:
-            return False
-        except AttributeError:
-            return False
-        bullet.thing.impact( thing = thing, block_index = index, block = block )
-        bullet.thing.inert = True
-        bullet.thing.ttl = min( bullet.thing.ttl, 0.05 )
-        return False
     def run(self):
         self.window.run( self.scene )
@@ -38,7 +38,7 @@ def decorate_block_with_engines_within( block, aim = 180.0, span = 120.0, align
             engine = create_component( "engine", context, position = tuple(point), angle_degrees = angle, required_edge = index, power = 500, cost = 50 )
     return block
 
-def decorate_block_with_guns_within( block, aim = 0.0, span = 120.0, align = False ):
+def decorate_block_with_guns_within( block, aim = 0.0, span = 120.0, align = False, kind = "missile-launcher" ):
     for index, edge in indexed_zip( block.edges ):
         angle = edge.angle_degrees - block.rotation_degrees
         angle_error = (((edge.angle_degrees - aim + 180.0) % 360.0) - 180.0) / (span * 0.5)
@@ -49,7 +49,7 @@ def decorate_block_with_guns_within( block, aim = 0.0, span = 120.0, align = Fal
             cooldown = 0.2
             cost = (750 * cooldown) * 2.0/3.0 # more reasonable power usage
             context = { "block": block }
-            gun = create_component( "missile-launcher", context, position = tuple(point), angle_degrees = angle, required_edge = index, cooldown = cooldown, cost = cost)
+            gun = create_component( kind, context, position = tuple(point), angle_degrees = angle, required_edge = index, cooldown = cooldown, cost = cost)
     return block
 
 def decorate_block_normal( block ):
@@ -179,7 +179,6 @@ class GarageWorld (World):
         self.garage_ship.body.angle = 0
         self.currently_idle = False
     def update_everything(self, dt):
-        self.garage_ship.sprite.update_elements()
         if self.currently_idle:
             self.garage_ship.body.angular_velocity = degrees_to_radians( 360.0 / 10.0 )
         self.tick( dt )
@@ -208,12 +207,9 @@ class GarageWorld (World):
         block = self.create_block()
         block.rotate_degrees( self.current_rotation )
         block.translate( self.current_position )
-        for index in self.block_structure.free_edge_indices:
-            edge = self.block_structure.edge( index )
         for local_edge_index in block.free_edge_indices:
             local_edge = block.edge( local_edge_index )
-            for index in self.block_structure.free_edge_indices:
-                edge = self.block_structure.edge( index )
+            for index, edge in self.block_structure.free_edges_near( local_edge, max_distance = 5 ):
                 if local_edge.almost_overlaps( edge, max_distance = 5 ):
                     return (local_edge_index, index)
         return None
@@ -48,3 +48,30 @@ def convex_polygons_overlap( xs, bs ):
             if line_segments_cross( line_seg, other_line_seg ):
                 return True
     return False
+
+# The functions below work on plain sequences of (x,y) floats and avoid
+# allocating Vec2ds, for use in hot paths.
+
+def bounding_box( vs ):
+    xs = [ x for x, y in vs ]
+    ys = [ y for x, y in vs ]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def bounding_boxes_overlap( a, b ):
+    ax0, ay0, ax1, ay1 = a
+    bx0, by0, bx1, by1 = b
+    return ax0 <= bx1 and bx0 <= ax1 and ay0 <= by1 and by0 <= ay1
+
+def convex_polygons_separated( xs, bs ):
+    # separating axis test: two convex polygons are disjoint iff their
+    # projections onto the normal of some edge do not overlap
+    for vs in (xs, bs):
+        x0, y0 = vs[-1]
+        for x1, y1 in vs:
+            nx, ny = y0 - y1, x1 - x0
+            pa = [ x * nx + y * ny for x, y in xs ]
+            pb = [ x * nx + y * ny for x, y in bs ]
+            if max(pa) < min(pb) or max(pb) < min(pa):
+                return True
+            x0, y0 = x1, y1
+    return False
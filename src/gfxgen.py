@@ -1,6 +1,8 @@
 import Image
 import random
 import math
+import numpy
+import starfield
 
 from random import randint
 from functools import partial
@@ -9,6 +11,7 @@ from itertools import starmap,product
 from pymunk import Vec2d
 from util import *
 from geometry import *
+from vgeometry import points_inside_convex_polygon
 
 def rand(n):
     return random.randint(0, n - 1)
@@ -70,36 +73,30 @@ def put_pixel_intensity( o, col, xy, a ):
     r, g, b = col
     o[ xy ] = blend( o[xy], (r,g,b,a) )
 
-def generate_starfields_main():
-    size = 1024
-    img, ar = create_new_image( size, size )
-    for i in range(20):
-        alph = random.random()
-        on_hybrid_star( rand(1024), rand(1024), rand(32)+1, random.random() * 0.3 + 0.1, lambda xy, a : put_pixel_intensity(ar, (220+rand(35),220+rand(35),rand(35)), xy, a * min( 1.0, alph * 2 ) ) )
-    img.save( "my_image.generated.png" )
+def generate_starfields_main(seed = None):
+    for i, ar in enumerate( starfield.generate_starfield_layers( 8, seed = seed ) ):
+        Image.fromarray( ar, "RGBA" ).save( "starfield{0}.generated.png".format(i) )
 
 def generate_simple_polygon(n = 3, size = 256, side_length = 0.3):
     vs = map(lambda p : (Vec2d(p)+Vec2d(1,1)*0.5)*size, generate_regular_polygon_vertices(n, radius_for_side_length(n, side_length)) )
     print vs
     img, ar = create_new_image( size, size )
-    for x in range(size):
-        for y in range(size):
-            ar[x,y] = (200,100,100,255) if inside_convex_polygon( (x,y), vs ) else (100,200,50,255)
+    pixels = list( product( range(size), repeat = 2 ) )
+    for (x, y), inside in zip( pixels, points_inside_convex_polygon( pixels, vs ) ):
+        ar[x,y] = (200,100,100,255) if inside else (100,200,50,255)
     img.save( "polygon_test.{0}.generated.png".format(n) )
 
-def generate_fancy_polygon(n = 3, size = 256, side_length = 0.3, subpixel_resolution = 10, generate_normals = False):
+def fancy_polygon_shading(n, side_length = 0.3, generate_normals = False):
+    # The bevel quads around the rim and the inner face, each with the
+    # grey level (or normal-map colour) it is drawn with.
     outer_r = radius_for_side_length(n, side_length)
     inner_r = outer_r - side_length/3.0
-    print outer_r, inner_r, side_length
     outer_vs = map(Vec2d,generate_regular_polygon_vertices(n, outer_r))
     inner_vs = map(Vec2d,generate_regular_polygon_vertices(n, inner_r))
-    print outer_vs, [ x.normalized() for x in outer_vs ]
-    print inner_vs, [ x.normalized() for x in inner_vs ]
     polygons = []
     light_angle = 0.12345678 # unlikely for two angles to have exactly equal dot product
     light_direction = Vec2d(math.cos(light_angle), math.sin(light_angle))
     for ((a,b),(d,c)) in closed_circle_pairs( zip(inner_vs, outer_vs) ):
-        print (a,b,c,d)
         t = ((a+b+c+d).normalized().dot( light_direction ) + 1) * 0.5
         t2 = 0.1 + 0.8 * t
         if not generate_normals:
@@ -111,13 +108,20 @@ def generate_fancy_polygon(n = 3, size = 256, side_length = 0.3, subpixel_resolu
             ix = int(0.5 + rm * v.x) + 127
             iy = int(0.5 + rm * v.y) + 127
             polygons.append( ((a,b,c,d),(ix, iy, h, 255) ) )
-
-    print inner_vs
     if not generate_normals:
         polygons.append( (inner_vs, 0.7512345) )
     else:
         polygons.append( (inner_vs, (127,127,255,255) ) ) # straight up, opaque
-    print map( lambda x: x[1], polygons )
+    return polygons
+
+def shade_colour( shade, generate_normals ):
+    if not generate_normals:
+        return (shade*255,shade*255,shade*255,255)
+    return shade
+
+def sample_fancy_polygon_pixel( polygons, size, x, y, subpixel_resolution = 10, generate_normals = False ):
+    # One pixel the slow way, kept as the reference that
+    # rasterize_fancy_polygon must match exactly.
     def average( rgbas ):   
         rs, gs, bs, alphas = [], [], [], []
         for r, g, b, a in rgbas:
@@ -134,29 +138,59 @@ def generate_fancy_polygon(n = 3, size = 256, side_length = 0.3, subpixel_resolu
         p = (p - Vec2d(size,size)*0.5) / size
         for polygon, shade in polygons:
             if inside_convex_polygon( p, polygon ):
-                if not generate_normals:
-                    return (shade*255,shade*255,shade*255,255)
-                else:
-                    return shade
+                return shade_colour( shade, generate_normals )
         return (None,None,None,0) # transparent
-        return (0,0,0,255) # solid black (not transparent -- that's None, None, None, 0)
-    img, ar = create_new_image( size, size )
+    results = []
+    for sx, sy in product( [i/float(subpixel_resolution) for i in range(subpixel_resolution)], repeat = 2):
+        results.append( sample( Vec2d(x + sx, y + sy) ) )
+    return average( results )
+
+def rasterize_fancy_polygon( polygons, size, subpixel_resolution = 10, generate_normals = False ):
+    # Returns a (size,size,4) array indexed [y,x]. Every subsample
+    # position is classified for the whole image at once; sums are
+    # accumulated subsample by subsample, in the same order as
+    # sample_fancy_polygon_pixel, so the results are bit-identical.
+    xs, ys = numpy.meshgrid( numpy.arange( size ), numpy.arange( size ) )
+    totals = numpy.zeros( (size, size, 4) )
+    counts = numpy.zeros( (size, size) )
+    offsets = [i/float(subpixel_resolution) for i in range(subpixel_resolution)]
+    samples = 0
+    for sx, sy in product( offsets, repeat = 2 ):
+        p = numpy.stack( ((xs + sx) - size*0.5, (ys + sy) - size*0.5), axis = -1 ) / size
+        covered = numpy.zeros( (size, size), dtype = bool )
+        for polygon, shade in polygons:
+            inside = points_inside_convex_polygon( p, polygon ).reshape( size, size ) & ~covered
+            totals[inside] += shade_colour( shade, generate_normals )
+            covered |= inside
+        counts += covered
+        samples += 1
+    rgb = numpy.where( counts[...,None] > 0, totals[...,:3] / numpy.maximum( counts, 1 )[...,None], 0.0 )
+    alpha = totals[...,3] / float(samples)
+    return numpy.concatenate( (rgb, alpha[...,None]), axis = -1 ).astype( numpy.uint8 )
+
+def generate_fancy_polygon(n = 3, size = 256, side_length = 0.3, subpixel_resolution = 10, generate_normals = False):
     print "generating fancy {0}-gon".format(n)
-    for x, y in product( range(size), repeat = 2 ):
-        print x, y
-        results = []
-        for sx, sy in product( [i/float(subpixel_resolution) for i in range(subpixel_resolution)], repeat = 2):
-            p = (x + sx, y + sy)
-            rv = sample(p)
-            results.append( rv )
-        result = average( results )
-        ar[x,y] = result
+    polygons = fancy_polygon_shading( n, side_length, generate_normals )
+    img = Image.fromarray( rasterize_fancy_polygon( polygons, size, subpixel_resolution, generate_normals ), "RGBA" )
     if generate_normals:
-        img.save( "polygon_normals.{0}.generated.png".format(n) )
+        filename = "polygon_normals.{0}.generated.png".format(n)
     else:
-        img.save( "polygon_fancy.{0}.generated.png".format(n) )
+        filename = "polygon_fancy.{0}.generated.png".format(n)
+    img.save( filename )
+    return filename
+
+def generate_fancy_polygon_normals(n):
+    return generate_fancy_polygon(n, size = 256, side_length = 0.3, generate_normals = True)
+
+def generate_fancy_polygons_in_parallel(ns = (3,4,5,6,8), f = generate_fancy_polygon_normals, processes = None):
+    import multiprocessing
+    pool = multiprocessing.Pool( processes )
+    try:
+        return pool.map( f, ns )
+    finally:
+        pool.close()
+        pool.join()
             
 if __name__ == '__main__':
-    for i in (3,4,5,6,8):
-        generate_fancy_polygon(i, size = 256, side_length = 0.3, generate_normals = True)
+    generate_fancy_polygons_in_parallel()
     
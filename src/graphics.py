@@ -1,5 +1,8 @@
 import cocos
+import pyglet
 import math
+import numpy
+import pymunk
 
 from util import ignore_arguments
 from operator import attrgetter
@@ -23,6 +26,12 @@ def load_grid( fn, cols, rows ):
     image = pyglet.image.load( fn )
     return pyglet.image.ImageGrid( image, cols, rows )
 
+def image_from_array( ar ):
+    # ar is a (height,width,4) uint8 RGBA array with row 0 at the top, as
+    # in an image file; pyglet wants the bottom row first.
+    height, width, channels = ar.shape
+    return pyglet.image.ImageData( width, height, "RGBA", ar[::-1].tostring(), pitch = width * 4 )
+
 def create_sprite( info ):
     if info.has_key( "image-name" ):
         image_name = info["image-name"]
@@ -154,38 +163,116 @@ class Sprite (object):
         self.cocos_sprite.rotation = 180.0 - self.thing.angle_degrees
 
         
+class TransformBatch (object):
+    # Collects element and transform slot updates over a frame and hands
+    # them to the element system in one update_positions_and_angles and
+    # one update_transforms call.
+    def __init__(self, psys):
+        self.psys = psys
+        self.clear()
+    def clear(self):
+        self.indices = []
+        self.xs = []
+        self.ys = []
+        self.angles = []
+        self.chunks = []
+        self.slots = []
+        self.slot_transforms = []
+    def add(self, index, position, angle):
+        x, y = position
+        self.indices.append( index )
+        self.xs.append( x )
+        self.ys.append( y )
+        self.angles.append( angle )
+    def add_many(self, indices, positions, angles):
+        # indices (n,), positions (n,2) and angles (n,) as arrays
+        self.chunks.append( (indices, positions, angles) )
+    def add_shared(self, indices, position, angle):
+        # Elements that all take the same transform.
+        n = len( indices )
+        positions = numpy.empty( (n,2) )
+        positions[:] = position
+        self.chunks.append( (indices, positions, numpy.repeat( float(angle), n )) )
+    def add_transform(self, slot, position, angle):
+        x, y = position
+        self.slots.append( slot )
+        self.slot_transforms.append( (x, y, angle) )
+    def __len__(self):
+        return len( self.indices ) + sum( len( chunk[0] ) for chunk in self.chunks ) + len( self.slots )
+    def flush(self):
+        if self.indices:
+            positions = numpy.empty( (len( self.indices ), 2) )
+            positions[:,0] = self.xs
+            positions[:,1] = self.ys
+            self.chunks.append( (self.indices, positions, self.angles) )
+        if self.chunks:
+            indices = numpy.concatenate( [ chunk[0] for chunk in self.chunks ] ).astype( numpy.int32 )
+            positions = numpy.concatenate( [ chunk[1] for chunk in self.chunks ] ).astype( numpy.float64 )
+            angles = numpy.concatenate( [ chunk[2] for chunk in self.chunks ] ).astype( numpy.float64 )
+            self.psys.update_positions_and_angles( indices, positions, angles )
+        if self.slots:
+            transforms = numpy.array( self.slot_transforms, dtype = numpy.float64 )
+            self.psys.update_transforms( numpy.array( self.slots, dtype = numpy.int32 ), numpy.ascontiguousarray( transforms[:,0:2] ), numpy.ascontiguousarray( transforms[:,2] ) )
+        self.clear()
+
 class BlockSystemStructure (object):
+    # The elements of a structure share one transform slot in psys and
+    # keep only their own offset and internal angle, so moving the whole
+    # structure is a single update.
     def __init__(self, psys, thing, transformation = None, sync_to_thing = True):
         self.psys = psys
         self.thing = thing
         self.transformation = transformation
         self.elements = []
         self.sync_to_thing = sync_to_thing
-    def update_elements(self):
-        if not self.sync_to_thing:
-            return
-        position = tuple( self.thing.position )
+        if sync_to_thing:
+            position, angle = self.thing_transform()
+        else:
+            position, angle = (0.0, 0.0), 0.0
+            if self.transformation:
+                position = self.transformation( position )
+        self.last_transform = (position[0], position[1], angle)
+        self.transform_slot = psys.add_transform( position = position, angle = angle )
+    def thing_transform(self, alpha = None):
+        if alpha == None:
+            position = tuple( self.thing.position )
+            angle = self.thing.angle_radians
+        else:
+            position, angle = self.thing.interpolated_transform( alpha )
         if self.transformation:
             position = self.transformation( position )
-        angle = self.thing.angle_radians
-        for index in self.elements:
-            self.psys.update_position_and_angle( index, position, angle )
+        return position, angle
+    def place(self, position, angle, batch = None):
+        # Moves every element of the structure; with a batch the update
+        # is queued there, otherwise it is sent at once.
+        transform = (position[0], position[1], angle)
+        if transform == self.last_transform:
+            # nothing has moved since the last upload
+            return
+        self.last_transform = transform
+        if batch == None:
+            self.psys.update_transform( self.transform_slot, position, angle )
+        else:
+            batch.add_transform( self.transform_slot, position, angle )
+    def update_elements(self, alpha = None, batch = None):
+        if not self.sync_to_thing:
+            return
+        position, angle = self.thing_transform( alpha )
+        self.place( position, angle, batch = batch )
     def add_element( self, info ):
+        # note offset must come pretransformed.
         info = dict(info)
-        if self.sync_to_thing:
-            info["position"] = self.thing.position
-            info["angle"] = self.thing.angle_radians
-        if self.transformation:
-            info[ "position" ] = self.transformation( info["position"] )
-            # note offset must come pretransformed.
-            # transforming here is a hack anyway
+        info[ "transform" ] = self.transform_slot
         index = self.psys.add( **info )
         self.elements.append( index )
     def kill(self):
-        while self.elements:
-            index = self.elements.pop(0)
+        for index in self.elements:
             self.psys.remove( index )
-        
+        self.elements = []
+        if self.transform_slot != None:
+            self.psys.remove_transform( self.transform_slot )
+            self.transform_slot = None
+
 
 
 class SpriteStructure (object):
@@ -353,7 +440,9 @@ class BackgroundCocosLayer (cocos.layer.Layer):
         super( cocos.layer.Layer, self ).__init__()
         self._camera = camera
         self._distance = distance
-        self._image = pyglet.image.load( image )
+        if isinstance( image, basestring ):
+            image = pyglet.image.load( image )
+        self._image = image
         self._texture = self._image.get_texture()
         glBindTexture( self._texture.target, self._texture.id )
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
@@ -405,22 +494,32 @@ def draw_thing_shapes( thing ):
     glEnd()
     glPopMatrix()
 
-def update_visible_objects( space, center_xy, size, all_objects, batch_node, sprite_key ):
-    # TODO, be more consistent, make everything Things
+def onscreen_things( space, center_xy, size, slack = 100.0 ):
+    # The things with a shape touching the screen box, grown by slack on
+    # every side, found with one query on the space.
     x, y = center_xy
     ww, wh = size
-    hw, hh = 0.5 * ww, 0.5 * wh
-    screen_slack = 100.0
-    screen_bb = pymunk.BB(x-hw-screen_slack,y-hh-screen_slack,x+hw+screen_slack,y+hh+screen_slack)
-    onscreen = set(space.bb_query( screen_bb ))
-    for shape in onscreen:
-        sprite_key(shape).update()
-    prech = set(batch_node.get_children())
-    for thing in all_things:
-        if all((shape not in onscreen for shape in thing.shapes)):
-            if spr.cocos_sprite in prech:
-                batch_node.remove( spr.cocos_sprite )
-        else:
-            thing.update()
-            if spr.cocos_sprite not in prech:
-                batch_node.add( spr.cocos_sprite )
+    hw, hh = 0.5 * ww + slack, 0.5 * wh + slack
+    screen_bb = pymunk.BB( x - hw, y - hh, x + hw, y + hh )
+    rv = set()
+    for shape in space.bb_query( screen_bb ):
+        try:
+            rv.add( shape.thing )
+        except AttributeError:
+            pass
+    return rv
+
+def update_visible_objects( onscreen, managed, psys, hidden, alpha, batch ):
+    # Queues the transforms of the (thing, index) pairs in managed whose
+    # thing is onscreen on batch, and hides the rest in psys. hidden is
+    # the set of indices currently hidden, and is kept up to date.
+    for thing, index in managed:
+        if thing in onscreen:
+            if index in hidden:
+                psys.set_hidden( index, False )
+                hidden.remove( index )
+            position, angle = thing.interpolated_transform( alpha )
+            batch.add( index, position, angle )
+        elif index not in hidden:
+            psys.set_hidden( index, True )
+            hidden.add( index )
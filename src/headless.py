@@ -0,0 +1,95 @@
+import pyglet
+
+# Importing pyglet.window (which cocos does) normally opens a hidden
+# shadow window, which fails without a display.
+pyglet.options[ "shadow_window" ] = False
+
+from combat import CombatWorld
+
+class NullSystem (object):
+    # Stands in for bsgl.System: hands out indices the same way but
+    # never touches OpenGL.
+    def __init__(self, texture_id = None):
+        self.texture_id = texture_id
+        self.capacity = 0
+        self.next_index = 0
+        self.free_indices = []
+        self.live_indices = set()
+        self.hidden_indices = set()
+        self.next_transform = 0
+        self.free_transforms = []
+        self.live_transforms = set()
+    def add(self, transform = -1, **kwargs):
+        if transform != -1 and transform not in self.live_transforms:
+            raise IndexError( "no such transform" )
+        if self.free_indices:
+            index = self.free_indices.pop()
+        else:
+            index = self.next_index
+            self.next_index += 1
+        self.live_indices.add( index )
+        return index
+    def remove(self, index):
+        self.live_indices.remove( index )
+        self.hidden_indices.discard( index )
+        self.free_indices.append( index )
+    def add_transform(self, position = (0.0,0.0), angle = 0.0):
+        if self.free_transforms:
+            slot = self.free_transforms.pop()
+        else:
+            slot = self.next_transform
+            self.next_transform += 1
+        self.live_transforms.add( slot )
+        return slot
+    def remove_transform(self, slot):
+        self.live_transforms.remove( slot )
+        self.free_transforms.append( slot )
+    def update_transform(self, slot, position, angle):
+        if slot not in self.live_transforms:
+            raise IndexError( "no such transform" )
+    def update_transforms(self, slots, positions, angles):
+        if len( positions ) != len( slots ) or len( angles ) != len( slots ):
+            raise ValueError( "expected one position and one angle per index" )
+    def set_hidden(self, index, hidden = True):
+        if index not in self.live_indices:
+            raise IndexError( "no such element" )
+        if hidden:
+            self.hidden_indices.add( index )
+        else:
+            self.hidden_indices.discard( index )
+    def update_position_and_angle(self, index, position, angle):
+        pass
+    def update_positions_and_angles(self, indices, positions, angles):
+        if len( positions ) != len( indices ) or len( angles ) != len( indices ):
+            raise ValueError( "expected one position and one angle per index" )
+    def reserve(self, n):
+        self.capacity = max( self.capacity, n )
+    def get_capacity(self):
+        return max( self.capacity, self.next_index )
+    def get_number_of_elements(self):
+        return len( self.live_indices )
+    def get_number_of_visible_elements(self):
+        return len( self.live_indices ) - len( self.hidden_indices )
+    def set_transformation_matrix(self, matrix):
+        pass
+    def draw(self):
+        pass
+
+class NullAtlas (object):
+    def texcoords(self, record_name):
+        return (0.0, 0.0)
+    def texsize(self, record_name):
+        return (1.0, 1.0)
+
+class HeadlessWorld (CombatWorld):
+    def __init__(self, **kwargs):
+        super( HeadlessWorld, self ).__init__( **kwargs )
+        self.atlas = NullAtlas()
+        self.object_psys = NullSystem()
+        self.hud_psys = NullSystem()
+        self.setup_simulation()
+        self.pre_display.add_anonymous_hook( self.update_psys_managed_objects )
+    def run(self, frames, frame_dt = 1/60.0):
+        for i in range(frames):
+            self.tick( frame_dt )
+            self.display_update()
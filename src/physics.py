@@ -5,6 +5,7 @@ import random
 import component
 
 from pymunk import Vec2d
+from collections import OrderedDict
 from util import *
 
 # note that we can get the C pointers from the pymunk objects:
@@ -202,24 +203,72 @@ class PhysicsSimulator (object):
         self.object_size_lower_limit = size_limit
         if self._timestep:
             assert calculate_maximum_timestep( self.object_size_lower_limit, self.speed_limit ) >= self._timestep
-        self.marked_for_removal = []
-        self.marked_for_addition = []
+        # Additions and removals are deferred until the space is not being
+        # stepped. Only the last request for each object counts, and it is
+        # compared with what is actually in the space when applied, so an
+        # object both added and removed within one tick ends up as it was
+        # asked to last.
+        self.pending = OrderedDict()
+        self.members = set()
+        # The position and angle of each tracked body as they were at the
+        # start of the last tick, for blending on display.
+        self.previous_transforms = {}
     def remove(self, *args):
-        self.marked_for_removal.extend( args )
+        for x in args:
+            self.pending[ x ] = False
     def add(self, *args):
-        self.marked_for_addition.extend( args )
+        for x in args:
+            self.pending[ x ] = True
+    def add_now(self, *args):
+        # Not to be called while the space is being stepped.
+        args = [ x for x in args if x not in self.members ]
+        if args:
+            self.space.add( *args )
+            self.members.update( args )
+    def track_transform(self, body):
+        p = body.position
+        self.previous_transforms[ body ] = p.x, p.y, body.angle
+    def reset_transform(self, body):
+        # For a tracked body moved by hand, so that the move is shown as
+        # a jump rather than blended.
+        if body in self.previous_transforms:
+            self.track_transform( body )
+    def untrack_transform(self, body):
+        try:
+            del self.previous_transforms[ body ]
+        except KeyError:
+            pass
+    def record_transforms(self):
+        transforms = self.previous_transforms
+        for body in transforms:
+            p = body.position
+            transforms[ body ] = p.x, p.y, body.angle
+    def perform_changes(self, additions = True, removals = True):
+        if not self.pending:
+            return
+        added, removed, kept = [], [], OrderedDict()
+        for x, wanted in self.pending.iteritems():
+            if (wanted and not additions) or (not wanted and not removals):
+                kept[ x ] = wanted
+            elif wanted and x not in self.members:
+                added.append( x )
+                self.members.add( x )
+            elif not wanted and x in self.members:
+                removed.append( x )
+                self.members.remove( x )
+        self.pending = kept
+        if removed:
+            self.space.remove( *removed )
+        if added:
+            self.space.add( *added )
     def perform_removals(self):
-        if self.marked_for_removal:
-            self.space.remove( *set(self.marked_for_removal) )
-            self.marked_for_removal = []
+        self.perform_changes( additions = False )
     def perform_additions(self):
-        if self.marked_for_addition:
-            self.space.add( *set(self.marked_for_addition) )
-            self.marked_for_addition = []
-    def perform_removals_and_additions(self):   
-        self.perform_additions()
-        self.perform_removals()
+        self.perform_changes( removals = False )
+    def perform_removals_and_additions(self):
+        self.perform_changes()
     def tick(self, dt):
+        self.record_transforms()
         if self._timestep:
             self._t += dt
             while self._t >= self._timestep:
@@ -244,7 +293,7 @@ class StaticObstacle (object):
         self.shapes = list( shape.generate_shapes( self.body ) )
         for shape in self.shapes:
             shape.thing = self
-        sim.space.add( *self.shapes )
+        sim.add_now( *self.shapes )
 
 class Thing (object):
     def __init__(self, world, shape, mass, moment, group = False, name = "anonymous", collision_type = None ):
@@ -262,16 +311,22 @@ class Thing (object):
         self.invulnerable = True
         self.group = group
         self.collision_type = collision_type
+        self.faction = None
         self.reshape_hooks = Hookable()
         self.reshape( shape )
         self.kill_hooks = []
         self.update_hooks = []
         self.alive = True
         self.killed = False
-        self.psu = component.PowerSupply( 0.0 )
+        try:
+            bank = self.world.power_bank
+        except AttributeError:
+            bank = None
+        self.psu = component.PowerSupply( 0.0, bank = bank )
         self.psu.power = self.psu.max_storage
         if self.sim:
-            self.sim.space.add( self.body )
+            self.sim.add_now( self.body )
+            self.sim.track_transform( self.body )
 
     def reshape(self, shape):
         if self.shapes:
@@ -295,7 +350,9 @@ class Thing (object):
         self.reshape_hooks()
 
     def tick(self, dt):
-        self.psu.tick(dt)
+        # a supply in the world's power bank is ticked with the bank
+        if not self.psu.managed:
+            self.psu.tick(dt)
 
     def update(self):
         for hook in self.update_hooks:
@@ -315,11 +372,24 @@ class Thing (object):
             return
         self.killed = True
         self.sim.remove( self.body, *self.shapes )
+        self.sim.untrack_transform( self.body )
+        self.psu.release()
         self.alive = False
         self.world.remove_all_hooks( self )
         for hook in self.kill_hooks:
             hook( self )
 
+    def interpolated_transform(self, alpha):
+        # The position and angle blended between the start and the end
+        # of the last fixed tick.
+        p = self.body.position
+        angle = self.body.angle
+        try:
+            px, py, pangle = self.sim.previous_transforms[ self.body ]
+        except KeyError:
+            return (p.x, p.y), angle
+        return (px + (p.x - px) * alpha, py + (p.y - py) * alpha), pangle + (angle - pangle) * alpha
+
     @property
     def mass(self):
         return self.body.mass
@@ -343,6 +413,8 @@ class Thing (object):
     @position.setter
     def position(self, value):
         self.body.position = value
+        if self.sim:
+            self.sim.reset_transform( self.body )
 
     @property
     def velocity(self):
@@ -379,6 +451,8 @@ class Thing (object):
     @angle_radians.setter
     def angle_radians(self, value):
         self.body.angle = value
+        if self.sim:
+            self.sim.reset_transform( self.body )
 
     @property
     def angle_degrees(self):
@@ -387,10 +461,14 @@ class Thing (object):
     @angle_degrees.setter
     def angle_degrees(self, value):
         self.body.angle = degrees_to_radians( value )
+        if self.sim:
+            self.sim.reset_transform( self.body )
 
     @angle_degrees.setter
     def angle_degrees(self, value):
         self.body.angle = degrees_to_radians( value )
+        if self.sim:
+            self.sim.reset_transform( self.body )
 
     @property
     def direction(self):
@@ -0,0 +1,105 @@
+import sys
+import time
+
+from util import Hookable, HookBatch
+
+# Opt-in timing of World hookpoints. Enabling profiling switches the
+# class of each hookpoint to ProfiledHookable, which times every hook
+# it runs; disabling switches it back, so a world that is not being
+# profiled runs exactly the same code as before.
+
+def hook_name( f ):
+    if isinstance( f, HookBatch ):
+        return "batch " + hook_name( f.f )
+    try:
+        return f.im_class.__name__ + "." + f.__name__
+    except AttributeError:
+        pass
+    try:
+        return hook_name( f.func )
+    except AttributeError:
+        pass
+    try:
+        return f.__name__
+    except AttributeError:
+        return type(f).__name__
+
+def owner_name( owner ):
+    if owner == None:
+        return "anonymous"
+    if isinstance( owner, HookBatch ):
+        return "batch"
+    return type(owner).__name__
+
+class ProfiledHookable (Hookable):
+    def __call__(self, *args, **kwargs):
+        profiler = self.profiler
+        t0 = time.time()
+        self.refresh()
+        for entry in list( self.entries ):
+            t = time.time()
+            entry.f( *args, **kwargs )
+            profiler.record_hook( self.profile_name, entry, time.time() - t )
+        profiler.record_hookpoint( self.profile_name, time.time() - t0 )
+
+class HookProfiler (object):
+    # Keeps, per hookpoint and per (hookpoint, owner type, hook) triple,
+    # the cumulative time and number of calls, plus the time spent in
+    # each hookpoint during the current and the last complete frame.
+    def __init__(self, summary_interval = None, stream = None):
+        self.summary_interval = summary_interval
+        self.stream = stream or sys.stderr
+        self.hookpoints = {}
+        self.hooks = {}
+        self.frame = {}
+        self.last_frame = {}
+        self.worst_frame = {}
+        self.frames = 0
+    def record_hook(self, hookpoint, entry, elapsed):
+        if entry.label == None:
+            entry.label = owner_name( entry.owner ), hook_name( entry.f )
+        key = (hookpoint,) + entry.label
+        try:
+            record = self.hooks[ key ]
+        except KeyError:
+            record = self.hooks[ key ] = [ 0.0, 0 ]
+        record[0] += elapsed
+        record[1] += 1
+    def record_hookpoint(self, hookpoint, elapsed):
+        try:
+            record = self.hookpoints[ hookpoint ]
+        except KeyError:
+            record = self.hookpoints[ hookpoint ] = [ 0.0, 0 ]
+        record[0] += elapsed
+        record[1] += 1
+        self.frame[ hookpoint ] = self.frame.get( hookpoint, 0.0 ) + elapsed
+    def end_frame(self):
+        self.last_frame = self.frame
+        for hookpoint, elapsed in self.frame.items():
+            self.worst_frame[ hookpoint ] = max( elapsed, self.worst_frame.get( hookpoint, 0.0 ) )
+        self.frame = {}
+        self.frames += 1
+        if self.summary_interval and self.frames % self.summary_interval == 0:
+            print >> self.stream, self.summary()
+    def hookpoint_totals(self):
+        return dict( (name, tuple(record)) for name, record in self.hookpoints.items() )
+    def hook_totals(self):
+        # [ (hookpoint, owner type, hook, elapsed, calls) ], most expensive first
+        rv = [ key + tuple(record) for key, record in self.hooks.items() ]
+        rv.sort( key = lambda row : -row[3] )
+        return rv
+    def reset(self):
+        self.hookpoints = {}
+        self.hooks = {}
+        self.frame = {}
+        self.last_frame = {}
+        self.worst_frame = {}
+        self.frames = 0
+    def summary(self, limit = 10):
+        lines = [ "hook profile over {0} frames".format( self.frames ) ]
+        for name in sorted( self.hookpoints.keys() ):
+            elapsed, calls = self.hookpoints[ name ]
+            lines.append( "  {0:<14} {1:8.3f}s {2:6d} calls, last frame {3:7.3f}ms, worst {4:7.3f}ms".format( name, elapsed, calls, 1000.0 * self.last_frame.get( name, 0.0 ), 1000.0 * self.worst_frame.get( name, 0.0 ) ) )
+        for hookpoint, owner, hook, elapsed, calls in self.hook_totals()[:limit]:
+            lines.append( "  {0:<14} {1:8.3f}s {2:6d} calls  {3}: {4}".format( hookpoint, elapsed, calls, owner, hook ) )
+        return "\n".join( lines )
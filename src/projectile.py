@@ -1,7 +1,12 @@
 from physics import ConvexPolygonShape, DiskShape, Vec2d
-from ship import Debris
 
 import physics
+import pymunk
+import vgeometry
+import math
+import numpy
+
+from collections import deque
 
 from util import *
 
@@ -12,89 +17,421 @@ def basic_impact( thing, block, block_index, hp = 1 ):
     if block.hp <= 0:
         thing.destroy_block( block_index = block_index )
 
-def create_pellet(world, shooter, gun):
-    points = [(0,0),(9,0),(9,33),(0,33)]
-    shape = ConvexPolygonShape(*points)
-    shape.translate( shape.centroid() * -1)
-#    shape = DiskShape(5) # useful for debugging with pygame to see bullet origins
-    layer = None
-    rv = Debris( world, layer, (0,0), shape, None, mass = 1.0, moment = physics.infinity, collision_type = physics.CollisionTypes["bullet"], group = physics.CollisionGroups["bullets"] )
-    speed = 1400
-#    speed = 0
-    base_velocity = gun.velocity
-    base_velocity = shooter.velocity # unrealistic but possibly better
-    rv.velocity = base_velocity + gun.direction * speed
-    rv.position = gun.position
-    rv.angle_radians = degrees_to_radians( gun.angle_degrees + 90.0 ) # realistic
-#    rv.angle_radians = degrees_to_radians( rv.velocity.get_angle_degrees() + 999.0 ) # might look better
-    rv.inert = False
-    rv.grace = 0.15
-    rv.shooter = shooter
-    kw = {}
-    kw[ "size" ] = 9.0,33.0
-    kw[ "texture_size" ] = world.atlas.texsize( "laserGreen" )
-    kw[ "texture_coordinates" ] = world.atlas.texcoords( "laserGreen" )
-    kw[ "position" ] = rv.position
-    kw[ "angle" ] = rv.angle_radians
-    kw[ "colour" ] = (0.0,1.0,0.0,1.0)
-    rv.index = world.object_psys.add( **kw )
-    world.psys_managed_things.append( (rv, rv.index) )
-    def update_bullet( bullet, dt ):
-        if not bullet.alive:
+class ProjectileKind (object):
+    # A guided kind thrusts along its velocity once acceleration_delay
+    # has passed and, from lock_delay on, steers at the nearest hostile
+    # by proportional navigation: a sideways acceleration of
+    # navigation_constant * closing speed * turn rate of the line of
+    # sight, up to max_lateral_acceleration.
+    def __init__(self, speed, grace, damage, colour, ttl = 1.5, acceleration = 0.0, acceleration_delay = 0.0, size = (9.0,33.0), sprite = "laserGreen", guided = False, lock_delay = 0.0, navigation_constant = 4.0, max_lateral_acceleration = 0.0):
+        self.speed = speed
+        self.grace = grace
+        self.damage = damage
+        self.colour = colour
+        self.ttl = ttl
+        self.acceleration = acceleration
+        self.acceleration_delay = acceleration_delay
+        self.size = size
+        self.sprite = sprite
+        self.guided = guided
+        self.lock_delay = lock_delay
+        self.navigation_constant = navigation_constant
+        self.max_lateral_acceleration = max_lateral_acceleration
+
+# the collision shape shared by every kind
+BulletPoints = [(0,0),(9,0),(9,33),(0,33)]
+
+Pellet = ProjectileKind( speed = 1400, grace = 0.15, damage = 1, colour = (0.0,1.0,0.0,1.0) )
+DumbMissile = ProjectileKind( speed = 10, grace = 0.5, damage = 5, colour = (0.4,0.4,1.0,1.0), acceleration = 1500, acceleration_delay = 0.2 )
+SmartMissile = ProjectileKind( speed = 10, grace = 0.5, damage = 8, colour = (1.0,0.4,0.4,1.0), ttl = 3.0, acceleration = 1500, acceleration_delay = 0.2, guided = True, lock_delay = 0.5, max_lateral_acceleration = 3000 )
+
+class Projectile (object):
+    # A handle on one live projectile. Its state lives in the arrays of
+    # the ProjectileSystem; a fresh handle is made for every shot so that
+    # stale references see alive == False rather than a reused slot.
+    __slots__ = [ "system", "slot", "alive" ]
+    def __init__(self, system, slot):
+        self.system = system
+        self.slot = slot
+        self.alive = True
+    def kill(self):
+        if self.alive:
+            self.system.kill( self.slot )
+    def impact(self, thing, block, block_index):
+        basic_impact( thing = thing, block = block, block_index = block_index, hp = int( self.system.damage[ self.slot ] ) )
+    @property
+    def body(self):
+        return self.system.bodies[ self.slot ]
+    @property
+    def position(self):
+        return Vec2d( self.body.position )
+    @property
+    def velocity(self):
+        return Vec2d( self.body.velocity )
+    @property
+    def angle_radians(self):
+        return self.body.angle
+    @property
+    def shooter(self):
+        return self.system.shooters[ self.slot ]
+    @property
+    def target(self):
+        return self.system.targets[ self.slot ]
+    @property
+    def ttl(self):
+        return float( self.system.ttl[ self.slot ] )
+    @ttl.setter
+    def ttl(self, value):
+        self.system.ttl[ self.slot ] = value
+    @property
+    def grace(self):
+        return float( self.system.grace[ self.slot ] )
+    @property
+    def lifetime(self):
+        return float( self.system.lifetime[ self.slot ] )
+    @property
+    def inert(self):
+        return bool( self.system.inert[ self.slot ] )
+    @inert.setter
+    def inert(self, value):
+        self.system.inert[ self.slot ] = value
+
+class ProjectileSystem (object):
+    # Owns every projectile in a world. Bodies and shapes are pooled and
+    # reused; per-projectile state is kept in parallel arrays indexed by
+    # slot, and one pre_physics hook advances all of them.
+    #
+    # With swept collisions, each physics tick also casts a ray along the
+    # path every live bullet moved, so a fast bullet that jumped over a
+    # thin target in one step still hits it. Bullets are then not held to
+    # the simulator's speed limit.
+    def __init__(self, world, capacity = 64, swept = True, min_target_size = None):
+        self.world = world
+        self.swept = swept
+        if min_target_size == None:
+            min_target_size = world.sim.object_size_lower_limit
+        self.sweep_threshold = min_target_size + vgeometry.convex_polygon_width( BulletPoints )
+        self.bodies = []
+        self.shapes = []
+        self.handles = []
+        self.shooters = []
+        self.targets = []
+        self.psys_indices = []
+        self.ttl = numpy.zeros( 0 )
+        self.grace = numpy.zeros( 0 )
+        self.lifetime = numpy.zeros( 0 )
+        self.damage = numpy.zeros( 0, dtype = int )
+        self.acceleration = numpy.zeros( (0,2) )
+        self.previous_positions = numpy.zeros( (0,2) )
+        # where each projectile was at the start of the last tick, for
+        # blending on display
+        self.start_positions = numpy.zeros( (0,2) )
+        self.start_angles = numpy.zeros( 0 )
+        self.acceleration_delay = numpy.zeros( 0 )
+        self.inert = numpy.zeros( 0, dtype = bool )
+        self.active = numpy.zeros( 0, dtype = bool )
+        self.hidden = numpy.zeros( 0, dtype = bool )
+        self.guided = numpy.zeros( 0, dtype = bool )
+        self.lock_delay = numpy.zeros( 0 )
+        self.navigation_constant = numpy.zeros( 0 )
+        self.max_lateral_acceleration = numpy.zeros( 0 )
+        self.free_slots = []
+        self.traces = deque()
+        self.grow( capacity )
+        world.pre_physics.add_hook( self, self.update )
+        world.pre_display.add_hook( self, self.update_display )
+        if self.swept:
+            world.post_physics.add_hook( self, self.sweep )
+
+    def grow(self, capacity):
+        old = len( self.bodies )
+        if capacity <= old:
             return
-        bullet.ttl -= dt
-        bullet.grace -= dt
-        if bullet.ttl <= 0.0:
-            bullet.kill()
-    def kill_bullet( rv ):
-        world.psys_managed_things.remove( (rv,rv.index) )
-        world.object_psys.remove( rv.index )
-    rv.ttl = 1.5
-    rv.kill_hooks.append( kill_bullet )
-    rv.impact = basic_impact
-    world.pre_physics.add_hook( rv, partial(update_bullet,rv) )
+        extra = capacity - old
+        for name in ("ttl", "grace", "lifetime", "damage", "acceleration", "previous_positions", "start_positions", "start_angles", "acceleration_delay", "inert", "active", "hidden", "guided", "lock_delay", "navigation_constant", "max_lateral_acceleration"):
+            array = getattr( self, name )
+            setattr( self, name, numpy.concatenate( (array, numpy.zeros( (extra,) + array.shape[1:], dtype = array.dtype )) ) )
+        shape = ConvexPolygonShape(*BulletPoints)
+        shape.translate( shape.centroid() * -1)
+        for slot in range(old, capacity):
+            body = pymunk.Body( 1.0, physics.infinity )
+            body.velocity_limit = physics.infinity if self.swept else self.world.sim.speed_limit
+            shapes = list( shape.generate_shapes( body ) )
+            for s in shapes:
+                s.collision_type = physics.CollisionTypes["bullet"]
+                s.group = physics.CollisionGroups["bullets"]
+            self.bodies.append( body )
+            self.shapes.append( shapes )
+            self.handles.append( None )
+            self.shooters.append( None )
+            self.targets.append( None )
+            self.psys_indices.append( None )
+        self.free_slots.extend( reversed( range(old, capacity) ) )
 
-def create_dumb_missile(world, shooter, gun):
-    points = [(0,0),(9,0),(9,33),(0,33)]
-    shape = ConvexPolygonShape(*points)
-    shape.translate( shape.centroid() * -1)
-    layer = None
-    rv = Debris( world, layer, (0,0), shape, None, mass = 1.0, moment = physics.infinity, collision_type = physics.CollisionTypes["bullet"], group = physics.CollisionGroups["bullets"] )
-    speed = 10
-    acceleration = Vec2d(gun.direction) * 1500
-    base_velocity = gun.velocity
-    base_velocity = shooter.velocity # unrealistic but possibly better
-    rv.velocity = base_velocity + gun.direction * speed
-    rv.position = gun.position
-    rv.angle_radians = degrees_to_radians( gun.angle_degrees + 90.0 ) # realistic
-    rv.inert = False
-    rv.grace = 0.5
-    rv.shooter = shooter
-    rv.lifetime = 0.0
-    kw = {}
-    kw[ "size" ] = 9.0,33.0
-    kw[ "texture_size" ] = world.atlas.texsize( "laserGreen" )
-    kw[ "texture_coordinates" ] = world.atlas.texcoords( "laserGreen" )
-    kw[ "position" ] = rv.position
-    kw[ "angle" ] = rv.angle_radians
-    kw[ "colour" ] = (0.4,0.4,1.0,1.0)
-    rv.index = world.object_psys.add( **kw )
-    world.psys_managed_things.append( (rv, rv.index) )
-    def update_bullet( bullet, dt ):
-        if not bullet.alive:
+    def fire(self, shooter, gun, kind):
+        if not self.free_slots:
+            self.grow( 2 * len( self.bodies ) )
+        slot = self.free_slots.pop()
+        body = self.bodies[ slot ]
+        base_velocity = gun.velocity
+        base_velocity = shooter.velocity # unrealistic but possibly better
+        body.position = gun.position
+        self.previous_positions[ slot ] = body.position.x, body.position.y
+        self.start_positions[ slot ] = body.position.x, body.position.y
+        body.velocity = base_velocity + gun.direction * kind.speed
+        body.angle = degrees_to_radians( gun.angle_degrees + 90.0 ) # realistic
+        body.angular_velocity = 0.0
+        self.start_angles[ slot ] = body.angle
+        self.ttl[ slot ] = kind.ttl
+        self.grace[ slot ] = kind.grace
+        self.lifetime[ slot ] = 0.0
+        self.damage[ slot ] = kind.damage
+        dx, dy = gun.direction
+        self.acceleration[ slot ] = dx * kind.acceleration, dy * kind.acceleration
+        self.acceleration_delay[ slot ] = kind.acceleration_delay
+        self.inert[ slot ] = False
+        self.active[ slot ] = True
+        self.hidden[ slot ] = False
+        self.guided[ slot ] = kind.guided
+        self.lock_delay[ slot ] = kind.lock_delay
+        self.navigation_constant[ slot ] = kind.navigation_constant
+        self.max_lateral_acceleration[ slot ] = kind.max_lateral_acceleration
+        self.shooters[ slot ] = shooter
+        self.targets[ slot ] = None
+        rv = self.handles[ slot ] = Projectile( self, slot )
+        for shape in self.shapes[ slot ]:
+            shape.thing = rv
+        self.world.sim.add( body, *self.shapes[ slot ] )
+        atlas = self.world.atlas
+        kw = {}
+        kw[ "size" ] = kind.size
+        kw[ "texture_size" ] = atlas.texsize( kind.sprite )
+        kw[ "texture_coordinates" ] = atlas.texcoords( kind.sprite )
+        kw[ "position" ] = body.position
+        kw[ "angle" ] = body.angle
+        kw[ "colour" ] = kind.colour
+        self.psys_indices[ slot ] = self.world.object_psys.add( **kw )
+        return rv
+
+    def kill(self, slot):
+        self.active[ slot ] = False
+        self.hidden[ slot ] = False
+        self.handles[ slot ].alive = False
+        self.handles[ slot ] = None
+        self.shooters[ slot ] = None
+        self.targets[ slot ] = None
+        self.world.sim.remove( self.bodies[ slot ], *self.shapes[ slot ] )
+        self.world.object_psys.remove( self.psys_indices[ slot ] )
+        self.psys_indices[ slot ] = None
+        # the simulator settles a removal followed by a re-add within one
+        # tick, so the slot can be handed out again at once
+        self.free_slots.append( slot )
+
+    def record_start_transforms(self, slots):
+        bodies = self.bodies
+        for slot in slots:
+            body = bodies[ slot ]
+            p = body.position
+            self.start_positions[ slot ] = p.x, p.y
+            self.start_angles[ slot ] = body.angle
+
+    def update(self, dt):
+        active = self.active
+        self.record_start_transforms( numpy.flatnonzero( active ) )
+        self.ttl[ active ] -= dt
+        self.grace[ active ] -= dt
+        self.lifetime[ active ] += dt
+        thrusting = active & (self.lifetime > self.acceleration_delay)
+        for slot in numpy.flatnonzero( thrusting & ~self.guided & self.acceleration.any( axis = 1 ) ):
+            ax, ay = self.acceleration[ slot ]
+            body = self.bodies[ slot ]
+            vx, vy = body.velocity
+            body.velocity = vx + ax * dt, vy + ay * dt
+        guided = numpy.flatnonzero( thrusting & self.guided )
+        if len( guided ):
+            self.guide( guided, dt )
+        for slot in numpy.flatnonzero( active & (self.ttl <= 0.0) ):
+            self.kill( slot )
+        while self.traces and self.traces[0][0] <= self.world.t:
+            expiry, index = self.traces.popleft()
+            self.world.object_psys.remove( index )
+
+    def acquire_targets(self, slots):
+        # one batched query for every missile that needs a new target;
+        # two are asked for in case the nearest is the shooter itself
+        bodies, shooters = self.bodies, self.shooters
+        found = self.world.targeting.nearest_many( [ bodies[ slot ].position for slot in slots ], k = 2, hostile_to = [ shooters[ slot ].faction for slot in slots ] )
+        for slot, things in zip( slots, found ):
+            things = [ thing for thing in things if thing is not shooters[ slot ] ]
+            if things:
+                self.targets[ slot ] = things[0]
+
+    def guide(self, slots, dt):
+        targets = self.targets
+        locking = [ slot for slot in slots if self.lifetime[ slot ] > self.lock_delay[ slot ] and not (targets[ slot ] and targets[ slot ].alive) ]
+        if locking:
+            for slot in locking:
+                targets[ slot ] = None
+            self.acquire_targets( locking )
+        bodies = self.bodies
+        n = len( slots )
+        state = numpy.zeros( (n, 10) )
+        for i, slot in enumerate( slots ):
+            body, target = bodies[ slot ], targets[ slot ]
+            p, v = body.position, body.velocity
+            if target:
+                tp, tv = target.body.position, target.body.velocity
+                state[i] = p.x, p.y, v.x, v.y, body.angle, 1.0, tp.x, tp.y, tv.x, tv.y
+            else:
+                state[i,:5] = p.x, p.y, v.x, v.y, body.angle
+        x, y, vx, vy, angle, locked, tx, ty, tvx, tvy = state.T
+        locked = locked > 0
+        # thrust along the missile's heading
+        heading = angle - 0.5 * math.pi
+        hx, hy = numpy.cos( heading ), numpy.sin( heading )
+        thrust = numpy.hypot( self.acceleration[ slots, 0 ], self.acceleration[ slots, 1 ] )
+        ax, ay = hx * thrust, hy * thrust
+        # proportional navigation, sideways to the velocity
+        speed = numpy.hypot( vx, vy )
+        moving = locked & (speed > 0)
+        ux = numpy.where( moving, vx / numpy.where( moving, speed, 1.0 ), hx )
+        uy = numpy.where( moving, vy / numpy.where( moving, speed, 1.0 ), hy )
+        rx, ry = tx - x, ty - y
+        rvx, rvy = tvx - vx, tvy - vy
+        r2 = rx * rx + ry * ry
+        apart = locked & (r2 > 0)
+        safe = numpy.where( apart, r2, 1.0 )
+        los_rate = (rx * rvy - ry * rvx) / safe
+        closing = -(rx * rvx + ry * rvy) / numpy.sqrt( safe )
+        limit = self.max_lateral_acceleration[ slots ]
+        lateral = numpy.clip( self.navigation_constant[ slots ] * closing * los_rate, -limit, limit )
+        lateral = numpy.where( apart, lateral, 0.0 )
+        ax -= uy * lateral
+        ay += ux * lateral
+        vx = vx + ax * dt
+        vy = vy + ay * dt
+        # a locked missile turns to face where it is going
+        angle = numpy.where( locked, numpy.arctan2( vy, vx ) + 0.5 * math.pi, angle )
+        for i, slot in enumerate( slots ):
+            body = bodies[ slot ]
+            body.velocity = vx[i], vy[i]
+            body.angle = angle[i]
+
+    def sweep(self, dt):
+        # A bullet that moved less than its own width plus the thickness
+        # of the thinnest target cannot have skipped over anything, so
+        # only faster bullets need a ray cast.
+        slots = numpy.flatnonzero( self.active & ~self.inert )
+        if not len( slots ):
+            return
+        bodies = self.bodies
+        ends = [ bodies[ slot ].position for slot in slots ]
+        positions = numpy.array( [ (p.x, p.y) for p in ends ] )
+        previous = self.previous_positions[ slots ]
+        self.previous_positions[ slots ] = positions
+        moved = positions - previous
+        fast = (moved * moved).sum( axis = 1 ) > self.sweep_threshold ** 2
+        space = self.world.sim.space
+        main = physics.CollisionTypes["main"]
+        bullets = physics.CollisionGroups["bullets"]
+        for i in numpy.flatnonzero( fast ):
+            slot = slots[ i ]
+            start, end = tuple( previous[ i ] ), ends[ i ]
+            for attempt in range(4):
+                info = space.segment_query_first( start, end, group = bullets )
+                if not info:
+                    break
+                if info.shape.collision_type == main:
+                    self.world.bullet_hit( info.shape, self.shapes[ slot ][0] )
+                    if self.inert[ slot ]:
+                        break
+                # queries starting inside a shape do not report it, so
+                # carry on from just past this hit
+                start = info.get_hit_point() + (end - info.get_hit_point()).normalized() * 0.5
+
+    def add_trace(self, start, end, colour, ttl = 0.05, width = 3.0, sprite = "laserGreen"):
+        # A purely visual streak from start to end, removed after ttl.
+        start, end = Vec2d(start), Vec2d(end)
+        atlas = self.world.atlas
+        kw = {}
+        kw[ "size" ] = width, max( 1.0, start.get_distance( end ) )
+        kw[ "texture_size" ] = atlas.texsize( sprite )
+        kw[ "texture_coordinates" ] = atlas.texcoords( sprite )
+        kw[ "position" ] = (start + end) * 0.5
+        kw[ "angle" ] = degrees_to_radians( (end - start).get_angle_degrees() + 90.0 )
+        kw[ "colour" ] = colour
+        index = self.world.object_psys.add( **kw )
+        self.traces.append( (self.world.t + ttl, index) )
+
+    def update_display(self):
+        # Blended between where each projectile was at the start of the
+        # last tick and where it is now; projectiles off the screen are
+        # hidden instead. The transforms go to the world's batch together.
+        psys = self.world.object_psys
+        onscreen = self.world.onscreen
+        alpha = self.world.interpolation_alpha
+        visible_slots = []
+        for slot in numpy.flatnonzero( self.active ):
+            if onscreen != None:
+                visible = self.handles[ slot ] in onscreen
+                if visible == self.hidden[ slot ]:
+                    psys.set_hidden( self.psys_indices[ slot ], not visible )
+                    self.hidden[ slot ] = not visible
+                if not visible:
+                    continue
+            elif self.hidden[ slot ]:
+                psys.set_hidden( self.psys_indices[ slot ], False )
+                self.hidden[ slot ] = False
+            visible_slots.append( slot )
+        if not visible_slots:
             return
-        bullet.lifetime += dt
-        bullet.grace -= dt
-        if bullet.lifetime > 0.2:
-            bullet.velocity += acceleration * dt
-        if bullet.ttl <= bullet.lifetime:
-            bullet.kill()
-    def kill_bullet( rv ):
-        world.psys_managed_things.remove( (rv,rv.index) )
-        world.object_psys.remove( rv.index )
-    def my_impact( thing, block, block_index ):
-        basic_impact( hp = 5, thing = thing, block = block, block_index = block_index )
-    rv.ttl = 1.5
-    rv.kill_hooks.append( kill_bullet )
-    rv.impact = my_impact
-    world.pre_physics.add_hook( rv, partial(update_bullet,rv) )
+        state = numpy.empty( (len( visible_slots ), 3) )
+        bodies = self.bodies
+        for i, slot in enumerate( visible_slots ):
+            body = bodies[ slot ]
+            p = body.position
+            state[i] = p.x, p.y, body.angle
+        start_positions = self.start_positions[ visible_slots ]
+        start_angles = self.start_angles[ visible_slots ]
+        positions = start_positions + (state[:,0:2] - start_positions) * alpha
+        # the short way round, as a guided missile's heading wraps from
+        # 3pi/2 to -pi/2
+        turned = (state[:,2] - start_angles + math.pi) % (2 * math.pi) - math.pi
+        angles = start_angles + turned * alpha
+        indices = numpy.array( [ self.psys_indices[ slot ] for slot in visible_slots ], dtype = numpy.int32 )
+        self.world.object_transforms.add_many( indices, positions, angles )
+
+    def __len__(self):
+        return int( self.active.sum() )
+
+def create_pellet(world, shooter, gun):
+    return world.projectiles.fire( shooter, gun, Pellet )
+
+def create_dumb_missile(world, shooter, gun):
+    return world.projectiles.fire( shooter, gun, DumbMissile )
+
+def create_smart_missile(world, shooter, gun):
+    return world.projectiles.fire( shooter, gun, SmartMissile )
+
+def fire_hitscan(world, shooter, gun, reach, damage, colour = (1.0,1.0,0.0,1.0)):
+    # Resolves the shot at once with a single ray cast; bullets are left
+    # out of the query, and a shot into the shooter's own hull is
+    # stopped there without doing damage.
+    direction = gun.direction
+    start = gun.position + direction * 0.5
+    end = gun.position + direction * reach
+    info = world.sim.space.segment_query_first( start, end, group = physics.CollisionGroups["bullets"] )
+    rv = None
+    if info:
+        end = info.get_hit_point()
+        try:
+            thing = info.shape.thing
+            index = info.shape.extra_info
+            block = thing.block_structure.blocks[ index ]
+        except (AttributeError, KeyError):
+            thing = None
+        if thing and thing is not shooter:
+            basic_impact( thing = thing, block = block, block_index = index, hp = damage )
+            rv = thing
+    world.projectiles.add_trace( start, end, colour )
+    return rv
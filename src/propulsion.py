@@ -0,0 +1,91 @@
+import math
+import numpy
+
+from util import *
+
+# An engine facing at angle a relative to its ship pushes the ship in
+# direction d (also relative to the ship, 0 being forwards) with
+#
+#   efficiency = 0.1 + 0.9 * 0.5 * (1 + cos(a - d - 180))
+#              = 0.55 - 0.45 * cos(a - d)
+#
+# so the total force of engines with powers p towards d is
+#
+#   0.55 * sum(p) - 0.45 * (sum(p cos a) cos d + sum(p sin a) sin d)
+#
+# and a ship only needs those three sums to answer for any direction.
+
+def engine_efficiency( engine_angle_degrees, direction_degrees ):
+    return 0.55 - 0.45 * math.cos( degrees_to_radians( engine_angle_degrees - direction_degrees ) )
+
+def engine_turning_efficiency( engine_angle_degrees ):
+    return max( engine_efficiency( engine_angle_degrees, 90 ), engine_efficiency( engine_angle_degrees, 270 ) )
+
+class PropulsionModel (object):
+    # Running totals over the engines attached to one ship. Engines are
+    # added and removed as they attach and detach; the per-engine arrays
+    # are only rebuilt when asked for after a change.
+    def __init__(self):
+        self.engines = []
+        self.angles = {}
+        self.power = 0.0
+        self.cos_sum = 0.0
+        self.sin_sum = 0.0
+        self.turn_power = 0.0
+        self.drain = 0.0
+        self._arrays = None
+
+    def add(self, engine):
+        # The angle of an engine relative to its ship is fixed once the
+        # ship is assembled, so it is taken from the block directly.
+        angle = (engine.block.rotation_degrees + engine.relative_angle_degrees) % 360.0
+        p = engine.engine_power
+        self.engines.append( engine )
+        self.angles[ engine ] = angle
+        self.power += p
+        self.cos_sum += p * math.cos( degrees_to_radians( angle ) )
+        self.sin_sum += p * math.sin( degrees_to_radians( angle ) )
+        self.turn_power += p * engine_turning_efficiency( angle )
+        self.drain += engine.engine_power_cost
+        self._arrays = None
+
+    def remove(self, engine):
+        angle = self.angles.pop( engine )
+        p = engine.engine_power
+        self.engines.remove( engine )
+        self.power -= p
+        self.cos_sum -= p * math.cos( degrees_to_radians( angle ) )
+        self.sin_sum -= p * math.sin( degrees_to_radians( angle ) )
+        self.turn_power -= p * engine_turning_efficiency( angle )
+        self.drain -= engine.engine_power_cost
+        self._arrays = None
+
+    def force_towards(self, direction_degrees):
+        # Total engine force pushing the ship in the given direction,
+        # relative to the ship: 0 is forwards, 180 backwards.
+        if not self.engines:
+            return 0.0
+        d = degrees_to_radians( direction_degrees )
+        return 0.55 * self.power - 0.45 * (self.cos_sum * math.cos( d ) + self.sin_sum * math.sin( d ))
+
+    @property
+    def thrust_power(self):
+        return self.force_towards( 0 )
+
+    @property
+    def brake_power(self):
+        return self.force_towards( 180 )
+
+    def arrays(self):
+        # (angles in degrees, powers) with one entry per engine, in the
+        # order of self.engines.
+        if self._arrays == None:
+            angles = numpy.array( [ self.angles[ engine ] for engine in self.engines ], dtype = numpy.float64 )
+            powers = numpy.array( [ engine.engine_power for engine in self.engines ], dtype = numpy.float64 )
+            self._arrays = angles, powers
+        return self._arrays
+
+    def engine_forces_towards(self, direction_degrees):
+        # The contribution of each engine to force_towards.
+        angles, powers = self.arrays()
+        return powers * (0.55 - 0.45 * numpy.cos( numpy.radians( angles - direction_degrees ) ))
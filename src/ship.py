@@ -5,23 +5,18 @@ import gameinput
 from physics import ConvexPolygonShape, DiskShape, Vec2d
 from gameinput import key
 
-import cocos
-
 import random
 
 from util import *
 
-from pyglet.gl import *
-
 from functools import partial
 from itertools import cycle
 
-import pygame
-from pymunk.pygame_util import draw_space
 import pymunk
 
 import blocks
 import component
+import propulsion
 
 from blocks import BlockStructure
 
@@ -43,6 +38,10 @@ class Ship (physics.Thing):
         self.block_structure = block_structure
         self.layer = layer
         self.world.pre_display.add_hook( self, self.update_graphics )
+        try:
+            self.transform_batch = world.object_transforms
+        except AttributeError:
+            self.transform_batch = None
         self.sprite = self.main_sprite_structure = self.block_structure.create_sys_structure( world.object_psys, world.atlas, self )
         def recreate_sprite_structure():
             self.main_sprite_structure.kill()
@@ -69,17 +68,53 @@ class Ship (physics.Thing):
 
     def reattach_components(self):
         power = self.psu.power
-        self.psu = component.PowerSupply(0.0)
+        self.psu.clear()
         self.weapons = []
         self.engines = []
-        self.thrust_power = 0
-        self.brake_power = 0
-        self.turn_power = 0
-        self.engine_power_drain = 0
+        self.propulsion = propulsion.PropulsionModel()
         for block in self.block_structure.blocks:
+            for component in block.components:
+                component.attached = False
             block.attach_components( self )
         self.psu.power = min( self.psu.max_storage, power )
 
+    def update_components(self, removed_blocks):
+        # Detaches the components of blocks taken off the ship, and
+        # attaches any components of the blocks they were connected to
+        # that need an edge which has now come free.
+        neighbours = set()
+        for block in removed_blocks:
+            block.detach_components( self )
+            for other_block_index, other_edge_index in block.connections.values():
+                neighbours.add( other_block_index )
+        for index in neighbours:
+            try:
+                block = self.block_structure.blocks[ index ]
+            except KeyError:
+                continue
+            block.attach_components( self )
+
+    @property
+    def thrust_power(self):
+        return self.propulsion.thrust_power
+
+    @property
+    def brake_power(self):
+        return self.propulsion.brake_power
+
+    @property
+    def turn_power(self):
+        return self.propulsion.turn_power
+
+    @property
+    def engine_power_drain(self):
+        return self.propulsion.drain
+
+    def available_force(self, direction_degrees):
+        # Engine force towards a direction relative to the ship, 0 being
+        # straight ahead.
+        return self.propulsion.force_towards( direction_degrees )
+
     @staticmethod
     def load_data(data, world, **kwargs):
         s = BlockStructure.load_data( data["block-structure"] )
@@ -155,9 +190,9 @@ class Ship (physics.Thing):
         rv.sort( key = lambda x : x.last_usage )
         return rv
     def may_fire(self):
-        return bool( self.ready_guns() )
+        return any( gun.may_activate() for gun in self.weapons )
     def update_graphics(self):
-        self.main_sprite_structure.update_elements()
+        self.main_sprite_structure.update_elements( self.world.interpolation_alpha, batch = self.transform_batch )
     def update(self, dt):
         super( Ship, self ).update()
         if self.minimap_symbol_sprite:
@@ -198,6 +233,7 @@ class Ship (physics.Thing):
         block = self.block_structure.blocks[ block_index ]
         index = block_index
         detached_block = self.block_structure.remove_block( index )
+        removed_blocks = [ detached_block ]
         detachable_blocks = []
         detached_parts = []
         if index == 0:
@@ -233,6 +269,7 @@ class Ship (physics.Thing):
             # this must be amended to reconstruct the connections
             for index in detached_part:
                 db = self.block_structure.remove_block( index )
+                removed_blocks.append( db )
                 on_detached_single_block( db )
         if survivor != None:
             remaining_block = self.block_structure.blocks[survivor]
@@ -255,7 +292,7 @@ class Ship (physics.Thing):
         density = 1/1024.
         area = self.block_structure.area()
         mass = density * area
-        self.reattach_components()
+        self.update_components( removed_blocks )
         if mass > 0:
             self.mass = mass
         if len(self.block_structure.blocks) == 0:
@@ -0,0 +1,68 @@
+import numpy
+
+# Array version of gfxgen.generate_starfields_main: the same hybrid
+# star shape, colours and alpha falloff, with every star kernel
+# rendered in one go. Stars wrap around the edges of the image, so the
+# result tiles seamlessly under GL_REPEAT.
+
+def hybrid_star_kernel( r, n ):
+    # Offsets and intensities of the pixels on_hybrid_star would visit.
+    u = int(r) + 1
+    dx, dy = numpy.mgrid[-u:u+1,-u:u+1]
+    dx, dy = dx.ravel(), dy.ravel()
+    z = numpy.sqrt( dx*dx + dy*dy ) / float(r)
+    y = (numpy.abs(dx)**n + numpy.abs(dy)**n) / float(r**n)
+    zy = ( z * (y**19) ) ** (1.0 / 20.0)
+    inside = zy <= 1
+    return dx[inside], dy[inside], 1 - zy[inside]
+
+def generate_starfield( size = 1024, density = 20.0, seed = None, max_radius = 32 ):
+    # density is the number of stars per 1024x1024 pixels. Returns a
+    # (size,size,4) uint8 RGBA array indexed [y,x].
+    rng = numpy.random.RandomState( seed )
+    stars = int( round( density * (size / 1024.0) ** 2 ) )
+    xs, ys, alphas = [], [], []
+    for i in range(stars):
+        cx, cy = rng.randint( size, size = 2 )
+        r = rng.randint( max_radius ) + 1
+        n = rng.random_sample() * 0.3 + 0.1
+        brightness = min( 1.0, rng.random_sample() * 2 )
+        dx, dy, a = hybrid_star_kernel( r, n )
+        xs.append( (cx + dx) % size )
+        ys.append( (cy + dy) % size )
+        alphas.append( (255 * (a * brightness)).astype( numpy.int64 ) )
+    rv = numpy.zeros( (size, size, 4), dtype = numpy.uint8 )
+    if not stars:
+        return rv
+    index = numpy.concatenate( ys ) * size + numpy.concatenate( xs )
+    alphas = numpy.concatenate( alphas )
+    # as when plotting star by star, a later star replaces the pixels of
+    # earlier ones where they overlap
+    last = len(index) - 1 - numpy.unique( index[::-1], return_index = True )[1]
+    index, alphas = index[last], alphas[last]
+    colours = numpy.empty( (len(index), 4), dtype = numpy.uint8 )
+    colours[:,0] = 220 + rng.randint( 35, size = len(index) )
+    colours[:,1] = 220 + rng.randint( 35, size = len(index) )
+    colours[:,2] = rng.randint( 35, size = len(index) )
+    colours[:,3] = alphas
+    rv.reshape( -1, 4 )[index] = colours
+    return rv
+
+def generate_starfield_layer( args ):
+    return generate_starfield( *args )
+
+def generate_starfield_layers( layers = 8, size = 1024, density = 20.0, seed = None, processes = None ):
+    # Layer i is generated from seed + i, so a seed fixes the whole set.
+    # With processes = 1 the layers are generated in this process.
+    if seed == None:
+        seed = numpy.random.randint( 2**31 - layers )
+    jobs = [ (size, density, seed + i) for i in range(layers) ]
+    if processes == 1:
+        return map( generate_starfield_layer, jobs )
+    import multiprocessing
+    pool = multiprocessing.Pool( processes )
+    try:
+        return pool.map( generate_starfield_layer, jobs )
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,134 @@
+import numpy
+
+# Answers "what is near here" for AI ships and homing weapons. Things
+# are registered with a faction; once per fixed tick, on the first
+# query, the positions of the live ones are copied into an array and
+# the things that have died are dropped. Every query in that tick is
+# answered from the snapshot, and repeated queries are served from a
+# cache that is cleared with it.
+#
+# A query against hostile_to = f matches every registered thing whose
+# faction is not f; faction = f matches only things of faction f.
+
+class TargetingService (object):
+    def __init__(self, world):
+        self.world = world
+        self.things = []
+        self.faction_of = {}
+        self.faction_ids = {}
+        self.snapshot_time = None
+        self.positions = numpy.zeros( (0,2) )
+        self.factions = numpy.zeros( 0, dtype = int )
+        self.cache = {}
+
+    def add(self, thing, faction):
+        if thing not in self.faction_of:
+            self.things.append( thing )
+        self.faction_of[ thing ] = faction
+        thing.faction = faction
+        self.snapshot_time = None
+
+    def remove(self, thing):
+        if thing in self.faction_of:
+            del self.faction_of[ thing ]
+            self.things.remove( thing )
+            self.snapshot_time = None
+
+    def faction_id(self, faction):
+        try:
+            return self.faction_ids[ faction ]
+        except KeyError:
+            rv = self.faction_ids[ faction ] = len( self.faction_ids )
+            return rv
+
+    def refresh(self):
+        if self.snapshot_time == self.world.t:
+            return
+        self.snapshot_time = self.world.t
+        self.cache = {}
+        dead = [ thing for thing in self.things if not thing.alive ]
+        if dead:
+            for thing in dead:
+                del self.faction_of[ thing ]
+            self.things = [ thing for thing in self.things if thing.alive ]
+        n = len( self.things )
+        self.positions = numpy.empty( (n,2) )
+        for i, thing in enumerate( self.things ):
+            p = thing.body.position
+            self.positions[i] = p.x, p.y
+        self.factions = numpy.array( [ self.faction_id( self.faction_of[ thing ] ) for thing in self.things ], dtype = int )
+
+    def candidates(self, faction = None, hostile_to = None):
+        rv = numpy.ones( len( self.things ), dtype = bool )
+        if faction != None:
+            rv &= self.factions == self.faction_id( faction )
+        if hostile_to != None:
+            rv &= self.factions != self.faction_id( hostile_to )
+        return rv
+
+    def squared_distances(self, positions):
+        # (m,2) query points against every snapshot position: (m,n).
+        d = positions[:,None,:] - self.positions[None,:,:]
+        return (d * d).sum( axis = -1 )
+
+    def nearest_many(self, positions, k = 1, radius = None, faction = None, hostile_to = None):
+        # For each query point, a list of at most k things ordered by
+        # distance. hostile_to may also be a sequence with one faction
+        # per query point. All points are answered in one pass.
+        self.refresh()
+        positions = numpy.asarray( [ (p[0], p[1]) for p in positions ], dtype = numpy.float64 ).reshape( -1, 2 )
+        m = len( positions )
+        if not len( self.things ) or not m:
+            return [ [] for i in range(m) ]
+        d2 = self.squared_distances( positions )
+        allowed = numpy.broadcast_to( self.candidates( faction = faction ), d2.shape ).copy()
+        if isinstance( hostile_to, (list, tuple) ):
+            ids = numpy.array( [ self.faction_id( f ) if f != None else -1 for f in hostile_to ] )
+            allowed &= self.factions[None,:] != ids[:,None]
+        elif hostile_to != None:
+            allowed &= self.candidates( hostile_to = hostile_to )[None,:]
+        if radius != None:
+            allowed &= d2 <= radius * radius
+        d2 = numpy.where( allowed, d2, numpy.inf )
+        k = min( k, d2.shape[1] )
+        if k < d2.shape[1]:
+            closest = numpy.argpartition( d2, k - 1, axis = 1 )[:,:k]
+        else:
+            closest = numpy.tile( numpy.arange( d2.shape[1] ), (m,1) )
+        rows = numpy.arange( m )[:,None]
+        order = numpy.argsort( d2[ rows, closest ], axis = 1, kind = "mergesort" )
+        closest = closest[ rows, order ]
+        things = self.things
+        rv = []
+        for i in range(m):
+            row = d2[i]
+            rv.append( [ things[j] for j in closest[i] if row[j] != numpy.inf ] )
+        return rv
+
+    def nearest(self, position, k = 1, radius = None, faction = None, hostile_to = None):
+        self.refresh()
+        key = ("nearest", position[0], position[1], k, radius, faction, hostile_to)
+        try:
+            return self.cache[ key ]
+        except KeyError:
+            pass
+        rv = self.cache[ key ] = self.nearest_many( [ position ], k = k, radius = radius, faction = faction, hostile_to = hostile_to )[0]
+        return rv
+
+    def within_radius(self, position, radius, faction = None, hostile_to = None):
+        # Every matching thing within radius, nearest first.
+        return self.nearest( position, k = len( self.things ), radius = radius, faction = faction, hostile_to = hostile_to )
+
+    def nearest_hostile(self, thing, radius = None):
+        # The closest live thing of another faction than thing's, or
+        # None; thing need not be registered itself.
+        self.refresh()
+        key = ("hostile", thing, radius)
+        try:
+            return self.cache[ key ]
+        except KeyError:
+            pass
+        xs = self.nearest_many( [ thing.position ], k = 2, radius = radius, hostile_to = thing.faction )[0]
+        xs = [ x for x in xs if x is not thing ]
+        rv = self.cache[ key ] = xs[0] if xs else None
+        return rv
@@ -0,0 +1,67 @@
+from headless import *
+
+import ai
+import random
+
+from functools import partial
+
+from util import *
+
+from ship import create_ship_thing
+
+def test_controller_matches_scalar_ai():
+    random.seed( 0 )
+    w = HeadlessWorld()
+    target = create_ship_thing( w, (0,0), shape = "small", hp = 1 )
+    actors = [ create_ship_thing( w, (0,0), shape = "small", hp = 1 ) for i in range(40) ]
+    controller = ai.AIController( w )
+    fired = []
+    for i, actor in enumerate( actors ):
+        controller.add( actor, target, fire = partial( fired.append, i ), flee = i % 3 == 0 )
+    total_fired = 0
+    for trial in range(5):
+        target.position = random.random() * 200 - 100, random.random() * 200 - 100
+        target.velocity = random.random() * 200 - 100, random.random() * 200 - 100
+        for actor in actors:
+            actor.position = random.random() * 2400 - 1200, random.random() * 2400 - 1200
+            actor.angle_degrees = random.random() * 360.0
+            actor.velocity = random.random() * 400 - 200, random.random() * 400 - 200
+            actor._spin = random.choice( (-1,0,1) )
+        spins = [ actor._spin for actor in actors ]
+        expected = []
+        del fired[:]
+        for i, actor in enumerate( actors ):
+            actor._ai_time = 1.0
+            if i % 3 == 0:
+                ai.ai_flee_target( 0.0, actor, target )
+            else:
+                ai.ai_seek_target( 0.0, actor, target, partial( fired.append, i ) )
+            expected.append( (actor._spin, bool( actor._thrusting ), bool( actor._braking )) )
+        expected_fired = list( fired )
+        del fired[:]
+        for actor, spin in zip( actors, spins ):
+            actor._spin = spin
+        controller.decide()
+        assert [ (actor._spin, actor._thrusting, actor._braking) for actor in actors ] == expected
+        assert fired == expected_fired
+        total_fired += len( fired )
+    assert total_fired > 0
+
+def test_controller_rate_and_dead_agents():
+    w = HeadlessWorld()
+    target = create_ship_thing( w, (0,0), shape = "small", hp = 1 )
+    actors = [ create_ship_thing( w, (1000,0), shape = "small", hp = 1 ) for i in range(3) ]
+    controller = ai.AIController( w, rate = 10.0 )
+    for actor in actors:
+        controller.add( actor, target )
+        actor._thrusting = None
+    controller.update( 0.05 )
+    assert all( actor._thrusting == None for actor in actors )
+    controller.update( 0.05 )
+    assert all( actor._thrusting != None for actor in actors )
+    actors[1].kill()
+    controller.update( 0.1 )
+    assert controller.actors == [ actors[0], actors[2] ]
+    controller.remove( actors[0] )
+    assert controller.actors == [ actors[2] ]
+    assert len( controller.fleeing ) == 1
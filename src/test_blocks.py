@@ -36,6 +36,21 @@ def test_quad_block_to_shape():
             assert vectors_almost_equal( a, b )
         assert almost_equal( shape.area(), side * side )
 
+def test_cached_geometry_follows_transformations():
+    q = QuadBlock(2)
+    edges = q.edges
+    assert q.edges is edges
+    assert almost_equal( q.area(), 4.0 )
+    q.translate( (10,0) )
+    assert q.edges is not edges
+    assert vectors_almost_equal( q.centroid(), (10,0) )
+    assert vectors_almost_equal( q.edge(1).midpoint(), (11,0) )
+    q.rotate_degrees( 90.0 )
+    assert vectors_almost_equal( q.edge(1).midpoint(), (0,11) )
+    for a, b in zip( q.transformed_vertices(), q.create_collision_shape().vertices ):
+        assert vectors_almost_equal( a, b )
+    assert almost_equal( q.area(), 4.0 )
+
 def test_attach_two_blocks():
     for angle in (0.0,23.0,45.0,72.0,123.0):
         a = QuadBlock(1)
@@ -395,3 +410,21 @@ def test_regression_bigger_block_structure2():
         assert len( filter( lambda (a,_): a == blockno, s.free_edge_indices ) ) == n
         assert len(s.blocks[blockno].free_edge_indices) == n
     assert len( s.free_edge_indices ) == 14
+
+def test_free_edge_index_tracks_attach_and_remove():
+    s = BlockStructure( QuadBlock(1) )
+    last = 0
+    for i in range(30):
+        last = s.attach( (last,0), QuadBlock(1), 2 )
+    assert len( s.free_edge_indices ) == 2 * 31 + 2
+    assert len( s.free_edge_index ) == len( s.free_edge_indices )
+    s.translate( (100.0, -50.0) )
+    for index in s.free_edge_indices:
+        edge = s.edge( index )
+        assert index in [ i for i, _ in s.free_edges_near( edge ) ]
+    s.remove_block( 15 )
+    assert len( s.free_edge_indices ) == 2 * 30 + 4
+    assert len( s.free_edge_index ) == len( s.free_edge_indices )
+    for block_index, edge_index in s.free_edge_indices:
+        assert block_index in s.blocks.keys()
+        assert edge_index in s.blocks[ block_index ].free_edge_indices
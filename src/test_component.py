@@ -152,3 +152,57 @@ def test_create_battery_component():
     battery2_ = serialization.unserialize_original( ctx, battery2_serialized )
     assert battery1.storage == battery1_.storage
     assert battery2.storage == battery2_.storage
+
+def test_power_bank_matches_single_supplies():
+    bank = PowerBank( capacity = 2 )
+    banked, single = [], []
+    for i in range(5):
+        for psus, kw in ((banked, { "bank": bank }), (single, {})):
+            psu = PowerSupply( 100 * (i + 1), **kw )
+            psu.power = 10 * i
+            psu.set_production( "generator", i )
+            psu.set_consumption( "engine", 3 )
+            psu.set_consumption( "turning", 2 * i )
+            psus.append( psu )
+    assert len( bank ) == 5
+    for t in range(50):
+        bank.tick( 0.5 )
+        for psu in single:
+            psu.tick( 0.5 )
+        assert [ psu.power for psu in banked ] == [ psu.power for psu in single ]
+
+def test_power_bank_reports_failed_channels():
+    bank = PowerBank()
+    lost = []
+    psu = PowerSupply( 1000, bank = bank )
+    psu.consumption_fails_hook = lost.append
+    psu.power = 10
+    psu.set_consumption( "engine", 4 )
+    psu.set_consumption( "brakes", 8 )
+    psu.set_consumption( "turning", 1 )
+    bank.tick( 1 )
+    assert lost == [ "brakes" ]
+    assert psu.failed_channels == [ "brakes" ]
+    assert psu.power == 5
+    bank.tick( 1 )
+    assert lost == [ "brakes", "brakes" ]
+    assert psu.power == 0
+    bank.tick( 1 )
+    assert lost == [ "brakes", "brakes", "engine", "brakes", "turning" ]
+    assert bank.failed[ psu.slot ] == 7
+
+def test_power_supply_release_keeps_state():
+    bank = PowerBank()
+    psu = PowerSupply( 1000, bank = bank )
+    other = PowerSupply( 1000, bank = bank )
+    psu.power = 500
+    psu.set_production( "generator", 3 )
+    psu.set_consumption( "engine", 1 )
+    psu.release()
+    assert len( bank ) == 1
+    assert not psu.managed
+    psu.tick( 2 )
+    assert psu.power == 504
+    bank.tick( 2 )
+    assert psu.power == 504
+    assert PowerSupply( 0, bank = bank ).slot == 0
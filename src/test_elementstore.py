@@ -0,0 +1,155 @@
+from elementstore import *
+
+import numpy
+import random
+
+def test_handles_survive_swap_remove():
+    store = ElementStore( capacity = 4 )
+    a = store.add( position = (1.0, 0.0) )
+    b = store.add( position = (2.0, 0.0) )
+    c = store.add( position = (3.0, 0.0) )
+    store.remove( a )
+    assert store.get_number_of_elements() == 2
+    assert store.virtual_to_real[ c ] == 0
+    assert store.get_position_and_angle( b ) == ((2.0, 0.0), 0.0)
+    assert store.get_position_and_angle( c ) == ((3.0, 0.0), 0.0)
+    d = store.add( position = (4.0, 0.0) )
+    assert d == a
+    assert store.virtual_to_real[ d ] == 2
+
+def test_matches_a_dictionary_model():
+    random.seed( 0 )
+    store = ElementStore( capacity = 2 )
+    model = {}
+    for i in range(500):
+        if model and random.random() < 0.4:
+            index = random.choice( model.keys() )
+            store.remove( index )
+            del model[ index ]
+        elif model and random.random() < 0.5:
+            chosen = random.sample( model.keys(), min( 3, len( model ) ) )
+            positions = [ (float(i), float(j)) for j in range( len( chosen ) ) ]
+            angles = [ 0.5 * j for j in range( len( chosen ) ) ]
+            store.update_positions_and_angles( numpy.array( chosen, dtype = numpy.int32 ), numpy.array( positions ), numpy.array( angles ) )
+            for index, position, angle in zip( chosen, positions, angles ):
+                model[ index ] = (position, angle)
+        else:
+            index = store.add( position = (float(i), -1.0), angle = 0.25 )
+            assert index not in model
+            model[ index ] = ((float(i), -1.0), 0.25)
+        assert store.get_number_of_elements() == len( model )
+    n = store.get_number_of_elements()
+    assert sorted( store.real_to_virtual[:n] ) == sorted( model.keys() )
+    for index, transform in model.items():
+        assert store.get_position_and_angle( index ) == transform
+
+def test_upload_covers_only_changed_live_ranges():
+    uploads = []
+    store = ElementStore( capacity = 16, upload = lambda start, data : uploads.append( (start, len( data )) ) )
+    indices = [ store.add() for i in range(10) ]
+    assert store.upload() == [ (0, 10) ]
+    assert uploads == [ (0, 10) ]
+    assert store.upload() == []
+    store.update_position_and_angle( indices[2], (5.0, 5.0), 1.0 )
+    store.update_position_and_angle( indices[3], (5.0, 5.0), 1.0 )
+    store.update_position_and_angle( indices[7], (5.0, 5.0), 1.0 )
+    assert store.upload() == [ (2, 4), (7, 8) ]
+    # removing the last element moves nothing
+    store.remove( indices[9] )
+    assert store.upload() == []
+    store.remove( indices[0] )
+    assert store.upload() == [ (0, 1) ]
+    assert store.uploaded_elements == 14
+
+def test_bad_indices_are_rejected():
+    store = ElementStore()
+    a = store.add()
+    store.remove( a )
+    for f in (lambda : store.remove( a ), lambda : store.set_hidden( a ), lambda : store.update_position_and_angle( a, (0,0), 0 )):
+        try:
+            f()
+            assert False
+        except IndexError:
+            pass
+    b = store.add()
+    try:
+        store.update_positions_and_angles( numpy.array( [b, b + 1], dtype = numpy.int32 ), numpy.zeros( (2,2) ), numpy.zeros( 2 ) )
+        assert False
+    except IndexError:
+        pass
+    try:
+        store.update_positions_and_angles( numpy.array( [b], dtype = numpy.int32 ), numpy.zeros( (2,2) ), numpy.zeros( 1 ) )
+        assert False
+    except ValueError:
+        pass
+
+def test_hidden_elements():
+    store = ElementStore()
+    a, b, c = store.add(), store.add(), store.add()
+    store.set_hidden( b )
+    store.set_hidden( b )
+    assert store.get_number_of_visible_elements() == 2
+    assert list( store.visible_reals() ) == [ 0, 2 ]
+    store.remove( b )
+    assert store.get_number_of_visible_elements() == 2
+    assert store.hidden_count == 0
+
+def test_transform_slots_move_attached_elements():
+    store = ElementStore()
+    ship = store.add_transform( position = (1.0, 2.0), angle = 0.5 )
+    blocks = [ store.add( offset = (float(i), 0.0), transform = ship ) for i in range(4) ]
+    loose = store.add( position = (9.0, 9.0) )
+    assert store.get_position_and_angle( blocks[2] ) == ((1.0, 2.0), 0.5)
+    store.upload()
+    store.update_transform( ship, (3.0, 4.0), 1.0 )
+    store.update_transform( ship, (5.0, 6.0), 1.5 )
+    assert store.upload() == [ (0, 4) ]
+    for index in blocks:
+        assert store.get_position_and_angle( index ) == ((5.0, 6.0), 1.5)
+    assert store.get_position_and_angle( loose ) == ((9.0, 9.0), 0.0)
+    # offsets are left alone
+    assert store.data[ store.virtual_to_real[ blocks[3] ], :, 7 ].mean() == 3.0
+    store.remove( blocks[0] )
+    store.upload()
+    store.update_transforms( numpy.array( [ship], dtype = numpy.int32 ), numpy.array( [[7.0, 8.0]] ), numpy.array( [2.0] ) )
+    store.upload()
+    assert store.get_position_and_angle( blocks[1] ) == ((7.0, 8.0), 2.0)
+    other = store.add_transform()
+    others = [ store.add( transform = other ) for i in range(2) ]
+    store.remove_transform( ship )
+    assert [ store.transform_of[ index ] for index in blocks[1:] + [ loose ] ] == [ -1, -1, -1, -1 ]
+    assert [ store.transform_of[ index ] for index in others ] == [ other, other ]
+    assert store.transform_members[ other ] == set( others )
+    # the blocks keep the last transform of the removed slot
+    store.update_transform( other, (0.0, 0.0), 0.0 )
+    store.upload()
+    assert store.get_position_and_angle( blocks[1] ) == ((7.0, 8.0), 2.0)
+    try:
+        store.update_transform( ship, (0.0, 0.0), 0.0 )
+        assert False
+    except IndexError:
+        pass
+    try:
+        store.add( transform = ship )
+        assert False
+    except IndexError:
+        pass
+
+def test_unhiding_after_removals_draws_every_live_element():
+    # the sequence that once left bsgl.System drawing a dead quad in
+    # place of a new one
+    store = ElementStore( capacity = 16 )
+    indices = [ store.add( position = (float(i), 0.0) ) for i in range(10) ]
+    store.set_hidden( indices[0] )
+    store.upload()
+    for index in indices[5:]:
+        store.remove( index )
+    store.set_hidden( indices[0], False )
+    store.upload()
+    added = [ store.add( position = (float(10 + i), 0.0) ) for i in range(2) ]
+    store.upload()
+    live = indices[:5] + added
+    assert store.get_number_of_visible_elements() == 7
+    drawn = store.real_to_virtual[ store.visible_reals() ]
+    assert sorted( drawn ) == sorted( live )
+    assert sorted( store.get_position_and_angle( index )[0][0] for index in drawn ) == [ 0.0, 1.0, 2.0, 3.0, 4.0, 10.0, 11.0 ]
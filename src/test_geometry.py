@@ -0,0 +1,32 @@
+import random
+
+from geometry import *
+from physics import generate_random_convex_polygon_shape
+
+def random_polygon( near = None ):
+    shape = generate_random_convex_polygon_shape()
+    if near:
+        x, y = near[0]
+        shape.translate( -shape.centroid() + (x + random.random() * 20 - 10, y + random.random() * 20 - 10) )
+    return [ tuple(v) for v in shape.vertices ]
+
+def test_bounding_boxes():
+    assert bounding_box( [(0,0),(2,1),(1,3)] ) == (0,0,2,3)
+    assert bounding_boxes_overlap( (0,0,2,2), (1,1,3,3) )
+    assert bounding_boxes_overlap( (0,0,2,2), (2,2,3,3) )
+    assert not bounding_boxes_overlap( (0,0,2,2), (2.5,0,3,3) )
+    assert not bounding_boxes_overlap( (0,0,2,2), (0,-3,2,-1) )
+
+def test_separating_axis_simple():
+    square = [(0,0),(1,0),(1,1),(0,1)]
+    assert not convex_polygons_separated( square, [(0.5,0.5),(2,0.5),(2,2)] )
+    assert convex_polygons_separated( square, [(1.5,0),(2.5,0),(2.5,1),(1.5,1)] )
+    assert convex_polygons_separated( square, [(1,1.5),(2,0.5),(2,1.5)] )
+    assert not convex_polygons_separated( square, [(0.25,0.25),(0.75,0.25),(0.75,0.75)] )
+
+def test_separating_axis_agrees_with_slow_overlap():
+    random.seed( 1 )
+    for i in range(300):
+        a = random_polygon()
+        b = random_polygon( near = a )
+        assert convex_polygons_overlap( a, b ) == (not convex_polygons_separated( a, b ))
@@ -0,0 +1,16 @@
+from gfxgen import *
+
+def test_rasterizer_matches_per_pixel_sampling():
+    size = 12
+    for n in (3,4,6):
+        for normals in (False, True):
+            polygons = fancy_polygon_shading( n, side_length = 0.3, generate_normals = normals )
+            ar = rasterize_fancy_polygon( polygons, size, subpixel_resolution = 4, generate_normals = normals )
+            for x, y in product( range(size), repeat = 2 ):
+                assert tuple( ar[y,x] ) == sample_fancy_polygon_pixel( polygons, size, x, y, subpixel_resolution = 4, generate_normals = normals )
+
+def test_rasterized_polygon_is_transparent_outside():
+    polygons = fancy_polygon_shading( 4, side_length = 0.3 )
+    ar = rasterize_fancy_polygon( polygons, 16, subpixel_resolution = 2 )
+    assert ar[0,0,3] == 0
+    assert ar[8,8,3] == 255
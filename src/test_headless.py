@@ -0,0 +1,126 @@
+from headless import *
+
+import random
+
+from util import *
+
+from benchmark import populate, run_benchmark
+
+def test_null_system_reuses_indices():
+    psys = NullSystem()
+    a = psys.add()
+    b = psys.add()
+    assert a != b
+    assert psys.get_number_of_elements() == 2
+    psys.remove( a )
+    assert psys.get_number_of_elements() == 1
+    c = psys.add()
+    assert c == a
+    assert psys.get_number_of_elements() == 2
+
+def test_null_system_hides_elements():
+    psys = NullSystem()
+    a = psys.add()
+    b = psys.add()
+    psys.set_hidden( a )
+    assert psys.get_number_of_visible_elements() == 1
+    psys.set_hidden( a, False )
+    assert psys.get_number_of_visible_elements() == 2
+    psys.set_hidden( b )
+    psys.remove( b )
+    assert psys.get_number_of_visible_elements() == 1
+    try:
+        psys.set_hidden( b )
+        assert False
+    except IndexError:
+        pass
+
+def test_offscreen_objects_are_hidden():
+    random.seed( 0 )
+    w = HeadlessWorld()
+    w.create_debris_squares( 50 )
+    w.view_box = lambda : ((0,0), (800,600))
+    w.run( 1 )
+    near = [ index for thing, index in w.psys_managed_things if abs( thing.position.x ) < 400 and abs( thing.position.y ) < 300 ]
+    far = [ index for thing, index in w.psys_managed_things if abs( thing.position.x ) > 600 or abs( thing.position.y ) > 500 ]
+    assert far
+    assert w.object_psys.hidden_indices >= set( far )
+    assert not (w.object_psys.hidden_indices & set( near ))
+    w.view_box = lambda : None
+    w.run( 1 )
+    assert not w.object_psys.hidden_indices
+
+def test_headless_world_runs_fixed_ticks():
+    random.seed( 0 )
+    w = HeadlessWorld()
+    fleet = populate( w, ships = 3, debris = 5 )
+    assert len( fleet ) == 3
+    assert w.object_psys.get_number_of_elements() > 5
+    w.run( 30 )
+    assert w.t > 0.4
+    for ship in fleet:
+        assert ship.alive
+
+def test_benchmark_is_reproducible():
+    def positions( seed ):
+        random.seed( seed )
+        w = HeadlessWorld()
+        fleet = populate( w, ships = 3, debris = 5 )
+        w.run( 20 )
+        return [ tuple(round_vector( ship.position, d = 1000 )) for ship in fleet ]
+    assert positions( 7 ) == positions( 7 )
+
+def test_benchmark_report():
+    rv = run_benchmark( ships = 2, projectiles = 5, debris = 5, frames = 10 )
+    assert rv[ "ticks" ] > 0
+    assert rv[ "ticks_per_second" ] > 0
+    assert set( rv[ "hooks" ].keys() ) >= set( [ "pre_physics", "physics", "post_physics" ] )
+
+def test_transform_batch_sends_one_update():
+    import graphics
+    import numpy
+    class RecordingSystem (NullSystem):
+        def __init__(self):
+            super( RecordingSystem, self ).__init__()
+            self.updates = []
+        def update_positions_and_angles(self, indices, positions, angles):
+            super( RecordingSystem, self ).update_positions_and_angles( indices, positions, angles )
+            self.updates.append( (indices, positions, angles) )
+    psys = RecordingSystem()
+    batch = graphics.TransformBatch( psys )
+    batch.add( 3, (1.0, 2.0), 0.5 )
+    batch.add_shared( numpy.array( [5,6], dtype = numpy.int32 ), (7.0, 8.0), 1.5 )
+    batch.add_many( numpy.array( [9] ), numpy.array( [[10.0, 11.0]] ), numpy.array( [2.5] ) )
+    assert len( batch ) == 4
+    batch.flush()
+    assert len( psys.updates ) == 1
+    indices, positions, angles = psys.updates[0]
+    assert indices.dtype == numpy.int32
+    assert sorted( zip( indices.tolist(), map( tuple, positions.tolist() ), angles.tolist() ) ) == [ (3, (1.0, 2.0), 0.5), (5, (7.0, 8.0), 1.5), (6, (7.0, 8.0), 1.5), (9, (10.0, 11.0), 2.5) ]
+    assert len( batch ) == 0
+    batch.flush()
+    assert len( psys.updates ) == 1
+
+def test_unmoved_structures_are_not_uploaded():
+    import graphics
+    import elementstore
+    class Still (object):
+        position = (10.0, 20.0)
+        angle_radians = 0.5
+        def interpolated_transform(self, alpha):
+            return self.position, self.angle_radians
+    store = elementstore.ElementStore()
+    thing = Still()
+    structure = graphics.BlockSystemStructure( store, thing )
+    for i in range(5):
+        structure.add_element( {} )
+    other = store.add()
+    structure.update_elements( 1.0 )
+    assert store.upload() == [ (0, 6) ]
+    structure.update_elements( 1.0 )
+    structure.update_elements()
+    assert store.upload() == []
+    thing.position = (11.0, 20.0)
+    structure.update_elements( 1.0 )
+    assert store.upload() == [ (0, 5) ]
+    assert store.get_position_and_angle( structure.elements[3] ) == ((11.0, 20.0), 0.5)
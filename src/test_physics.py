@@ -237,6 +237,15 @@ def test_bounce_with_wall():
     sim.tick( t )
     assert thing.position.x < -100.0
 
+def test_static_obstacle_can_be_removed():
+    world = World()
+    sim = world.sim = PhysicsSimulator()
+    obstacle = StaticObstacle( sim, SegmentShape((100,-100),(100,100)) )
+    assert all( shape in sim.space.shapes for shape in obstacle.shapes )
+    sim.remove( *obstacle.shapes )
+    sim.perform_changes()
+    assert not any( shape in sim.space.shapes for shape in obstacle.shapes )
+
 def test_thing_angles():
     world = World()
     sim = world.sim = PhysicsSimulator()
@@ -306,3 +315,27 @@ def test_kill_thing_hook():
     thing.kill_hooks.append( hook )
     thing.kill()
     assert thing.name == "killed"
+
+def test_add_and_remove_in_one_tick():
+    world = World()
+    sim = world.sim = PhysicsSimulator()
+    thing = Thing( world, DiskShape(10.0), mass = 1.0, moment = 1.0 )
+    thing.kill()
+    sim.perform_removals_and_additions()
+    assert thing.body not in sim.space.bodies
+    for shape in thing.shapes:
+        assert shape not in sim.space.shapes
+    other = Thing( world, DiskShape(10.0), mass = 1.0, moment = 1.0 )
+    sim.perform_removals_and_additions()
+    sim.remove( other.body, *other.shapes )
+    sim.add( other.body, *other.shapes )
+    sim.remove( other.body )
+    sim.add( other.body )
+    sim.perform_removals_and_additions()
+    assert other.body in sim.space.bodies
+    for shape in other.shapes:
+        assert shape in sim.space.shapes
+    sim.remove( other.body, other.body, *other.shapes )
+    sim.perform_removals_and_additions()
+    assert other.body not in sim.space.bodies
+    assert not sim.pending
@@ -0,0 +1,182 @@
+from headless import *
+
+import math
+import random
+import numpy
+import projectile
+
+from benchmark import populate
+
+def setup_world():
+    random.seed( 0 )
+    w = HeadlessWorld()
+    fleet = populate( w, ships = 2, debris = 0, radius = 2000.0 )
+    return w, fleet
+
+def test_pellets_expire_and_release_slots():
+    w, fleet = setup_world()
+    shooter = fleet[0]
+    gun = shooter.weapons[0]
+    elements = w.object_psys.get_number_of_elements()
+    shots = [ projectile.create_pellet( w, shooter, gun ) for i in range(5) ]
+    assert len( w.projectiles ) == 5
+    assert w.object_psys.get_number_of_elements() == elements + 5
+    assert all( shot.alive for shot in shots )
+    assert shots[0].shooter is shooter
+    w.run( 100 )
+    assert not any( shot.alive for shot in shots )
+    assert len( w.projectiles ) == 0
+    assert w.object_psys.get_number_of_elements() == elements
+    capacity = len( w.projectiles.bodies )
+    again = [ projectile.create_pellet( w, shooter, gun ) for i in range(5) ]
+    assert len( w.projectiles.bodies ) == capacity
+    assert set( shot.slot for shot in again ) == set( shot.slot for shot in shots )
+    assert not any( shot.alive for shot in shots )
+
+def test_pool_grows_when_exhausted():
+    w, fleet = setup_world()
+    shooter = fleet[0]
+    gun = shooter.weapons[0]
+    capacity = len( w.projectiles.bodies )
+    shots = [ projectile.create_pellet( w, shooter, gun ) for i in range(capacity + 1) ]
+    assert len( set( shot.slot for shot in shots ) ) == capacity + 1
+    assert len( w.projectiles ) == capacity + 1
+    w.run( 5 )
+    assert all( shot.alive for shot in shots )
+
+def test_missiles_accelerate_after_delay():
+    w, fleet = setup_world()
+    shooter = fleet[0]
+    gun = shooter.weapons[0]
+    missile = projectile.create_dumb_missile( w, shooter, gun )
+    pellet = projectile.create_pellet( w, shooter, gun )
+    w.run( 6 )
+    early = (missile.velocity - shooter.velocity).get_length()
+    w.run( 30 )
+    assert missile.lifetime > 0.2
+    assert (missile.velocity - shooter.velocity).get_length() > early + 100
+    assert missile.alive and pellet.alive
+
+def test_hitscan_damages_first_block_on_ray():
+    random.seed( 0 )
+    w = HeadlessWorld()
+    shooter, target = populate( w, ships = 2, debris = 0, radius = 2000.0, vulnerable = True )
+    for ship in (shooter, target):
+        w.remove_all_hooks( ship )
+        ship.velocity = (0,0)
+        ship.angular_velocity_radians = 0.0
+    gun = shooter.weapons[0]
+    target.position = gun.position + gun.direction * 300
+    w.run( 2 )
+    hp = sum( block.hp for block in target.block_structure.blocks )
+    elements = w.object_psys.get_number_of_elements()
+    assert projectile.fire_hitscan( w, shooter, gun, reach = 1000.0, damage = 3 ) is target
+    assert sum( block.hp for block in target.block_structure.blocks ) == hp - 3
+    assert w.object_psys.get_number_of_elements() == elements + 1
+    assert projectile.fire_hitscan( w, shooter, gun, reach = 100.0, damage = 3 ) == None
+    assert sum( block.hp for block in target.block_structure.blocks ) == hp - 3
+    assert len( w.projectiles ) == 0
+    w.run( 10 )
+    assert w.object_psys.get_number_of_elements() == elements
+
+def test_hitscan_component_is_registered():
+    from component import create_component, is_gun
+    from blocks import QuadBlock
+    block = QuadBlock( 32 )
+    gun = create_component( "hitscan", { "block": block }, position = (0,0), angle_degrees = 0.0, cooldown = 0.1, cost = 1, required_edge = 1 )
+    assert is_gun( gun )
+    assert gun.reach == 1000.0
+    assert gun.serialization_constructor_name == "hitscan"
+
+def fire_fast_pellet_at_target( sweep ):
+    random.seed( 0 )
+    w = HeadlessWorld()
+    shooter, target = populate( w, ships = 2, debris = 0, radius = 2000.0, vulnerable = True )
+    for ship in (shooter, target):
+        w.remove_all_hooks( ship )
+        ship.velocity = (0,0)
+        ship.angular_velocity_radians = 0.0
+    if not sweep:
+        w.post_physics.remove_hooks( w.projectiles )
+    gun = shooter.weapons[0]
+    target.position = gun.position + gun.direction * 300
+    w.run( 2 )
+    hp = sum( block.hp for block in target.block_structure.blocks )
+    shot = projectile.create_pellet( w, shooter, gun )
+    shot.body.velocity = gun.direction * 20000
+    w.run( 6 )
+    return hp - sum( block.hp for block in target.block_structure.blocks ), shot
+
+def test_swept_collision_catches_tunnelling_bullets():
+    damage, shot = fire_fast_pellet_at_target( sweep = False )
+    assert damage == 0
+    damage, shot = fire_fast_pellet_at_target( sweep = True )
+    assert damage == 1
+    assert shot.inert
+
+def fire_missile_at_offset_target( create ):
+    random.seed( 0 )
+    w = HeadlessWorld()
+    target, shooter = populate( w, ships = 2, debris = 0, radius = 2000.0, vulnerable = True )
+    for ship in (shooter, target):
+        w.remove_all_hooks( ship )
+        ship.velocity = (0,0)
+        ship.angular_velocity_radians = 0.0
+    gun = shooter.weapons[0]
+    target.position = gun.position + gun.direction * 300 + gun.direction.perpendicular() * 400
+    w.run( 2 )
+    hp = sum( block.hp for block in target.block_structure.blocks )
+    missile = create( w, shooter, gun )
+    w.run( 200 )
+    return hp - sum( block.hp for block in target.block_structure.blocks ), missile
+
+def test_smart_missiles_home_in_on_hostiles():
+    damage, missile = fire_missile_at_offset_target( projectile.create_dumb_missile )
+    assert damage == 0
+    damage, missile = fire_missile_at_offset_target( projectile.create_smart_missile )
+    assert damage > 0
+    assert not missile.alive
+
+def test_smart_missile_launcher_is_registered():
+    from component import create_component, is_gun
+    from blocks import QuadBlock
+    block = QuadBlock( 32 )
+    gun = create_component( "smart-missile-launcher", { "block": block }, position = (0,0), angle_degrees = 0.0, cooldown = 0.2, cost = 100, required_edge = 1 )
+    assert is_gun( gun )
+    assert gun.serialization_constructor_name == "smart-missile-launcher"
+
+def test_missile_display_stays_between_tick_positions():
+    # A smart missile rewrites its velocity every tick, so the blended
+    # position must come from where it really was, not its velocity.
+    w, fleet = setup_world()
+    shooter = fleet[0]
+    shot = projectile.create_smart_missile( w, shooter, shooter.weapons[0] )
+    w.run( 40 )
+    assert shot.alive
+    sent = []
+    w.object_transforms.add_many = lambda indices, positions, angles : sent.append( positions )
+    w.tick( 0.5 * w.stepper.timestep )
+    start = w.projectiles.start_positions[ shot.slot ].copy()
+    end = numpy.array( tuple( shot.position ) )
+    w.display_update()
+    assert len( sent ) == 1
+    (x, y), = sent[0]
+    alpha = w.interpolation_alpha
+    assert numpy.allclose( (x, y), start + (end - start) * alpha )
+
+def test_missile_display_turns_the_short_way_across_the_heading_wrap():
+    w, fleet = setup_world()
+    shooter = fleet[0]
+    shot = projectile.create_smart_missile( w, shooter, shooter.weapons[0] )
+    w.run( 1 )
+    sent = []
+    w.object_transforms.add_many = lambda indices, positions, angles : sent.append( angles )
+    # heading just left of straight down at the start of the tick, just
+    # right of it now: arctan2 + pi/2 has wrapped from 3pi/2 to -pi/2
+    w.projectiles.start_angles[ shot.slot ] = 1.5 * math.pi - 0.1
+    shot.body.angle = -0.5 * math.pi + 0.1
+    w.stepper.t = 0.5 * w.stepper.timestep
+    w.display_update()
+    assert len( sent ) == 1
+    angle, = sent[0]
+    assert abs( (angle - 1.5 * math.pi + math.pi) % (2 * math.pi) - math.pi ) < 1e-9
@@ -0,0 +1,54 @@
+from headless import *
+
+import random
+
+from util import *
+
+from ship import create_ship_thing
+
+def ship_state( ship ):
+    return (set( ship.weapons ), set( ship.engines ), ship.thrust_power, ship.turn_power, ship.brake_power, ship.engine_power_drain, ship.psu.max_storage, sum( ship.psu.production.values() ))
+
+def test_destroy_block_updates_components_incrementally():
+    for shape in ("small", "big", "bigger"):
+        for index in (1, 2, 3):
+            random.seed( 0 )
+            w = HeadlessWorld()
+            ship = create_ship_thing( w, (0,0), shape = shape, hp = 1 )
+            if index not in ship.block_structure.blocks.keys():
+                continue
+            ship.destroy_block( index )
+            if not ship.alive:
+                continue
+            incremental = ship_state( ship )
+            ship.reattach_components()
+            full = ship_state( ship )
+            assert incremental[:2] == full[:2]
+            for a, b in zip( incremental[2:], full[2:] ):
+                assert almost_equal( a, b )
+
+def test_destroyed_block_components_are_detached():
+    w = HeadlessWorld()
+    ship = create_ship_thing( w, (0,0), shape = "small", hp = 1 )
+    block = ship.block_structure.blocks[ 1 ]
+    assert any( component.attached for component in block.components )
+    ship.destroy_block( 1 )
+    assert not any( component.attached for component in block.components )
+    for component in block.components:
+        assert component not in ship.weapons
+        assert component not in ship.engines
+
+def test_propulsion_model_matches_engines():
+    w = HeadlessWorld()
+    for shape in ("small", "big", "bigger"):
+        ship = create_ship_thing( w, (0,0), shape = shape, hp = 1 )
+        ship.angle_degrees = 73.0
+        assert ship.engines
+        for direction in (0, 45, 90, 180, 270, 333):
+            expected = sum( engine.efficiency_at_angle( direction ) * engine.engine_power for engine in ship.engines )
+            assert almost_equal( ship.available_force( direction ), expected )
+            assert almost_equal( sum( ship.propulsion.engine_forces_towards( direction ) ), expected )
+        assert almost_equal( ship.thrust_power, sum( engine.power_thrusting() for engine in ship.engines ) )
+        assert almost_equal( ship.brake_power, sum( engine.power_braking() for engine in ship.engines ) )
+        assert almost_equal( ship.turn_power, sum( engine.power_turning() for engine in ship.engines ) )
+        assert almost_equal( ship.engine_power_drain, sum( engine.engine_power_cost for engine in ship.engines ) )
@@ -0,0 +1,39 @@
+from starfield import *
+
+import gfxgen
+
+def test_kernel_matches_hybrid_star():
+    for r, n in ((1, 0.1), (5, 0.25), (17, 0.4)):
+        visited = {}
+        def plot( xy, a ):
+            visited[ xy ] = a
+        gfxgen.on_hybrid_star( 0, 0, r, n, plot )
+        dx, dy, a = hybrid_star_kernel( r, n )
+        assert set( zip( dx.tolist(), dy.tolist() ) ) == set( visited.keys() )
+        for x, y, alpha in zip( dx, dy, a ):
+            assert abs( alpha - visited[ (x,y) ] ) < 1e-9
+
+def test_starfield_is_reproducible():
+    a = generate_starfield( size = 128, density = 200, seed = 5 )
+    b = generate_starfield( size = 128, density = 200, seed = 5 )
+    c = generate_starfield( size = 128, density = 200, seed = 6 )
+    assert a.shape == (128, 128, 4)
+    assert (a == b).all()
+    assert (a != c).any()
+
+def test_starfield_wraps_around_edges():
+    # with this many large stars some must cross the edges, and every
+    # star pixel must have landed inside the image
+    ar = generate_starfield( size = 64, density = 2000, seed = 1 )
+    lit = ar[...,3] > 0
+    assert lit[0,:].any() and lit[-1,:].any()
+    assert lit[:,0].any() and lit[:,-1].any()
+    assert (ar[lit][:,0] >= 220).all()
+
+def test_empty_starfield():
+    assert not generate_starfield( size = 16, density = 0 ).any()
+
+def test_layers_use_successive_seeds():
+    layers = generate_starfield_layers( 3, size = 64, density = 500, seed = 10, processes = 1 )
+    assert len( layers ) == 3
+    assert (layers[2] == generate_starfield( 64, 500, 12 )).all()
@@ -0,0 +1,60 @@
+from headless import *
+
+import random
+
+from util import *
+
+from ship import create_ship_thing
+
+def setup_fleet():
+    w = HeadlessWorld()
+    ships = []
+    for i, position in enumerate( [ (0,0), (100,0), (0,300), (-50,-50), (1000,1000) ] ):
+        ship = create_ship_thing( w, position, shape = "small", hp = 1 )
+        w.targeting.add( ship, "player" if i == 0 else "enemy" )
+        ships.append( ship )
+    return w, ships
+
+def test_nearest_and_radius_queries():
+    w, ships = setup_fleet()
+    player, a, b, c, d = ships
+    assert w.targeting.nearest( (0,0), k = 3 ) == [ player, c, a ]
+    assert w.targeting.nearest( (0,0), k = 2, faction = "enemy" ) == [ c, a ]
+    assert w.targeting.within_radius( (0,0), 200, hostile_to = "player" ) == [ c, a ]
+    assert w.targeting.within_radius( (0,0), 10, hostile_to = "player" ) == []
+    assert w.targeting.nearest_hostile( player ) is c
+    assert w.targeting.nearest_hostile( a ) is player
+    assert w.targeting.nearest_hostile( d, radius = 100 ) == None
+    rv = w.targeting.nearest_many( [ (0,0), (990,990) ], k = 1, hostile_to = [ "player", "enemy" ] )
+    assert rv == [ [ c ], [ player ] ]
+
+def test_queries_are_cached_per_tick_and_skip_the_dead():
+    w, ships = setup_fleet()
+    player, a, b, c, d = ships
+    assert w.targeting.nearest_hostile( player ) is c
+    c.position = (5000,5000)
+    assert w.targeting.nearest_hostile( player ) is c
+    w.tick( w.stepper.timestep )
+    assert w.targeting.nearest_hostile( player ) is a
+    a.kill()
+    w.tick( w.stepper.timestep )
+    assert w.targeting.nearest_hostile( player ) is b
+    assert a not in w.targeting.things
+    w.targeting.remove( b )
+    w.tick( w.stepper.timestep )
+    assert w.targeting.nearest_hostile( player ) is d
+
+def test_batch_matches_brute_force():
+    random.seed( 1 )
+    w = HeadlessWorld()
+    ships = []
+    for i in range(30):
+        ship = create_ship_thing( w, (random.random() * 4000, random.random() * 4000), shape = "small", hp = 1 )
+        w.targeting.add( ship, random.choice( ("red", "blue", "green") ) )
+        ships.append( ship )
+    points = [ (random.random() * 4000, random.random() * 4000) for i in range(20) ]
+    rv = w.targeting.nearest_many( points, k = 3, radius = 1500, hostile_to = "red" )
+    for p, found in zip( points, rv ):
+        expected = [ s for s in ships if s.faction != "red" and s.position.get_distance( p ) <= 1500 ]
+        expected.sort( key = lambda s : s.position.get_distance( p ) )
+        assert found == expected[:3]
@@ -0,0 +1,49 @@
+import random
+import geometry
+
+from vgeometry import *
+from physics import generate_random_convex_polygon_shape
+
+def random_polygon( near = None ):
+    shape = generate_random_convex_polygon_shape()
+    if near:
+        x, y = near[0]
+        shape.translate( -shape.centroid() + (x + random.random() * 20 - 10, y + random.random() * 20 - 10) )
+    return [ tuple(v) for v in shape.vertices ]
+
+def test_points_inside_convex_polygon():
+    square = [(0,0),(1,0),(1,1),(0,1)]
+    assert list( points_inside_convex_polygon( [(0.5,0.5),(1.5,0.5),(1,0.5),(-0.1,0.9)], square ) ) == [True, False, True, False]
+    assert inside_convex_polygon( (0.25,0.75), square )
+    assert not inside_convex_polygon( (2,2), square )
+
+def test_points_agree_with_scalar():
+    random.seed( 2 )
+    for i in range(50):
+        vs = random_polygon()
+        x, y = vs[0]
+        ps = [ (x + random.random() * 20 - 10, y + random.random() * 20 - 10) for j in range(20) ]
+        ps += vs
+        assert list( points_inside_convex_polygon( ps, vs ) ) == [ geometry.inside_convex_polygon( p, vs ) for p in ps ]
+        assert list( sides_of_line( ps, vs[0], vs[1] ) ) == [ geometry.side_of_line( p, vs[0], vs[1] ) for p in ps ]
+
+def test_line_segments_cross():
+    assert line_segments_cross( ((0,0),(2,2)), ((0,2),(2,0)) ) == (1,1)
+    assert line_segments_cross( ((0,0),(1,1)), ((2,0),(3,1)) ) == None
+    mask = line_segment_sets_cross( [((0,0),(2,2)), ((5,5),(6,6))], [((0,2),(2,0)), ((0,1),(6,1)), ((5,6),(6,5))] )
+    assert mask.tolist() == [[True, True, False], [False, False, True]]
+
+def test_polygon_batches_agree_with_scalar():
+    random.seed( 3 )
+    for i in range(20):
+        target = random_polygon()
+        polygons = [ random_polygon( near = target ) for j in range(15) ]
+        assert list( convex_polygons_overlap_many( polygons, target ) ) == [ geometry.convex_polygons_overlap( vs, target ) for vs in polygons ]
+        assert list( convex_polygons_separated_many( polygons, target ) ) == [ geometry.convex_polygons_separated( vs, target ) for vs in polygons ]
+        assert convex_polygons_overlap( polygons[0], target ) == geometry.convex_polygons_overlap( polygons[0], target )
+
+def test_convex_polygon_width():
+    assert abs( convex_polygon_width( [(0,0),(9,0),(9,33),(0,33)] ) - 9.0 ) < 1e-9
+    # a square is narrowest across its sides, not its diagonal
+    assert abs( convex_polygon_width( [(1,0),(0,1),(-1,0),(0,-1)] ) - 2 ** 0.5 ) < 1e-9
+    assert abs( convex_polygon_width( [(0,0),(4,0),(0,3)] ) - 2.4 ) < 1e-9
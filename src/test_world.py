@@ -1,6 +1,7 @@
 from world import *
 from functools import partial
 from operator import add, sub, mul, div
+from util import almost_equal
 
 def test_basic_hookable():
     x = [ 0 ]
@@ -79,3 +80,182 @@ def test_world_timestep():
     assert x == [("A",2), ("B",2), ("C",2)]
     w.tick( 1 )
     assert x == [("A",2), ("B",2), ("C",2),("A",2), ("B",2), ("C",2)]
+
+def test_hookable_priorities():
+    x = []
+    h = Hookable()
+    h.add_anonymous_hook( partial( x.append, "b" ) )
+    h.add_anonymous_hook( partial( x.append, "c" ), priority = 1 )
+    h.add_anonymous_hook( partial( x.append, "a" ), priority = -1 )
+    h.add_anonymous_hook( partial( x.append, "b2" ) )
+    h()
+    assert x == [ "a", "b", "b2", "c" ]
+
+def test_hookable_removes_by_owner():
+    x = []
+    h = Hookable()
+    owner = object()
+    h.add_hook( owner, partial( x.append, 1 ) )
+    h.add_anonymous_hook( partial( x.append, 2 ) )
+    h.add_hook( owner, partial( x.append, 3 ) )
+    assert h.has_hooks( owner )
+    assert len( h ) == 3
+    h()
+    h.remove_hooks( owner )
+    h.remove_hooks( owner )
+    assert not h.has_hooks( owner )
+    h()
+    assert x == [ 1, 2, 3, 2 ]
+    assert len( h ) == 1
+
+def test_hookable_changes_during_dispatch_apply_next_time():
+    x = []
+    h = Hookable()
+    def remove_and_add():
+        x.append( "first" )
+        h.remove_hooks( "other" )
+        h.add_anonymous_hook( partial( x.append, "added" ) )
+    h.add_anonymous_hook( remove_and_add )
+    h.add_hook( "other", partial( x.append, "other" ) )
+    h()
+    assert x == [ "first", "other" ]
+    del x[:]
+    h.remove_hooks( None )
+    h()
+    assert x == []
+
+def test_batched_hooks():
+    calls = []
+    def tick_all( items, dt ):
+        calls.append( (list( items ), dt) )
+    h = Hookable()
+    h.add_batched_hook( "a", tick_all, 1 )
+    h.add_batched_hook( "b", tick_all, 2 )
+    h.add_batched_hook( "a", tick_all, 3 )
+    h( 0.5 )
+    assert calls == [ ([1,2,3], 0.5) ]
+    h.remove_hooks( "a" )
+    h( 0.25 )
+    assert calls[-1] == ([2], 0.25)
+    h.remove_hooks( "b" )
+    h( 0.1 )
+    assert len( calls ) == 2
+
+def test_world_removes_hooks_from_every_hookpoint():
+    x = []
+    w = World()
+    for hookable in (w.pre_physics, w.physics, w.post_physics):
+        hookable.add_hook( "thing", lambda dt : x.append( dt ) )
+    for hookable in (w.pre_display, w.display, w.post_display):
+        hookable.add_hook( "thing", lambda : x.append( None ) )
+    w.remove_all_hooks( "thing" )
+    w.fixed_tick( 1 )
+    w.display_update()
+    assert x == []
+
+def test_world_profiling():
+    import StringIO
+    x = []
+    class Owner (object):
+        def tick(self, dt):
+            x.append( dt )
+    w = World( timestep = 1 )
+    owner = Owner()
+    w.pre_physics.add_hook( owner, owner.tick )
+    w.display.add_anonymous_hook( lambda : None )
+    stream = StringIO.StringIO()
+    profiler = w.enable_profiling( summary_interval = 2, stream = stream )
+    w.tick( 3 )
+    w.display_update()
+    assert stream.getvalue() == ""
+    w.display_update()
+    assert "hook profile over 2 frames" in stream.getvalue()
+    assert x == [ 1, 1, 1 ]
+    assert profiler.hookpoint_totals()[ "pre_physics" ][1] == 3
+    assert profiler.hookpoint_totals()[ "display" ][1] == 2
+    rows = dict( ((hookpoint, owner_type, hook), calls) for hookpoint, owner_type, hook, elapsed, calls in profiler.hook_totals() )
+    assert rows[ ("pre_physics", "Owner", "Owner.tick") ] == 3
+    assert rows[ ("display", "anonymous", "<lambda>") ] == 2
+    assert set( profiler.last_frame.keys() ) == set( [ "pre_display", "display", "post_display" ] )
+    w.disable_profiling()
+    assert type( w.pre_physics ) is Hookable
+    w.tick( 1 )
+    w.display_update()
+    assert x == [ 1, 1, 1, 1 ]
+    assert profiler.hookpoint_totals()[ "pre_physics" ][1] == 3
+
+def test_timestepper_bounds_catch_up():
+    x = []
+    stepper = FixedTimestepper( 1.0, x.append, max_steps = 3 )
+    assert stepper.step( 2.5 ) == 2
+    assert almost_equal( stepper.alpha, 0.5 )
+    assert stepper.step( 10.0 ) == 3
+    assert x == [ 1.0 ] * 5
+    assert stepper.dropped_steps == 7
+    assert almost_equal( stepper.dropped_time, 7.0 )
+    assert almost_equal( stepper.alpha, 0.5 )
+    assert stepper.step( 0.5 ) == 1
+    assert stepper.dropped_steps == 7
+
+def test_world_interpolation_alpha():
+    from physics import PhysicsSimulator, Thing, ConvexPolygonShape
+    w = World( timestep = 0.1 )
+    w.sim = PhysicsSimulator( timestep = None )
+    w.physics.add_anonymous_hook( w.sim.tick )
+    thing = Thing( w, ConvexPolygonShape( (-5,-5), (5,-5), (5,5), (-5,5) ), 1.0, 1.0 )
+    thing.velocity = (100, 0)
+    thing.angular_velocity_radians = 1.0
+    w.tick( 0.15 )
+    assert almost_equal( w.interpolation_alpha, 0.5 )
+    assert almost_equal( thing.position.x, 10.0 )
+    (x, y), angle = thing.interpolated_transform( w.interpolation_alpha )
+    assert almost_equal( x, 5.0 )
+    assert almost_equal( angle, 0.05 )
+    (x, y), angle = thing.interpolated_transform( 1.0 )
+    assert almost_equal( x, 10.0 )
+    assert almost_equal( angle, 0.1 )
+
+def test_world_interpolation_follows_real_positions():
+    # With thrust, and with a bounce that reverses the velocity at the
+    # end of a tick, the blended position must stay between the real
+    # positions before and after the tick.
+    from physics import PhysicsSimulator, Thing, ConvexPolygonShape
+    w = World( timestep = 0.1 )
+    w.sim = PhysicsSimulator( timestep = None )
+    w.physics.add_anonymous_hook( w.sim.tick )
+    thing = Thing( w, ConvexPolygonShape( (-5,-5), (5,-5), (5,5), (-5,5) ), 1.0, 1.0 )
+    thing.velocity = (100, 0)
+    thing.body.apply_force( (1000, 0) )
+    w.tick( 0.1 )
+    x0 = thing.position.x
+    w.tick( 0.1 )
+    x1 = thing.position.x
+    assert x1 > x0
+    (x, y), angle = thing.interpolated_transform( 0.0 )
+    assert almost_equal( x, x0 )
+    (x, y), angle = thing.interpolated_transform( 0.5 )
+    assert almost_equal( x, 0.5 * (x0 + x1) )
+    bounce = lambda dt : setattr( thing, "velocity", -thing.velocity )
+    w.post_physics.add_anonymous_hook( bounce )
+    w.tick( 0.1 )
+    x2 = thing.position.x
+    assert thing.velocity.x < 0
+    for alpha in (0.0, 0.25, 0.5, 0.75, 1.0):
+        (x, y), angle = thing.interpolated_transform( alpha )
+        assert min( x1, x2 ) - 1e-6 <= x <= max( x1, x2 ) + 1e-6
+    # moving a thing by hand is shown at once, not blended
+    thing.position = (500, 0)
+    (x, y), angle = thing.interpolated_transform( 0.0 )
+    assert almost_equal( x, 500 )
+
+def test_world_once_queue_runs_in_order():
+    w = World()
+    seen = []
+    def first():
+        seen.append( 1 )
+        w.queue_once( lambda : seen.append( 3 ) )
+    w.queue_once( first )
+    w.queue_once( lambda : seen.append( 2 ) )
+    w.tick( 0.01 )
+    assert seen == [ 1, 2, 3 ]
+    assert not w.post_physics_once_queue
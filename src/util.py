@@ -3,6 +3,7 @@ from pymunk import Vec2d
 
 from functools import partial
 from itertools import starmap
+from bisect import bisect_right
 
 def degrees_to_radians( degrees ):
     return math.pi * degrees / 180.0
@@ -124,25 +125,116 @@ def recursively_untuple( xs ):
     else:
         return xs
 
+class HookEntry (object):
+    __slots__ = [ "key", "f", "owner", "alive", "label" ]
+    def __init__(self, key, f, owner = None):
+        self.key = key
+        self.f = f
+        self.owner = owner
+        self.alive = True
+        self.label = None
+
+class HookBatch (object):
+    # Many hooks sharing one function: f is called once per dispatch with
+    # the list of all items, instead of once per item.
+    def __init__(self, f):
+        self.f = f
+        self.items = []
+        self.values = []
+        self.owners = {}
+        self.dirty = False
+    def add(self, obj, item):
+        entry = HookEntry( None, item, obj )
+        self.items.append( entry )
+        try:
+            self.owners[ obj ].append( entry )
+        except KeyError:
+            self.owners[ obj ] = [ entry ]
+        self.dirty = True
+    def remove(self, obj):
+        try:
+            entries = self.owners.pop( obj )
+        except KeyError:
+            return
+        for entry in entries:
+            entry.alive = False
+        self.dirty = True
+    def __call__(self, *args, **kwargs):
+        if self.dirty:
+            self.items = [ entry for entry in self.items if entry.alive ]
+            self.values = [ entry.f for entry in self.items ]
+            self.dirty = False
+        if self.values:
+            self.f( self.values, *args, **kwargs )
+
 class Hookable (object):
+    # Hooks run in order of priority (lowest first), then in the order
+    # they were added. Dispatch walks one flat list of callables; each
+    # owner's entries are indexed so removing them is O(1), with the dead
+    # entries dropped from the list before the next dispatch.
     def __init__(self):
-        self.hooks = {}
-    def add_hook(self, obj, f ):
+        self.entries = []
+        self.keys = []
+        self.calls = []
+        self.owners = {}
+        self.batches = {}
+        self.sequence = 0
+        self.dirty = False
+    def add_hook(self, obj, f, priority = 0 ):
+        self.sequence += 1
+        entry = HookEntry( (priority, self.sequence), f, obj )
+        if not self.keys or self.keys[-1] <= entry.key:
+            self.entries.append( entry )
+            self.keys.append( entry.key )
+        else:
+            i = bisect_right( self.keys, entry.key )
+            self.entries.insert( i, entry )
+            self.keys.insert( i, entry.key )
+        try:
+            self.owners[ obj ].append( entry )
+        except KeyError:
+            self.owners[ obj ] = [ entry ]
+        self.dirty = True
+    def add_anonymous_hook(self, f, priority = 0 ):
+        self.add_hook( None, f, priority = priority )
+    def add_batched_hook(self, obj, f, item, priority = 0 ):
+        # Calls f( items, *args ) once for all items added with the same f;
+        # the priority of the first one added places the whole batch.
+        try:
+            batch = self.batches[ f ]
+        except KeyError:
+            batch = self.batches[ f ] = HookBatch( f )
+            self.add_hook( batch, batch, priority = priority )
+        batch.add( obj, item )
         try:
-            self.hooks[ obj ].append( f )
+            self.owners[ obj ].append( batch )
         except KeyError:
-            self.hooks[ obj ] = [ f ]
-    def add_anonymous_hook(self, f ):
-        self.add_hook( None, f )
+            self.owners[ obj ] = [ batch ]
     def remove_hooks(self, obj ):
         try:
-            del self.hooks[ obj ]
+            entries = self.owners.pop( obj )
         except KeyError:
-            pass
+            return
+        for entry in entries:
+            if isinstance( entry, HookBatch ):
+                entry.remove( obj )
+            else:
+                entry.alive = False
+        self.dirty = True
+    def has_hooks(self, obj):
+        return obj in self.owners
+    def __len__(self):
+        return len( self.refresh() )
+    def refresh(self):
+        if self.dirty:
+            self.entries = [ entry for entry in self.entries if entry.alive ]
+            self.keys = [ entry.key for entry in self.entries ]
+            self.calls = [ entry.f for entry in self.entries ]
+            self.dirty = False
+        return self.calls
     def __call__(self, *args, **kwargs):
-        for hooks in self.hooks.values():
-            for hook in hooks:
-                hook(*args, **kwargs)
+        for hook in self.refresh():
+            hook(*args, **kwargs)
 
 def degrees_sub( a, b ):
     return (a - b) % 360.0
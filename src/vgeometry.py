@@ -0,0 +1,182 @@
+# NumPy versions of the functions in geometry.py. The batch functions
+# take many points, polygons or segments at once; the scalar functions
+# at the bottom have the same signatures and results as their
+# counterparts in geometry and can be imported in their place.
+#
+# Points are (n,2) arrays, a polygon is an (n,2) array of vertices in
+# order and a segment set is an (n,2,2) array of endpoint pairs. Plain
+# sequences of tuples or Vec2ds are accepted anywhere an array is.
+
+import numpy
+
+from pymunk import Vec2d
+
+def as_points( ps ):
+    if isinstance( ps, numpy.ndarray ):
+        return ps.astype( numpy.float64, copy = False ).reshape( -1, 2 )
+    return numpy.asarray( [ (p[0], p[1]) for p in ps ], dtype = numpy.float64 ).reshape( -1, 2 )
+
+def as_segments( segments ):
+    return numpy.asarray( [ ((a[0], a[1]), (b[0], b[1])) for a, b in segments ], dtype = numpy.float64 ).reshape( -1, 2, 2 )
+
+def polygon_edges( vs ):
+    vs = numpy.asarray( vs, dtype = numpy.float64 )
+    return numpy.stack( (vs, numpy.roll( vs, -1, axis = -2 )), axis = -2 )
+
+def pad_polygons( polygons ):
+    # Stacks polygons with different vertex counts by repeating the last
+    # vertex. The zero-length edges this adds have no side and cross
+    # nothing, so none of the tests below are affected by them.
+    polygons = [ as_points( vs ) for vs in polygons ]
+    n = max( len(vs) for vs in polygons )
+    rv = numpy.empty( (len(polygons), n, 2) )
+    for i, vs in enumerate( polygons ):
+        rv[i,:len(vs)] = vs
+        rv[i,len(vs):] = vs[-1]
+    return rv
+
+def edge_normals( edges ):
+    # The same arithmetic as side_of_line in geometry (normalize the
+    # direction, then take its normalized perpendicular) so that points
+    # lying almost exactly on an edge are classified identically.
+    d = edges[...,1,:] - edges[...,0,:]
+    length = numpy.sqrt( d[...,0] * d[...,0] + d[...,1] * d[...,1] )
+    nonzero = length != 0
+    d = numpy.where( nonzero[...,None], d / numpy.where( nonzero, length, 1.0 )[...,None], d )
+    length = numpy.sqrt( d[...,0] * d[...,0] + d[...,1] * d[...,1] )
+    nonzero = length != 0
+    safe = numpy.where( nonzero, length, 1.0 )
+    n = numpy.stack( (-d[...,1] / safe, d[...,0] / safe), axis = -1 )
+    return numpy.where( nonzero[...,None], n, d )
+
+def sides_of_edges( ps, edges ):
+    # (..., n) points against (..., m) edges gives (..., n, m) signs.
+    n = edge_normals( edges )
+    origins = edges[...,0,:]
+    dx = ps[...,:,None,0] - origins[...,None,:,0]
+    dy = ps[...,:,None,1] - origins[...,None,:,1]
+    return numpy.sign( dx * n[...,None,:,0] + dy * n[...,None,:,1] ).astype( numpy.int8 )
+
+def sides_of_line( ps, xy0, xy1 ):
+    edges = numpy.asarray( [[ (xy0[0], xy0[1]), (xy1[0], xy1[1]) ]], dtype = numpy.float64 )
+    return sides_of_edges( as_points( ps ), edges )[:,0]
+
+def inside_from_sides( sides ):
+    # A point is inside when the edges it is not exactly on all agree.
+    positive = (sides > 0).any( axis = -1 )
+    negative = (sides < 0).any( axis = -1 )
+    return positive != negative
+
+def points_inside_convex_polygon( ps, vs ):
+    return inside_from_sides( sides_of_edges( as_points( ps ), polygon_edges( as_points( vs ) ) ) )
+
+def segments_cross( a, b ):
+    # (..., n, 2, 2) segments against (..., m, 2, 2) segments gives a
+    # (..., n, m) mask and the crossing points.
+    p = a[...,:,None,0,:]
+    r = a[...,:,None,1,:] - a[...,:,None,0,:]
+    q = b[...,None,:,0,:]
+    s = b[...,None,:,1,:] - b[...,None,:,0,:]
+    rxs = r[...,0] * s[...,1] - r[...,1] * s[...,0]
+    qp = q - p
+    valid = numpy.abs( rxs ) > 0.01
+    safe = numpy.where( valid, rxs, 1.0 )
+    t = (qp[...,0] * s[...,1] - qp[...,1] * s[...,0]) / safe
+    u = (qp[...,0] * r[...,1] - qp[...,1] * r[...,0]) / safe
+    mask = valid & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    return mask, p + r * t[...,None]
+
+def line_segment_sets_cross( a, b ):
+    mask, points = segments_cross( as_segments( a ), as_segments( b ) )
+    return mask
+
+def convex_polygons_overlap_many( polygons, bs ):
+    polygons = pad_polygons( polygons )
+    bs = as_points( bs )
+    edges = polygon_edges( polygons )
+    other_edges = polygon_edges( bs )
+    corners_inside = inside_from_sides( sides_of_edges( polygons, other_edges ) ).any( axis = -1 )
+    others_inside = inside_from_sides( sides_of_edges( numpy.broadcast_to( bs, (len(polygons),) + bs.shape ), edges ) ).any( axis = -1 )
+    mask, points = segments_cross( edges, other_edges[None] )
+    return corners_inside | others_inside | mask.any( axis = (-2,-1) )
+
+def convex_polygons_separated_many( polygons, bs ):
+    # Separating axis test like geometry.convex_polygons_separated, for
+    # every polygon against bs at once.
+    polygons = pad_polygons( polygons )
+    bs = as_points( bs )
+    k = len( polygons )
+    normals = numpy.concatenate( (polygon_normals( polygons ), numpy.broadcast_to( polygon_normals( bs ), (k,) + bs.shape )), axis = 1 )
+    pa = numpy.einsum( "kvi,kai->kav", polygons, normals )
+    pb = numpy.einsum( "vi,kai->kav", bs, normals )
+    gap = (pa.max( axis = -1 ) < pb.min( axis = -1 )) | (pb.max( axis = -1 ) < pa.min( axis = -1 ))
+    return gap.any( axis = -1 )
+
+def polygon_normals( vs ):
+    previous = numpy.roll( vs, 1, axis = -2 )
+    return numpy.stack( (previous[...,1] - vs[...,1], vs[...,0] - previous[...,0]), axis = -1 )
+
+def convex_polygon_width( vs ):
+    # The narrowest extent of a convex polygon over all directions, which
+    # is always across one of its edges.
+    vs = as_points( vs )
+    normals = edge_normals( polygon_edges( vs ) )
+    extents = numpy.dot( vs, normals.T )
+    return float( (extents.max( axis = 0 ) - extents.min( axis = 0 )).min() )
+
+def side_of_line( p, xy0, xy1 ):
+    return int( sides_of_line( [p], xy0, xy1 )[0] )
+
+def inside_convex_polygon( p, vs ):
+    return bool( points_inside_convex_polygon( [p], vs )[0] )
+
+def line_segments_cross( a, b ):
+    mask, points = segments_cross( as_segments( [a] ), as_segments( [b] ) )
+    if mask[0,0]:
+        x, y = points[0,0]
+        return Vec2d( float(x), float(y) )
+    return None
+
+def convex_polygons_overlap( xs, bs ):
+    return bool( convex_polygons_overlap_many( [xs], bs )[0] )
+
+def convex_polygons_separated( xs, bs ):
+    return bool( convex_polygons_separated_many( [xs], bs )[0] )
+
+def benchmark_against_scalar( n = 200, seed = 0 ):
+    import time
+    import random
+    import geometry
+    from physics import generate_random_convex_polygon_shape
+    random.seed( seed )
+    def polygon():
+        return [ tuple(v) for v in generate_random_convex_polygon_shape().vertices ]
+    def nearby( vs ):
+        x, y = vs[0]
+        return [ (vx - vs[0][0] + x + random.random() * 10 - 5, vy - vs[0][1] + y + random.random() * 10 - 5) for vx, vy in polygon() ]
+    target = polygon()
+    polygons = [ nearby( target ) for i in range(n) ]
+    points = [ (target[0][0] + random.random() * 20 - 10, target[0][1] + random.random() * 20 - 10) for i in range(n * 10) ]
+    rv = {}
+    def timed( name, f ):
+        t0 = time.time()
+        result = f()
+        rv[ name ] = time.time() - t0
+        return result
+    scalar = timed( "scalar points", lambda : [ geometry.inside_convex_polygon( p, target ) for p in points ] )
+    batch = timed( "batch points", lambda : points_inside_convex_polygon( points, target ) )
+    assert scalar == list( batch )
+    scalar = timed( "scalar overlap", lambda : [ geometry.convex_polygons_overlap( vs, target ) for vs in polygons ] )
+    batch = timed( "batch overlap", lambda : convex_polygons_overlap_many( polygons, target ) )
+    assert scalar == list( batch )
+    scalar = timed( "scalar separated", lambda : [ geometry.convex_polygons_separated( vs, target ) for vs in polygons ] )
+    batch = timed( "batch separated", lambda : convex_polygons_separated_many( polygons, target ) )
+    assert scalar == list( batch )
+    return rv
+
+if __name__ == '__main__':
+    import headless # physics pulls in cocos, which would open a window
+    rv = benchmark_against_scalar()
+    for kind in ("points", "overlap", "separated"):
+        scalar, batch = rv[ "scalar " + kind ], rv[ "batch " + kind ]
+        print "{0:<10} scalar {1:8.4f}s batch {2:8.4f}s ({3:.1f}x)".format( kind, scalar, batch, scalar / batch if batch > 0 else 0.0 )
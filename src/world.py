@@ -1,18 +1,42 @@
 from util import Hookable
 
+from collections import deque
+
+HookpointNames = ( "pre_physics", "physics", "post_physics", "pre_display", "display", "post_display" )
+
 class FixedTimestepper (object):
-    def __init__(self, timestep, fixed_step_function):
+    # Runs fixed_step_function once per timestep of accumulated time. At
+    # most max_steps run per call; any further whole steps owed are
+    # dropped (and counted) rather than carried into the next call, which
+    # would only fall further behind. alpha is how far the leftover time
+    # reaches into the next step, for blending transforms on display.
+    def __init__(self, timestep, fixed_step_function, max_steps = None):
         self.timestep = timestep
         self.t = 0.0
         self.fixed_step_function = fixed_step_function
+        self.max_steps = max_steps
+        self.dropped_steps = 0
+        self.dropped_time = 0.0
     def step(self, dt):
         self.t += dt
+        steps = 0
         while self.t >= self.timestep:
+            if self.max_steps != None and steps >= self.max_steps:
+                n = int( self.t // self.timestep )
+                self.t -= n * self.timestep
+                self.dropped_steps += n
+                self.dropped_time += n * self.timestep
+                break
             self.t -= self.timestep
             self.fixed_step_function( self.timestep )
+            steps += 1
+        return steps
+    @property
+    def alpha(self):
+        return min( 1.0, self.t / self.timestep )
 
 class World (object):
-    def __init__(self, timestep = 0.01):
+    def __init__(self, timestep = 0.01, max_steps_per_tick = 10):
         self.hookpoints = []
         self.pre_physics = Hookable()
         self.hookpoints.append( self.pre_physics )
@@ -20,25 +44,33 @@ class World (object):
         self.hookpoints.append( self.physics )
         self.post_physics = Hookable()
         self.hookpoints.append( self.post_physics )
-        self.post_physics_once_queue = []
+        self.post_physics_once_queue = deque()
         self.pre_display = Hookable()
         self.hookpoints.append( self.pre_display )
         self.display = Hookable()
-        self.post_display = Hookable()
         self.hookpoints.append( self.display )
-        self.stepper = FixedTimestepper( timestep, self.fixed_tick )
+        self.post_display = Hookable()
+        self.hookpoints.append( self.post_display )
+        self.stepper = FixedTimestepper( timestep, self.fixed_tick, max_steps = max_steps_per_tick )
         self.t = 0
+        self.profiler = None
     def queue_once(self, f):
         self.post_physics_once_queue.append( f )
     def fixed_tick(self, dt):
         self.pre_physics( dt )
         self.physics( dt )
         self.post_physics( dt )
-        while self.post_physics_once_queue:
-            self.post_physics_once_queue.pop(0)()
+        queue = self.post_physics_once_queue
+        while queue:
+            queue.popleft()()
         self.t += dt
     def tick(self, dt):
         self.stepper.step( dt )
+    @property
+    def interpolation_alpha(self):
+        # For pre_display hooks: 1.0 shows the state after the last fixed
+        # tick, 0.0 the state before it.
+        return self.stepper.alpha
     def remove_all_hooks(self, obj):
         for hookable in self.hookpoints:
             hookable.remove_hooks( obj )
@@ -46,3 +78,20 @@ class World (object):
         self.pre_display()
         self.display()
         self.post_display()
+        if self.profiler:
+            self.profiler.end_frame()
+    def enable_profiling(self, summary_interval = None, stream = None):
+        # Times every hook from now on; with summary_interval, a summary
+        # is printed every that many frames.
+        import profiling
+        self.profiler = profiling.HookProfiler( summary_interval = summary_interval, stream = stream )
+        for name in HookpointNames:
+            hookable = getattr( self, name )
+            hookable.__class__ = profiling.ProfiledHookable
+            hookable.profile_name = name
+            hookable.profiler = self.profiler
+        return self.profiler
+    def disable_profiling(self):
+        for name in HookpointNames:
+            getattr( self, name ).__class__ = Hookable
+        self.profiler = None